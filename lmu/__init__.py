@@ -5,9 +5,16 @@ from .lmu import (
     InputScaled,
     LMUCell,
     LMUCellODE,
+    LMUODE,
     LMUCellGating,
+    LMUGating,
     LMUCellFFT,
     LMU,
+    LMUCellEnsemble,
+    LMUCellFFTEnsemble,
+    LMUEnsemble,
+    LegendreDelayReadout,
+    dense_hidden_kernel,
 )
 
 from .version import version as __version__
@@ -0,0 +1,174 @@
+"""
+Opt-in on-disk cache for the constant arrays computed when building LMU layers.
+
+Discretizing the delay system and simulating its impulse response is repeated by
+every process that builds an LMU layer. When the cache is enabled (either by calling
+``enable_cache`` or by setting the ``LMU_CACHE_DIR`` environment variable), these
+arrays are stored on disk and loaded memory-mapped by subsequent processes.
+
+Writes are atomic (arrays are written to a temporary file which is then renamed),
+so many worker processes can safely share one cache directory.
+"""
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+# bump whenever the way cached arrays are computed changes
+CACHE_VERSION = 1
+
+DEFAULT_MAX_BYTES = 2**30
+
+_cache = None
+
+
+class DiskCache:
+    """
+    A size-limited directory of ``.npy`` files keyed by a hash of their parameters.
+
+    When the total size exceeds ``max_bytes``, the least recently used files are
+    removed.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(kind, **params):
+        """Returns the hash identifying an array of ``kind`` with ``params``."""
+        desc = repr((CACHE_VERSION, kind, sorted(params.items())))
+        return "%s-%s" % (kind, hashlib.sha256(desc.encode("utf-8")).hexdigest())
+
+    def path(self, key):
+        """Returns the file in which the array for ``key`` is stored."""
+        return os.path.join(self.directory, key + ".npy")
+
+    def get(self, key):
+        """Returns the memory-mapped array for ``key``, or ``None`` on a miss."""
+        path = self.path(key)
+        try:
+            array = np.load(path, mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # corrupt or truncated file; it will be replaced by the next put
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return array
+
+    def put(self, key, array):
+        """Atomically stores ``array`` under ``key``."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.asarray(array))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used files until the cache fits in ``max_bytes``."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npy"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # removed by another process
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        """Removes all cached arrays."""
+        for name in os.listdir(self.directory):
+            if name.endswith(".npy"):
+                self._remove(os.path.join(self.directory, name))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def enable_cache(directory=None, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Enables the on-disk cache.
+
+    ``directory`` defaults to ``$LMU_CACHE_DIR``, or ``~/.cache/lmu`` if unset.
+    """
+
+    global _cache  # pylint: disable=global-statement
+
+    if directory is None:
+        directory = os.environ.get("LMU_CACHE_DIR", os.path.join("~", ".cache", "lmu"))
+    _cache = DiskCache(directory, max_bytes=max_bytes)
+    return _cache
+
+
+def disable_cache():
+    """Disables the on-disk cache (without removing any files)."""
+
+    global _cache  # pylint: disable=global-statement
+
+    _cache = None
+
+
+def get_cache():
+    """Returns the active ``DiskCache``, or ``None`` if caching is disabled."""
+    return _cache
+
+
+def cached(kind, compute, **params):
+    """
+    Returns the array of ``kind`` with ``params``, calling ``compute`` on a miss.
+
+    If the cache is disabled, this always calls ``compute``.
+    """
+
+    if _cache is None:
+        return np.asarray(compute())
+
+    key = _cache.key(kind, **params)
+    array = _cache.get(key)
+    if array is None:
+        array = np.asarray(compute())
+        _cache.put(key, array)
+    return array
+
+
+def describe(obj):
+    """Returns a stable string identifying a realizer or factory for cache keys."""
+    if callable(obj) and hasattr(obj, "__qualname__"):
+        return "%s.%s" % (obj.__module__, obj.__qualname__)
+    return repr(obj)
+
+
+if os.environ.get("LMU_CACHE_DIR"):
+    enable_cache(
+        os.environ["LMU_CACHE_DIR"],
+        max_bytes=int(os.environ.get("LMU_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+    )
@@ -0,0 +1,213 @@
+"""
+Streaming ``tf.data`` input pipelines for sequential workloads.
+
+Rather than loading (and transforming) a whole dataset in memory before training,
+these pipelines read each batch from its source (e.g. a memory-mapped ``.npy`` file)
+and apply the transformations, such as the fixed pixel permutation of psMNIST, on the
+fly, in parallel with training.
+"""
+
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import backend as K
+
+from .utils import bucket_length
+
+
+def load_npy(path):
+    """
+    Memory-maps the array stored in ``path``, so that only the rows used are read.
+    """
+
+    return np.load(path, mmap_mode="r")
+
+
+def sequence_dataset(
+    inputs,
+    targets=None,
+    batch_size=32,
+    permutation=None,
+    scale=None,
+    shuffle=False,
+    seed=None,
+    drop_remainder=False,
+    num_parallel_calls=tf.data.AUTOTUNE,
+    prefetch=tf.data.AUTOTUNE,
+):
+    """
+    Returns a dataset of ``(batch, timesteps, 1)`` sequences from fixed-size examples.
+
+    ``inputs`` is an array (e.g. from ``load_npy``) with shape ``(n, ...)``, where each
+    example is flattened into a sequence of ``timesteps`` scalars. Batches are read from
+    ``inputs`` (and ``targets``, if given) by index, using ``num_parallel_calls``
+    parallel reads, then multiplied by ``scale`` and reordered by the timestep
+    ``permutation`` (if given). ``prefetch`` batches are prepared ahead of the model.
+    """
+
+    n = len(inputs)
+    timesteps = int(np.prod(inputs.shape[1:]))
+    dtype = K.floatx()
+
+    def read(idxs):
+        # sorted indices read memory-mapped files sequentially
+        idxs = np.sort(idxs)
+        x = np.asarray(inputs[idxs], dtype=dtype).reshape((len(idxs), timesteps, 1))
+        if targets is None:
+            return (x,)
+        return x, np.asarray(targets[idxs])
+
+    if targets is None:
+        target_spec = ()
+    else:
+        target_dtype = tf.as_dtype(np.asarray(targets[:1]).dtype)
+        target_spec = (tf.TensorSpec((None,) + targets.shape[1:], target_dtype),)
+    specs = (tf.TensorSpec((None, timesteps, 1), dtype),) + target_spec
+
+    def load(idxs):
+        batch = tf.numpy_function(read, [idxs], [spec.dtype for spec in specs])
+        batch = [tf.ensure_shape(x, spec.shape) for x, spec in zip(batch, specs)]
+
+        x = batch[0]
+        if scale is not None:
+            x = x * scale
+        if permutation is not None:
+            x = tf.gather(x, permutation, axis=1)
+
+        return x if targets is None else (x, batch[1])
+
+    dataset = tf.data.Dataset.range(n)
+    if shuffle:
+        dataset = dataset.shuffle(n, seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size, drop_remainder=drop_remainder)
+    dataset = dataset.map(load, num_parallel_calls=num_parallel_calls)
+
+    return dataset.prefetch(prefetch)
+
+
+def psmnist_dataset(
+    images, labels=None, batch_size=100, seed=0, permutation=None, **kwargs
+):
+    """
+    Returns a permuted sequential MNIST dataset, as in the ``psMNIST`` examples.
+
+    ``images`` has shape ``(n, 28, 28)`` with values in ``[0, 255]``. Unless a
+    ``permutation`` is given, the pixels are permuted with
+    ``np.random.RandomState(seed).permutation`` (the same for every example, and the
+    same as in the examples for ``seed=0``). ``kwargs`` are passed to
+    ``sequence_dataset``.
+    """
+
+    if permutation is None:
+        n_pixels = int(np.prod(images.shape[1:]))
+        permutation = np.random.RandomState(seed).permutation(n_pixels)
+
+    return sequence_dataset(
+        images,
+        labels,
+        batch_size=batch_size,
+        permutation=permutation,
+        scale=1 / 255,
+        **kwargs
+    )
+
+
+def bucketed_dataset(
+    sequences,
+    targets=None,
+    batch_size=32,
+    with_mask=False,
+    shuffle=False,
+    seed=None,
+    num_parallel_calls=tf.data.AUTOTUNE,
+    prefetch=tf.data.AUTOTUNE,
+):
+    """
+    Returns a dataset of variable-length sequences, batched by ``bucket_length``.
+
+    ``sequences`` is a list of arrays with shape ``(timesteps, input_dim)``. As with
+    ``lmu.utils.bucket_sequences``, each batch is padded at the end to its bucket
+    length, so that ``LMUCellFFT`` only needs one FFT size per bucket. If
+    ``with_mask``, the inputs are ``(sequences, mask)`` pairs, where ``mask`` is
+    ``True`` for the non-padded timesteps.
+    """
+
+    dtype = K.floatx()
+    input_dim = np.asarray(sequences[0]).shape[1:]
+    max_bucket = bucket_length(max(len(seq) for seq in sequences))
+
+    def generate():
+        for i, seq in enumerate(sequences):
+            seq = np.asarray(seq, dtype=dtype)
+            if targets is None:
+                yield seq, len(seq)
+            else:
+                yield seq, len(seq), targets[i]
+
+    signature = (
+        tf.TensorSpec((None,) + input_dim, dtype),
+        tf.TensorSpec((), tf.int32),
+    )
+    if targets is not None:
+        target = np.asarray(targets[0])
+        signature += (tf.TensorSpec(target.shape, tf.as_dtype(target.dtype)),)
+
+    dataset = tf.data.Dataset.from_generator(generate, output_signature=signature)
+    if shuffle:
+        dataset = dataset.shuffle(len(sequences), seed=seed)
+
+    # buckets [2**(k-1) + 1, 2**k + 1) are padded to 2**k timesteps
+    boundaries = [2**k + 1 for k in range(max_bucket.bit_length())]
+    dataset = dataset.bucket_by_sequence_length(
+        lambda x, *_: tf.shape(x)[0],
+        bucket_boundaries=boundaries,
+        bucket_batch_sizes=[batch_size] * (len(boundaries) + 1),
+        pad_to_bucket_boundary=True,
+    )
+
+    def finalize(x, length, *target):
+        inputs = (x, tf.sequence_mask(length, tf.shape(x)[1])) if with_mask else x
+        return (inputs,) + target if target else inputs
+
+    dataset = dataset.map(finalize, num_parallel_calls=num_parallel_calls)
+
+    return dataset.prefetch(prefetch)
+
+
+def measure_pipeline(dataset, layer=None, n_batches=50):
+    """
+    Measures the throughput (in examples per second) of ``dataset``.
+
+    If a ``layer`` (or model) is given, its throughput on the first batch of the
+    dataset is measured as well, so that the two can be compared; the input pipeline
+    is not the bottleneck if its ``data_throughput`` exceeds the ``layer_throughput``.
+    """
+
+    def examples(batch):
+        while isinstance(batch, (tuple, list)):
+            batch = batch[0]
+        return int(tf.shape(batch)[0])
+
+    iterator = iter(dataset)
+    first = next(iterator)
+
+    start = time.perf_counter()
+    n_examples = 0
+    for _, batch in zip(range(n_batches), iterator):
+        n_examples += examples(batch)
+    results = dict(data_throughput=n_examples / (time.perf_counter() - start))
+
+    if layer is not None:
+        inputs = first[0] if isinstance(first, tuple) else first
+        call = tf.function(layer)
+        call(inputs)  # trace before timing
+
+        start = time.perf_counter()
+        for _ in range(n_batches):
+            call(inputs)
+        results["layer_throughput"] = (
+            n_batches * examples(inputs) / (time.perf_counter() - start)
+        )
+
+    return results
@@ -0,0 +1,257 @@
+"""
+Static estimates of the memory and compute cost of LMU layers.
+
+These are computed from the layer configuration alone (without building the layer or
+any TensorFlow graph), so that the cost of a configuration can be checked before
+launching a job, and the cheaper implementation chosen. FLOPs count a multiply-add
+as two operations, and nonlinearities as one operation per element.
+"""
+
+import math
+
+import numpy as np
+from tensorflow.keras import backend as K
+from tensorflow.keras.layers import Bidirectional, RNN
+
+from .lmu import (
+    LMU,
+    LMUCell,
+    LMUCellFFT,
+    LMUCellGating,
+    LMUCellODE,
+    LMUGating,
+    LMUODE,
+)
+from .utils import bucket_length
+
+
+def _fft_flops(n):
+    """Approximate FLOPs of one real FFT (or inverse FFT) of length ``n``."""
+    return 2.5 * n * math.log2(n)
+
+
+def _hidden_kernel_parameters(cell):
+    """Number of weights in the (structured) ``hidden_kernel`` of ``cell``."""
+
+    U = cell.units
+    if cell.hidden_kernel_structure == "dense":
+        return U * U
+    if cell.hidden_kernel_structure == "low_rank":
+        return 2 * U * cell.hidden_kernel_rank
+    if cell.hidden_kernel_structure == "block_diagonal":
+        return U * U // cell.hidden_kernel_blocks
+    mask = np.asarray(cell.hidden_kernel_mask)
+    return int(mask.sum()) * (U // len(mask)) ** 2
+
+
+def _lmu_cell(cell, input_dim):
+    U, N, d = cell.units, cell.order, input_dim
+    W = _hidden_kernel_parameters(cell)
+    params = d + U + N + d * U + W + N * U + N * N + N
+    flops = 2 * (d + U + N) + 2 * N * N + 3 * N + 2 * (d * U + W + N * U) + U
+    # per step, backpropagation keeps u, m, and the pre-activation and output of h
+    saved = 1 + N + 2 * U
+    return params, U + N, flops, saved
+
+
+def _gating_cell(cell, input_dim):
+    U, N, d = cell.units, cell.order, input_dim
+    if cell.input_only_gating:
+        params = d + d * N + N
+        flops = 2 * d + 2 * d * N + 2 * N
+    else:
+        params = d + U + N + d * N + U * N + N
+        flops = 2 * (d + U + N) + 2 * (d + U) * N + 2 * N
+    W = _hidden_kernel_parameters(cell) if cell.hidden_to_hidden else 0
+    params += d * U + W + N * U + N * N + N
+    flops += 2 * N * N + 3 * N + 2 * (d * U + W + N * U) + U
+    saved = 1 + 2 * N + 2 * U
+    return params, U + N, flops, saved
+
+
+def _ode_cell(cell, input_dim):
+    U, N, d = cell.units, cell.order, input_dim
+    out = cell.output_size
+
+    if cell.decoder_structure == "dense":
+        decoders = U * N * out
+        decode_flops = 2 * U * N * out
+    elif cell.decoder_structure == "per_unit":
+        decoders = decode_flops = U * N
+        decode_flops *= 2
+    elif cell.decoder_structure == "low_rank":
+        decoders = U * N * cell.decoder_rank + cell.decoder_rank * out
+        decode_flops = 2 * decoders
+    else:
+        decoders = N + U * out
+        decode_flops = 2 * decoders
+
+    params = d * U + (U if cell.dt_per_unit else 1) + decoders + N * N + N
+    params += N * N + N + 1  # identity and padding constants, stored as variables
+    flops = 2 * d * U + 2 * U * N * N + 3 * U * N + U * N + decode_flops + out
+
+    saved = U + 2 * U * N + 2 * out
+    return params, U * N, flops, saved
+
+
+def _discretization_flops(cell):
+    """
+    Returns the cost of discretizing the system of a trainable ``LMUCellODE``.
+    """
+
+    if not isinstance(cell, LMUCellODE) or not (
+        cell.trainable_dt or cell.trainable_A or cell.trainable_B
+    ):
+        return 0
+
+    N = cell.order
+    n_systems = cell.units if cell.dt_per_unit else 1
+    if cell.method == "zoh":
+        # scaling and squaring with a degree 13 Pade approximant
+        return n_systems * 20 * (N + 1) ** 3
+    # one Euler step, composed stride times
+    return n_systems * (2 * N * N + (cell.stride - 1) * (2 * N**3 + 2 * N * N + N))
+
+
+def _recurrent_cost(
+    cell, input_dim, batch_size, seq_length, return_sequences, per_sequence
+):
+    if isinstance(cell, LMUCellGating):
+        params, state, flops, saved = _gating_cell(cell, input_dim)
+    elif isinstance(cell, LMUCellODE):
+        params, state, flops, saved = _ode_cell(cell, input_dim)
+    else:
+        params, state, flops, saved = _lmu_cell(cell, input_dim)
+
+    # the discretization of a trainable system is repeated on every step (or once
+    # per sequence, in an LMUODE)
+    discretization = _discretization_flops(cell)
+
+    outputs = batch_size * (seq_length if return_sequences else 1) * cell.output_size
+    return dict(
+        parameters=params,
+        state=batch_size * state,
+        inference_activations=batch_size * state + outputs,
+        training_activations=batch_size * seq_length * (saved + state) + outputs,
+        flops_per_step=batch_size * flops + discretization,
+        flops_per_sequence=(
+            batch_size * seq_length * flops
+            + (1 if per_sequence else seq_length) * discretization
+        ),
+        fft_length=None,
+        fft_buffers=0,
+    )
+
+
+def _fft_cost(cell, input_dim, batch_size, seq_length, return_sequences):
+    U, N, d, B, T = cell.units, cell.order, input_dim, batch_size, seq_length
+    n_directions = 2 if cell.bidirectional else 1
+
+    if cell.output_timesteps is not None:
+        n_outputs = len(cell.output_timesteps)
+    else:
+        n_outputs = T if return_sequences else 1
+    # a few outputs are evaluated directly (see LMUCellFFT._evaluate)
+    direct = n_outputs < T and n_outputs <= max(math.log2(2 * bucket_length(T)), 1)
+
+    params = n_directions * (d + d * U + N * U)
+    outputs = B * n_outputs * cell.output_size
+
+    fft_length = 2 * bucket_length(T)
+    n_freqs = fft_length // 2 + 1
+    signals = n_directions * B
+
+    # encoding every step, and reading out the output steps
+    readout = n_directions * (2 * B * T * d + B * n_outputs * (2 * (N * U + d * U) + U))
+    if direct:
+        # dot products with the reversed impulse response
+        flops = signals * n_outputs * 2 * T * N + readout
+        fft_buffers = n_outputs * N * T + signals * n_outputs * N
+        fft_length = None
+        m = signals * n_outputs * N
+    else:
+        flops = (
+            signals * (1 + N) * _fft_flops(fft_length)
+            + 6 * signals * N * n_freqs
+            + readout
+        )
+        # complex buffers (counted as two reals): the response spectrum, the input
+        # spectrum, and their product for every order; plus the real inverse
+        # transform
+        fft_buffers = (
+            2 * N * n_freqs + 2 * signals * n_freqs + 2 * signals * N * n_freqs
+        )
+        fft_buffers += signals * N * fft_length
+        m = signals * T * N
+
+    return dict(
+        parameters=params,
+        state=0,
+        inference_activations=fft_buffers + m + outputs,
+        training_activations=fft_buffers + 2 * m + 2 * outputs * n_directions,
+        flops_per_step=None,
+        flops_per_sequence=flops,
+        fft_length=fft_length,
+        fft_buffers=fft_buffers,
+    )
+
+
+def estimate_cost(layer, input_dim, batch_size, seq_length, dtype=None):
+    """
+    Estimates the memory and compute cost of evaluating ``layer`` on a batch.
+
+    ``layer`` is an ``LMU``, ``LMUCell``, ``LMUCellGating``, ``LMUCellODE`` (or an
+    ``RNN`` of one of these cells, an ``LMUGating`` or an ``LMUODE``) or
+    ``LMUCellFFT``, which does not need to be built.
+    Returns a dict with
+
+    - ``parameter_bytes``: size of the weights.
+    - ``state_bytes``: size of the recurrent state carried between steps.
+    - ``inference_bytes``, ``training_bytes``: peak size of the activations (including
+      the outputs) for inference, and kept for backpropagation when training.
+    - ``flops_per_step`` (``None`` for the FFT variant), ``flops_per_sequence``.
+    - ``fft_length`` and ``fft_buffer_bytes``: the FFT size (``None`` if not used),
+      and the size of the spectra and transformed sequences.
+    """
+
+    itemsize = np.dtype(K.floatx() if dtype is None else dtype).itemsize
+    return_sequences = getattr(layer, "return_sequences", True)
+    n_directions = 1
+
+    if isinstance(layer, LMU):
+        if layer.stride > 1:
+            seq_length = -(-seq_length // layer.stride)
+        if layer.output_timesteps is not None:
+            return_sequences = False
+        layer = layer.lmu_layer
+    if isinstance(layer, Bidirectional):
+        n_directions = 2
+        layer = layer.forward_layer
+    per_sequence = isinstance(layer, LMUODE)
+    if isinstance(layer, (RNN, LMUGating, LMUODE)):
+        return_sequences = layer.return_sequences
+        layer = layer.cell
+
+    if isinstance(layer, LMUCellFFT):
+        cost = _fft_cost(layer, input_dim, batch_size, seq_length, return_sequences)
+    elif isinstance(layer, (LMUCell, LMUCellGating, LMUCellODE)):
+        cost = _recurrent_cost(
+            layer, input_dim, batch_size, seq_length, return_sequences, per_sequence
+        )
+        cost = {
+            k: v * n_directions if isinstance(v, (int, float)) else v
+            for k, v in cost.items()
+        }
+    else:
+        raise TypeError("Cannot estimate the cost of %s" % type(layer).__name__)
+
+    return dict(
+        parameter_bytes=int(cost["parameters"] * itemsize),
+        state_bytes=int(cost["state"] * itemsize),
+        inference_bytes=int(cost["inference_activations"] * itemsize),
+        training_bytes=int(cost["training_activations"] * itemsize),
+        flops_per_step=cost["flops_per_step"],
+        flops_per_sequence=cost["flops_per_sequence"],
+        fft_length=cost["fft_length"],
+        fft_buffer_bytes=int(cost["fft_buffers"] * itemsize),
+    )
@@ -3,6 +3,8 @@ Core classes for the LMU package, including but not limited to
 the cell structure, differential equation, and gating.
 """
 
+import functools
+
 import numpy as np
 
 from tensorflow.keras import backend as K
@@ -11,12 +13,15 @@ from tensorflow.keras.initializers import Constant, Initializer
 from tensorflow.keras.initializers import (
     Identity as ID,
 )  # Redefinition to avoid conflict with nengolib import
-from tensorflow.keras.layers import Layer, RNN
+from tensorflow.keras.layers import Bidirectional, Layer, RNN
 import tensorflow as tf
 
-from nengolib.signal import Identity, cont2discrete
+from nengolib.signal import Identity, LinearSystem, cont2discrete
 from nengolib.synapses import LegendreDelay
-from scipy.special import legendre
+from scipy.special import eval_legendre, legendre
+
+from . import cache
+from .utils import bucket_length
 
 
 class Legendre(Initializer):
@@ -33,6 +38,335 @@ class Legendre(Initializer):
         )
 
 
+def _realization_config(realizer, factory):
+    """
+    Returns the config entries needed to recreate ``realizer`` and ``factory``.
+
+    The default Legendre realization is implied by omitting both entries, which keeps
+    the config serializable. Custom realizers/factories are stored as-is, and must be
+    made available via ``custom_objects`` when reloading.
+    """
+
+    config = {}
+    if type(realizer) is not Identity:
+        config["realizer"] = realizer
+    if factory is not LegendreDelay:
+        config["factory"] = factory
+    return config
+
+
+def _system_key(theta, order, realizer, factory):
+    """Returns the parameters that identify a realized delay system in the cache."""
+    return dict(
+        theta=float(theta),
+        order=int(order),
+        realizer=cache.describe(realizer),
+        factory=cache.describe(factory),
+    )
+
+
+def _cont2discrete(sys, dt, method, **key):
+    """
+    Discretizes ``sys``, using the on-disk cache if it is enabled.
+
+    ``key`` must uniquely identify ``sys`` (see ``_system_key``).
+    """
+
+    def discretize():
+        ss = cont2discrete(sys, dt=dt, method=method)
+        return np.block([[ss.A, ss.B], [ss.C, ss.D]])
+
+    M = cache.cached(
+        "discretization",
+        discretize,
+        dt=float(dt),
+        method=method,
+        dtype="float64",
+        **key
+    )
+    n = sys.A.shape[0]
+    return LinearSystem((M[:n, :n], M[:n, n:], M[n:, :n], M[n:, n:]), analog=False)
+
+
+def _repeat_steps(AT, BT, steps):
+    """
+    Composes ``steps`` steps of ``x = x AT + u BT``, holding the input ``u`` constant.
+
+    Works with both arrays and tensors (with optional matching leading batch dims).
+    """
+
+    AT_k, BT_k = AT, BT
+    for _ in range(steps - 1):
+        AT_k, BT_k = AT_k @ AT, BT_k @ AT + BT
+    return AT_k, BT_k
+
+
+def _impulse_response(A, B, length):
+    """
+    Computes the impulse response ``[B, AB, A^2 B, ...]`` of ``length`` in-graph.
+
+    ``A`` and ``B`` are the discrete state-space matrices, optionally with leading
+    batch dimensions. Uses repeated doubling, so only ``O(log(length))`` matrix
+    products are needed.
+    """
+
+    def double(response, power):
+        return (
+            tf.concat([response, tf.matmul(power, response)], axis=-1),
+            tf.matmul(power, power),
+        )
+
+    A = tf.convert_to_tensor(A)
+    response, _ = tf.while_loop(
+        lambda response, _: tf.shape(response)[-1] < length,
+        double,
+        (tf.convert_to_tensor(B, dtype=A.dtype), A),
+        shape_invariants=(A.shape[:-1].concatenate([None]), A.shape),
+    )
+    return response[..., :length]
+
+
+def _hidden_kernel_mask(units, structure, blocks, mask):
+    """
+    Returns the ``(n_blocks, n_blocks)`` block mask of a block-structured kernel.
+
+    ``mask[i, j]`` is True if the ``i``-th block of hidden units feeds into the
+    ``j``-th block.
+    """
+
+    if structure == "block_diagonal":
+        if blocks is None:
+            raise ValueError("hidden_kernel_structure='%s' requires blocks" % structure)
+        mask = np.eye(blocks, dtype=bool)
+    elif mask is None:
+        raise ValueError("hidden_kernel_structure='%s' requires a mask" % structure)
+
+    mask = np.asarray(mask, dtype=bool)
+    if mask.ndim != 2 or mask.shape[0] != mask.shape[1]:
+        raise ValueError("hidden_kernel_mask must be square; got %s" % (mask.shape,))
+    if units % mask.shape[0] != 0:
+        raise ValueError(
+            "units (%d) must be divisible by the number of blocks (%d)"
+            % (units, mask.shape[0])
+        )
+    return mask
+
+
+def _build_hidden_kernel(cell):
+    """
+    Adds the ``hidden_kernel`` weights of ``cell`` for its ``hidden_kernel_structure``.
+
+    - ``"dense"``: a ``(units, units)`` matrix.
+    - ``"low_rank"``: ``(units, rank)`` and ``(rank, units)`` factors
+      (``hidden_kernel`` and ``hidden_kernel_mixing``).
+    - ``"block_diagonal"``: ``(n_blocks, block_size, block_size)`` diagonal blocks.
+    - ``"block_sparse"``: ``(n_nonzero, block_size, block_size)`` blocks, for the
+      nonzero entries of ``hidden_kernel_mask`` (in row-major order).
+    """
+
+    structure = cell.hidden_kernel_structure
+    units = cell.units
+
+    if structure == "dense":
+        shape = (units, units)
+    elif structure == "low_rank":
+        shape = (units, cell.hidden_kernel_rank)
+    else:
+        mask = _hidden_kernel_mask(
+            units, structure, cell.hidden_kernel_blocks, cell.hidden_kernel_mask
+        )
+        block_size = units // mask.shape[0]
+        shape = (int(mask.sum()), block_size, block_size)
+        cell._hidden_kernel_blocks = np.nonzero(mask)
+
+    cell.hidden_kernel = cell.add_weight(
+        name="hidden_kernel",
+        shape=shape,
+        initializer=cell.hidden_kernel_initializer,
+        trainable=cell.trainable_hidden_kernel,
+    )
+
+    if structure == "low_rank":
+        cell.hidden_kernel_mixing = cell.add_weight(
+            name="hidden_kernel_mixing",
+            shape=(cell.hidden_kernel_rank, units),
+            # a separate instance, so that the two factors are not identical
+            initializer=initializers.get(
+                initializers.serialize(cell.hidden_kernel_initializer)
+            ),
+            trainable=cell.trainable_hidden_kernel,
+        )
+
+
+def _apply_hidden_kernel(cell, h):
+    """
+    Computes ``h`` times the (structured) ``hidden_kernel`` of ``cell``.
+    """
+
+    structure = cell.hidden_kernel_structure
+
+    if structure == "dense":
+        return K.dot(h, cell.hidden_kernel)
+
+    if structure == "low_rank":
+        return K.dot(K.dot(h, cell.hidden_kernel), cell.hidden_kernel_mixing)
+
+    n_blocks = cell.units // cell.hidden_kernel.shape[-1]
+    h = K.reshape(h, (-1, n_blocks, cell.units // n_blocks))
+    if structure == "block_diagonal":
+        h = tf.einsum("bni,nij->bnj", h, cell.hidden_kernel)
+    else:
+        rows, cols = cell._hidden_kernel_blocks
+        h = tf.einsum("bki,kij->kbj", tf.gather(h, rows, axis=1), cell.hidden_kernel)
+        h = tf.transpose(
+            tf.math.unsorted_segment_sum(h, cols, n_blocks), perm=[1, 0, 2]
+        )
+    return K.reshape(h, (-1, cell.units))
+
+
+def dense_hidden_kernel(cell):
+    """
+    Returns the ``hidden_kernel`` of ``cell`` as a dense ``(units, units)`` array.
+
+    ``cell`` is a built ``LMUCell`` or ``LMUCellGating``, with any
+    ``hidden_kernel_structure``.
+    """
+
+    structure = cell.hidden_kernel_structure
+    kernel = K.get_value(cell.hidden_kernel)
+
+    if structure == "dense":
+        return kernel
+
+    if structure == "low_rank":
+        return kernel.dot(K.get_value(cell.hidden_kernel_mixing))
+
+    n_blocks = cell.units // kernel.shape[-1]
+    dense = np.zeros((n_blocks, kernel.shape[-1], n_blocks, kernel.shape[-1]))
+    if structure == "block_diagonal":
+        rows = cols = np.arange(n_blocks)
+    else:
+        rows, cols = cell._hidden_kernel_blocks
+    dense[rows, :, cols, :] = kernel
+    return dense.reshape((cell.units, cell.units)).astype(kernel.dtype)
+
+
+def _hidden_kernel_config(cell):
+    """Returns the config entries of the ``hidden_kernel`` structure of ``cell``."""
+    return dict(
+        hidden_kernel_structure=cell.hidden_kernel_structure,
+        hidden_kernel_rank=cell.hidden_kernel_rank,
+        hidden_kernel_blocks=cell.hidden_kernel_blocks,
+        hidden_kernel_mask=cell.hidden_kernel_mask,
+    )
+
+
+def _set_hidden_kernel_structure(cell, structure, rank, blocks, mask):
+    """
+    Validates and stores the ``hidden_kernel`` structure options on ``cell`` (or on an
+    ``LMU`` layer, which passes them on to its cell).
+    """
+
+    if structure not in ("dense", "low_rank", "block_diagonal", "block_sparse"):
+        raise ValueError("Unknown hidden_kernel_structure='%s'" % structure)
+    if structure == "low_rank" and rank is None:
+        raise ValueError("hidden_kernel_structure='low_rank' requires a rank")
+    if structure in ("block_diagonal", "block_sparse"):
+        _hidden_kernel_mask(cell.units, structure, blocks, mask)
+
+    cell.hidden_kernel_structure = structure
+    cell.hidden_kernel_rank = rank
+    cell.hidden_kernel_blocks = blocks
+    # stored as nested tuples, so that the config is serializable
+    cell.hidden_kernel_mask = (
+        None if mask is None else tuple(tuple(bool(x) for x in r) for r in mask)
+    )
+
+
+def _step_input_shape(input_shape):
+    """
+    Returns the shape of the inputs, given the shape of ``(inputs, reset)`` steps.
+    """
+
+    if isinstance(input_shape[0], (list, tuple, tf.TensorShape)):
+        return input_shape[0]
+    return input_shape
+
+
+def _reset_states(inputs, states):
+    """
+    Splits ``(inputs, reset)`` steps, and zeros ``states`` where ``reset`` is 1.
+    """
+
+    if not isinstance(inputs, (list, tuple)):
+        return inputs, states
+
+    inputs, reset = inputs
+    keep = 1 - tf.cast(reset, inputs.dtype)
+    return inputs, [state * keep for state in states]
+
+
+def _stride_inputs(inputs, mask, stride, stride_reduction):
+    """
+    Reduces each block of ``stride`` timesteps (and mask) to a single timestep.
+
+    Sequences are padded at the start, so that the last input always ends a block.
+    """
+
+    if stride == 1:
+        return inputs, mask
+
+    batch_size = tf.shape(inputs)[0]
+    padding = -tf.shape(inputs)[1] % stride
+    inputs = tf.pad(inputs, [[0, 0], [padding, 0], [0, 0]])
+    blocks = tf.reshape(inputs, (batch_size, -1, stride, inputs.shape[-1]))
+    if stride_reduction == "last":
+        inputs = blocks[:, :, -1]
+    else:
+        inputs = tf.reduce_mean(blocks, axis=2)
+
+    if mask is not None:
+        mask = tf.pad(mask, [[0, 0], [padding, 0]])
+        mask = tf.reduce_any(tf.reshape(mask, (batch_size, -1, stride)), 2)
+
+    return inputs, mask
+
+
+def _segment_resets(segment_ids, dtype):
+    """
+    Returns ``(batch, timesteps, 1)`` resets, which are 1 where a new segment starts.
+
+    A segment starts wherever ``segment_ids`` changes from the previous timestep.
+    """
+
+    segment_ids = tf.convert_to_tensor(segment_ids)
+    resets = tf.not_equal(segment_ids[:, 1:], segment_ids[:, :-1])
+    resets = tf.pad(tf.cast(resets, dtype), [[0, 0], [1, 0]])
+    return tf.expand_dims(resets, -1)
+
+
+def _segment_positions(segment_ids):
+    """
+    Returns the segment index and the position within it of each (flattened) step.
+
+    Segments are numbered consecutively across the batch, with a new segment starting
+    at the start of each row and wherever ``segment_ids`` changes.
+    """
+
+    segment_ids = tf.convert_to_tensor(segment_ids)
+    starts = tf.concat(
+        [
+            tf.ones_like(segment_ids[:, :1], dtype=tf.bool),
+            tf.not_equal(segment_ids[:, 1:], segment_ids[:, :-1]),
+        ],
+        axis=1,
+    )
+    segments = tf.cumsum(tf.cast(tf.reshape(starts, (-1,)), tf.int32)) - 1
+    steps = tf.range(tf.size(segments))
+    first = tf.math.unsorted_segment_min(steps, segments, segments[-1] + 1)
+    return segments, steps - tf.gather(first, segments)
+
+
 class LMUCell(Layer):
     """
     Cell class for the LMU layer.
@@ -40,6 +374,24 @@ class LMUCell(Layer):
     This class processes one step within the whole time sequence input. Use the ``LMU``
     class to create a recurrent Keras layer to process the whole sequence. Calling
     ``LMU()`` is equivalent to doing ``RNN(LMUCell())``.
+
+    With ``stride=k``, each step advances the memory by ``k`` timesteps at once (using
+    the exact discretization of the system with ``dt=k``, holding the input constant
+    over the block), while ``theta`` remains in units of the original timestep.
+
+    For wide layers, ``hidden_kernel_structure`` can replace the dense
+    ``(units, units)`` ``hidden_kernel`` with a ``"low_rank"`` factorization (of
+    ``hidden_kernel_rank``), a ``"block_diagonal"`` matrix (of ``hidden_kernel_blocks``
+    blocks), or a ``"block_sparse"`` matrix with a fixed ``hidden_kernel_mask`` of
+    nonzero blocks. Only the structured weights are stored and multiplied. See
+    ``lmu.reduction.structure_hidden_kernel`` to convert a trained dense kernel.
+
+    To evaluate several sequences packed end-to-end into one row (see
+    ``lmu.utils.pack_sequences``), each step can be given as an ``(inputs, reset)``
+    pair (e.g., ``RNN(cell)((inputs, resets))``), where ``reset`` has shape
+    ``(batch, 1)`` and is 1 at the first step of each new sequence. The states are
+    then zeroed before that step. The same applies to ``LMUCellGating`` and
+    ``LMUCellODE``.
     """
 
     def __init__(
@@ -65,6 +417,11 @@ class LMUCell(Layer):
         hidden_kernel_initializer="glorot_normal",
         memory_kernel_initializer="glorot_normal",
         hidden_activation="tanh",
+        stride=1,
+        hidden_kernel_structure="dense",
+        hidden_kernel_rank=None,
+        hidden_kernel_blocks=None,
+        hidden_kernel_mask=None,
         **kwargs
     ):
         super().__init__(**kwargs)
@@ -92,10 +449,21 @@ class LMUCell(Layer):
         self.memory_kernel_initializer = initializers.get(memory_kernel_initializer)
 
         self.hidden_activation = activations.get(hidden_activation)
+        self.stride = stride
+        _set_hidden_kernel_structure(
+            self,
+            hidden_kernel_structure,
+            hidden_kernel_rank,
+            hidden_kernel_blocks,
+            hidden_kernel_mask,
+        )
 
         self._realizer_result = realizer(factory(theta=theta, order=self.order))
-        self._ss = cont2discrete(
-            self._realizer_result.realization, dt=1.0, method=method
+        self._ss = _cont2discrete(
+            self._realizer_result.realization,
+            dt=stride,
+            method=method,
+            **_system_key(theta, order, realizer, factory)
         )
         self._A = self._ss.A - np.eye(order)  # puts into form: x += Ax
         self._B = self._ss.B
@@ -126,7 +494,7 @@ class LMUCell(Layer):
         Initializes various network parameters.
         """
 
-        input_dim = input_shape[-1]
+        input_dim = _step_input_shape(input_shape)[-1]
 
         # TODO: add regularizers
 
@@ -158,12 +526,7 @@ class LMUCell(Layer):
             trainable=self.trainable_input_kernel,
         )
 
-        self.hidden_kernel = self.add_weight(
-            name="hidden_kernel",
-            shape=(self.units, self.units),
-            initializer=self.hidden_kernel_initializer,
-            trainable=self.trainable_hidden_kernel,
-        )
+        _build_hidden_kernel(self)
 
         self.memory_kernel = self.add_weight(
             name="memory_kernel",
@@ -193,7 +556,7 @@ class LMUCell(Layer):
         Contains the logic for one LMU step calculation.
         """
 
-        h, m = states
+        inputs, (h, m) = _reset_states(inputs, states)
 
         u = (
             K.dot(inputs, self.input_encoders)
@@ -205,7 +568,7 @@ class LMUCell(Layer):
 
         h = self.hidden_activation(
             K.dot(inputs, self.input_kernel)
-            + K.dot(h, self.hidden_kernel)
+            + _apply_hidden_kernel(self, h)
             + K.dot(m, self.memory_kernel)
         )
 
@@ -223,7 +586,6 @@ class LMUCell(Layer):
                 order=self.order,
                 theta=self.theta,
                 method=self.method,
-                factory=self.factory,
                 trainable_input_encoders=self.trainable_input_encoders,
                 trainable_hidden_encoders=self.trainable_hidden_encoders,
                 trainable_memory_encoders=self.trainable_memory_encoders,
@@ -232,15 +594,30 @@ class LMUCell(Layer):
                 trainable_memory_kernel=self.trainable_memory_kernel,
                 trainable_A=self.trainable_A,
                 trainable_B=self.trainable_B,
-                input_encorders_initializer=self.input_encoders_initializer,
-                hidden_encoders_initializer=self.hidden_encoders_initializer,
-                memory_encoders_initializer=self.memory_encoders_initializer,
-                input_kernel_initializer=self.input_kernel_initializer,
-                hidden_kernel_initializer=self.hidden_kernel_initializer,
-                memory_kernel_initializer=self.memory_kernel_initializer,
-                hidden_activation=self.hidden_activation,
+                input_encoders_initializer=initializers.serialize(
+                    self.input_encoders_initializer
+                ),
+                hidden_encoders_initializer=initializers.serialize(
+                    self.hidden_encoders_initializer
+                ),
+                memory_encoders_initializer=initializers.serialize(
+                    self.memory_encoders_initializer
+                ),
+                input_kernel_initializer=initializers.serialize(
+                    self.input_kernel_initializer
+                ),
+                hidden_kernel_initializer=initializers.serialize(
+                    self.hidden_kernel_initializer
+                ),
+                memory_kernel_initializer=initializers.serialize(
+                    self.memory_kernel_initializer
+                ),
+                hidden_activation=activations.serialize(self.hidden_activation),
+                stride=self.stride,
             )
         )
+        config.update(_hidden_kernel_config(self))
+        config.update(_realization_config(self.realizer, self.factory))
 
         return config
 
@@ -255,9 +632,43 @@ class InputScaled(Initializer):
     def __call__(self, shape, dtype=None):
         return K.constant(self.value / shape[0], shape=shape, dtype=dtype)
 
+    def get_config(self):
+        return dict(value=self.value)
+
 
 class LMUCellODE(Layer):
-    """Variant of LMUCell that supports backprop through the ODE solver."""
+    """
+    Variant of LMUCell that supports backprop through the ODE solver.
+
+    ``stride`` sets the initial ``dt``, so that each step advances the memory by
+    ``stride`` timesteps (see ``LMUCell``). With ``method="euler"``, each step is
+    ``stride`` Euler steps of ``dt / stride``, rather than one (less accurate) step of
+    ``dt``.
+
+    ``decoder_structure`` selects how the ``units * order`` memory is decoded:
+
+    - ``"dense"``: a full ``(units * order, output_size)`` matrix.
+    - ``"per_unit"``: each output reads only the memory of its own unit, through a
+      ``(units, order)`` matrix (equivalent to a block-diagonal dense matrix).
+    - ``"low_rank"``: a ``(units * order, decoder_rank)`` matrix followed by a
+      ``(decoder_rank, output_size)`` mixing matrix.
+    - ``"shared"``: one ``(order,)`` decoder shared by all units, followed by a
+      ``(units, output_size)`` mixing matrix.
+
+    By default, all structures except ``"low_rank"`` are initialized to the same
+    decoding as ``"dense"`` (i.e., each unit's output is its delayed input).
+
+    If ``dt_per_unit`` is True, each unit has its own ``dt`` (and therefore its own
+    effective ``theta``), so that one layer can learn memories of several timescales.
+    The ``(units, order, order)`` transitions are discretized together (with one
+    batched ``expm`` for ``method="zoh"``), and applied to the memory with a batched
+    matmul. This costs ``O(units * order**2)`` per step (the same as the shared
+    update), plus ``O(units * order**3)`` for the discretization.
+
+    Unless ``dt``, ``A`` or ``B`` are trainable, the discretization is computed once,
+    when the cell is created. Otherwise it is recomputed on every step of an
+    ``RNN``; use ``LMUODE`` to compute it once per sequence instead.
+    """
 
     def __init__(
         self,
@@ -271,12 +682,17 @@ class LMUCellODE(Layer):
         trainable_encoders=True,
         trainable_decoders=True,
         trainable_dt=False,
+        dt_per_unit=False,
         trainable_A=False,
         trainable_B=False,
         encoder_initializer=InputScaled(1.0),  # TODO
         decoder_initializer=None,  # TODO
+        decoder_mixing_initializer=None,
+        decoder_structure="dense",
+        decoder_rank=None,
         hidden_activation="linear",  # TODO
         output_activation="tanh",  # TODO
+        stride=1,
         **kwargs
     ):
         super().__init__(**kwargs)
@@ -291,8 +707,25 @@ class LMUCellODE(Layer):
         self.trainable_encoders = trainable_encoders
         self.trainable_decoders = trainable_decoders
         self.trainable_dt = trainable_dt
+        self.dt_per_unit = dt_per_unit
         self.trainable_A = trainable_A
         self.trainable_B = trainable_B
+        self.stride = stride
+        self.decoder_structure = decoder_structure
+        self.decoder_rank = decoder_rank
+
+        self.state_size = self.units * self.order  # flattened
+        self.output_size = self.state_size if return_states else self.units
+
+        if decoder_structure in ("per_unit", "shared") and return_states:
+            raise ValueError(
+                "decoder_structure='%s' requires return_states=False"
+                % decoder_structure
+            )
+        if decoder_structure == "low_rank" and decoder_rank is None:
+            raise ValueError("decoder_structure='low_rank' requires decoder_rank")
+        if decoder_structure not in ("dense", "per_unit", "low_rank", "shared"):
+            raise ValueError("Unknown decoder_structure='%s'" % decoder_structure)
 
         self._realizer_result = realizer(factory(theta=theta, order=self.order))
         self._ss = self._realizer_result.realization
@@ -302,18 +735,23 @@ class LMUCellODE(Layer):
         assert np.allclose(self._ss.D, 0)  # proper LTI
 
         self.encoder_initializer = initializers.get(encoder_initializer)
-        self.dt_initializer = initializers.get(Constant(1.0))
+        self.dt_initializer = initializers.get(Constant(float(stride)))
 
+        # the defaults depend on the other arguments, so are not stored in the config
+        self._default_initializers = dict(
+            decoder_initializer=decoder_initializer is None,
+            decoder_mixing_initializer=decoder_mixing_initializer is None,
+        )
         if decoder_initializer is None:
-            assert self._C.shape == (1, self.order)
-            C_full = np.zeros((self.units, self.order, self.units))
-            for i in range(self.units):
-                C_full[i, :, i] = self._C[0]
-            decoder_initializer = Constant(
-                C_full.reshape(self.units * self.order, self.units)
+            decoder_initializer = self._default_decoder_initializer()
+
+        if decoder_mixing_initializer is None:
+            decoder_mixing_initializer = (
+                ID() if decoder_structure == "shared" else "glorot_uniform"
             )
 
         self.decoder_initializer = initializers.get(decoder_initializer)
+        self.decoder_mixing_initializer = initializers.get(decoder_mixing_initializer)
         self.hidden_activation = activations.get(hidden_activation)
         self.output_activation = activations.get(output_activation)
 
@@ -329,9 +767,16 @@ class LMUCellODE(Layer):
         if not (self.trainable_dt or self.trainable_A or self.trainable_B):
             # This is a hack to speed up parts of the computational graph
             # that are static. This is not a general solution.
-            ss = cont2discrete(self._ss, dt=1.0, method=self.method)
-            AT = K.variable(ss.A.T)
-            B = K.variable(ss.B.T[None, ...])
+            euler = self.method == "euler"
+            ss = _cont2discrete(
+                self._ss,
+                dt=1 if euler else stride,
+                method=self.method,
+                **_system_key(theta, order, realizer, factory)
+            )
+            AT, B = _repeat_steps(ss.A.T, ss.B.T[None, ...], stride if euler else 1)
+            AT = K.variable(AT)
+            B = K.variable(B)
             self._solver = lambda: (AT, B)
 
         elif self.method == "euler":
@@ -343,15 +788,12 @@ class LMUCellODE(Layer):
         else:
             raise NotImplementedError("Unknown method='%s'" % self.method)
 
-        self.state_size = self.units * self.order  # flattened
-        self.output_size = self.state_size if return_states else self.units
-
     def build(self, input_shape):
         """
         Initializes various network parameters.
         """
 
-        input_dim = input_shape[-1]
+        input_dim = _step_input_shape(input_shape)[-1]
 
         # TODO: add regularizers
 
@@ -364,18 +806,39 @@ class LMUCellODE(Layer):
 
         self.dt = self.add_weight(
             name="dt",
-            shape=(1,),
+            shape=(self.units,) if self.dt_per_unit else (1,),
             initializer=self.dt_initializer,
             trainable=self.trainable_dt,
         )
 
+        if self.decoder_structure == "dense":
+            decoder_shape = (self.units * self.order, self.output_size)
+            mixing_shape = None
+        elif self.decoder_structure == "per_unit":
+            decoder_shape = (self.units, self.order)
+            mixing_shape = None
+        elif self.decoder_structure == "low_rank":
+            decoder_shape = (self.units * self.order, self.decoder_rank)
+            mixing_shape = (self.decoder_rank, self.output_size)
+        else:
+            decoder_shape = (self.order,)
+            mixing_shape = (self.units, self.output_size)
+
         self.decoders = self.add_weight(
             name="decoders",
-            shape=(self.units * self.order, self.output_size),
+            shape=decoder_shape,
             initializer=self.decoder_initializer,
             trainable=self.trainable_decoders,
         )
 
+        if mixing_shape is not None:
+            self.decoder_mixing = self.add_weight(
+                name="decoder_mixing",
+                shape=mixing_shape,
+                initializer=self.decoder_mixing_initializer,
+                trainable=self.trainable_decoders,
+            )
+
         self.AT = self.add_weight(
             name="AT",
             shape=(self.order, self.order),
@@ -396,9 +859,14 @@ class LMUCellODE(Layer):
         self.built = True
 
     def _euler(self):
-        AT = self.I + self.dt * self.AT
-        B = self.dt * self.B
-        return (AT, B)
+        dt = self.dt / self.stride
+        if self.dt_per_unit:
+            # (units, order, order) and (units, order)
+            dt = K.reshape(dt, (-1, 1, 1))
+            AT, B = _repeat_steps(self.I + dt * self.AT, dt * self.B, self.stride)
+            return (AT, B[:, 0])
+
+        return _repeat_steps(self.I + dt * self.AT, dt * self.B, self.stride)
 
     def _zoh(self):
         M = K.concatenate(
@@ -408,34 +876,169 @@ class LMUCellODE(Layer):
             ],
             axis=0,
         )
-        eM = K.tf.linalg.expm(self.dt * M)
+
+        if self.dt_per_unit:
+            # one batched expm for all units
+            eM = tf.linalg.expm(K.reshape(self.dt, (-1, 1, 1)) * M)
+            return (
+                tf.linalg.matrix_transpose(eM[:, : self.order, : self.order]),
+                eM[:, : self.order, self.order],
+            )
+
+        eM = tf.linalg.expm(self.dt * M)
         return (
             K.transpose(eM[: self.order, : self.order]),
             K.reshape(eM[: self.order, self.order :], self.B.shape),
         )
 
-    def call(self, inputs, states):
+    def _default_decoder_initializer(self):
+        """
+        Returns an initializer that decodes the delayed input for each unit.
+        """
+
+        assert self._C.shape == (1, self.order)
+        if self.decoder_structure == "dense":
+            # C_full[i, :, i] = C
+            C_full = np.einsum("ij,k->ikj", np.eye(self.units), self._C[0])
+            return Constant(C_full.reshape(self.units * self.order, self.units))
+        if self.decoder_structure == "per_unit":
+            return Constant(np.tile(self._C, (self.units, 1)))
+        if self.decoder_structure == "shared":
+            return Constant(self._C[0])
+        return "glorot_uniform"
+
+    def _decode(self, x):
+        """
+        Applies the (structured) decoders to the flattened memory ``x``.
+        """
+
+        if self.decoder_structure == "dense":
+            return K.dot(x, self.decoders)
+
+        if self.decoder_structure == "low_rank":
+            return K.dot(K.dot(x, self.decoders), self.decoder_mixing)
+
+        x = K.reshape(x, (-1, self.units, self.order))
+        if self.decoder_structure == "per_unit":
+            return tf.einsum("buo,uo->bu", x, self.decoders)
+
+        return K.dot(tf.einsum("buo,o->bu", x, self.decoders), self.decoder_mixing)
+
+    def call(self, inputs, states, constants=None):
         """
         Contains the logic for one LMU step calculation.
+
+        ``constants`` optionally gives the discretized ``(AT, B)``, if they have
+        already been computed for the sequence (see ``LMUODE``).
         """
 
+        inputs, states = _reset_states(inputs, states)
+
         u = K.dot(inputs, self.encoders)
 
         x = K.reshape(states[0], (-1, self.units, self.order))
 
-        AT, B = self._solver()
+        AT, B = self._solver() if constants is None else constants
 
-        x = K.dot(x, AT) + B * K.expand_dims(u, -1)
+        if len(AT.shape) == 3:
+            # separate transitions for each unit
+            x = tf.einsum("buo,uop->bup", x, AT) + B * K.expand_dims(u, -1)
+        else:
+            x = K.dot(x, AT) + B * K.expand_dims(u, -1)
 
         x = self.hidden_activation(K.reshape(x, (-1, self.units * self.order)))
 
-        y = self.output_activation(K.dot(x, self.decoders))
+        y = self.output_activation(self._decode(x))
 
         return y, [x]
 
+    def get_config(self):
+        """
+        Overrides the tensorflow get_config function.
+        """
+
+        config = super().get_config()
+        config.update(
+            dict(
+                units=self.units,
+                order=self.order,
+                theta=self.theta,
+                method=self.method,
+                return_states=self.return_states,
+                trainable_encoders=self.trainable_encoders,
+                trainable_decoders=self.trainable_decoders,
+                trainable_dt=self.trainable_dt,
+                dt_per_unit=self.dt_per_unit,
+                trainable_A=self.trainable_A,
+                trainable_B=self.trainable_B,
+                encoder_initializer=initializers.serialize(self.encoder_initializer),
+                decoder_structure=self.decoder_structure,
+                decoder_rank=self.decoder_rank,
+                hidden_activation=activations.serialize(self.hidden_activation),
+                output_activation=activations.serialize(self.output_activation),
+                stride=self.stride,
+            )
+        )
+        for name, default in self._default_initializers.items():
+            config[name] = (
+                None if default else initializers.serialize(getattr(self, name))
+            )
+        config.update(_realization_config(self.realizer, self.factory))
+
+        return config
+
+
+class LMUODE(Layer):
+    """
+    Layer evaluating an ``LMUCellODE`` over a sequence.
+
+    The discretized system is computed once per call (rather than on every step, as
+    in ``RNN(cell)``), and passed to each step of the RNN as a constant. This matters
+    when ``dt`` (or ``A`` or ``B``) is trainable, and especially with ``dt_per_unit``,
+    where the discretization costs ``O(units * order**3)``.
+    """
+
+    def __init__(self, cell, return_sequences=False, **kwargs):
+        super().__init__(**kwargs)
+
+        self.cell = cell
+        self.return_sequences = return_sequences
+        self.rnn = RNN(cell, return_sequences=return_sequences)
+
+    def build(self, input_shape):
+        """
+        Initializes network parameters.
+        """
+
+        self.rnn.build(input_shape)
+
+        self.built = True
+
+    def call(self, inputs):
+        """
+        Calls the layer with inputs.
+        """
+
+        return self.rnn(inputs, constants=list(self.cell._solver()))
+
 
 class LMUCellGating(Layer):
-    """Variant of LMUCell that supports gating mechanisms."""
+    """
+    Variant of LMUCell that supports gating mechanisms.
+
+    With ``input_only_gating=True``, the memory input and the forget gate are computed
+    from the inputs alone (i.e., there are no ``hidden_encoders``, ``memory_encoders``
+    or ``forget_hidden_kernel``). The memory is then a linear recurrence driven by
+    the inputs, which ``call_sequence`` evaluates for a whole sequence at once with a
+    chunked parallel scan (see ``LMUGating``).
+
+    With ``hidden_to_hidden=False`` there is no ``hidden_kernel``, so that (with
+    ``input_only_gating``) the hidden outputs of all timesteps depend only on the
+    memory and inputs, and ``call_sequence`` has no step-by-step recurrence left.
+
+    ``hidden_kernel_structure`` (and the related options) are the same as for
+    ``LMUCell``.
+    """
 
     def __init__(
         self,
@@ -468,6 +1071,12 @@ class LMUCellGating(Layer):
         hidden_activation="tanh",
         input_activation="linear",
         gate_activation="linear",
+        input_only_gating=False,
+        hidden_to_hidden=True,
+        hidden_kernel_structure="dense",
+        hidden_kernel_rank=None,
+        hidden_kernel_blocks=None,
+        hidden_kernel_mask=None,
         **kwargs
     ):
         super().__init__(**kwargs)
@@ -484,11 +1093,20 @@ class LMUCellGating(Layer):
         self.trainable_input_kernel = trainable_input_kernel
         self.trainable_hidden_kernel = trainable_hidden_kernel
         self.trainable_memory_kernel = trainable_memory_kernel
-        self.trainable_forget_input_kernel = (trainable_forget_input_kernel,)
+        self.trainable_forget_input_kernel = trainable_forget_input_kernel
         self.trainable_forget_hidden_kernel = trainable_forget_hidden_kernel
         self.trainable_forget_bias = trainable_forget_bias
         self.trainable_A = trainable_A
         self.trainable_B = trainable_B
+        self.input_only_gating = input_only_gating
+        self.hidden_to_hidden = hidden_to_hidden
+        _set_hidden_kernel_structure(
+            self,
+            hidden_kernel_structure,
+            hidden_kernel_rank,
+            hidden_kernel_blocks,
+            hidden_kernel_mask,
+        )
 
         self.input_encoders_initializer = initializers.get(input_encoders_initializer)
         self.hidden_encoders_initializer = initializers.get(hidden_encoders_initializer)
@@ -509,8 +1127,11 @@ class LMUCellGating(Layer):
         self.gate_activation = activations.get(gate_activation)
 
         self._realizer_result = realizer(factory(theta=theta, order=self.order))
-        self._ss = cont2discrete(
-            self._realizer_result.realization, dt=1.0, method=method
+        self._ss = _cont2discrete(
+            self._realizer_result.realization,
+            dt=1.0,
+            method=method,
+            **_system_key(theta, order, realizer, factory)
         )
         self._A = self._ss.A - np.eye(order)  # puts into form: x += Ax
         self._B = self._ss.B
@@ -541,7 +1162,7 @@ class LMUCellGating(Layer):
         Initializes various network parameters.
         """
 
-        input_dim = input_shape[-1]
+        input_dim = _step_input_shape(input_shape)[-1]
 
         # TODO: add regularizers
 
@@ -552,19 +1173,20 @@ class LMUCellGating(Layer):
             trainable=self.trainable_input_encoders,
         )
 
-        self.hidden_encoders = self.add_weight(
-            name="hidden_encoders",
-            shape=(self.units, 1),
-            initializer=self.hidden_encoders_initializer,
-            trainable=self.trainable_hidden_encoders,
-        )
+        if not self.input_only_gating:
+            self.hidden_encoders = self.add_weight(
+                name="hidden_encoders",
+                shape=(self.units, 1),
+                initializer=self.hidden_encoders_initializer,
+                trainable=self.trainable_hidden_encoders,
+            )
 
-        self.memory_encoders = self.add_weight(
-            name="memory_encoders",
-            shape=(self.order, 1),
-            initializer=self.memory_encoders_initializer,
-            trainable=self.trainable_memory_encoders,
-        )
+            self.memory_encoders = self.add_weight(
+                name="memory_encoders",
+                shape=(self.order, 1),
+                initializer=self.memory_encoders_initializer,
+                trainable=self.trainable_memory_encoders,
+            )
 
         self.input_kernel = self.add_weight(
             name="input_kernel",
@@ -573,12 +1195,8 @@ class LMUCellGating(Layer):
             trainable=self.trainable_input_kernel,
         )
 
-        self.hidden_kernel = self.add_weight(
-            name="hidden_kernel",
-            shape=(self.units, self.units),
-            initializer=self.hidden_kernel_initializer,
-            trainable=self.trainable_hidden_kernel,
-        )
+        if self.hidden_to_hidden:
+            _build_hidden_kernel(self)
 
         self.memory_kernel = self.add_weight(
             name="memory_kernel",
@@ -594,12 +1212,13 @@ class LMUCellGating(Layer):
             trainable=self.trainable_forget_input_kernel,
         )
 
-        self.forget_hidden_kernel = self.add_weight(
-            name="forget_hidden_kernel",
-            shape=(self.units, self.order),
-            initializer=self.forget_input_kernel_initializer,
-            trainable=self.trainable_forget_input_kernel,
-        )
+        if not self.input_only_gating:
+            self.forget_hidden_kernel = self.add_weight(
+                name="forget_hidden_kernel",
+                shape=(self.units, self.order),
+                initializer=self.forget_hidden_kernel_initializer,
+                trainable=self.trainable_forget_hidden_kernel,
+            )
 
         self.forget_bias = self.add_weight(
             name="forget_bias",
@@ -629,42 +1248,294 @@ class LMUCellGating(Layer):
         Contains the logic for one LMU step calculation.
         """
 
-        h, m = states
+        inputs, (h, m) = _reset_states(inputs, states)
 
-        u = self.input_activation(
-            (
-                K.dot(inputs, self.input_encoders)
-                + K.dot(h, self.hidden_encoders)
-                + K.dot(m, self.memory_encoders)
+        if self.input_only_gating:
+            m = m + K.dot(m, self.AT) + self._memory_input(inputs)
+        else:
+            u = self.input_activation(
+                (
+                    K.dot(inputs, self.input_encoders)
+                    + K.dot(h, self.hidden_encoders)
+                    + K.dot(m, self.memory_encoders)
+                )
             )
-        )
 
-        f = self.gate_activation(
-            K.dot(inputs, self.forget_input_kernel)
-            + K.dot(h, self.forget_hidden_kernel)
-            + self.forget_bias
-        )
+            f = self.gate_activation(
+                K.dot(inputs, self.forget_input_kernel)
+                + K.dot(h, self.forget_hidden_kernel)
+                + self.forget_bias
+            )
 
-        m = m + K.dot(m, self.AT) + f * K.dot(u, self.BT)
+            m = m + K.dot(m, self.AT) + f * K.dot(u, self.BT)
 
-        h = self.hidden_activation(
-            K.dot(inputs, self.input_kernel)
-            + K.dot(h, self.hidden_kernel)
-            + K.dot(m, self.memory_kernel)
-        )
+        x = K.dot(inputs, self.input_kernel) + K.dot(m, self.memory_kernel)
+        if self.hidden_to_hidden:
+            x += _apply_hidden_kernel(self, h)
+        h = self.hidden_activation(x)
 
         return h, [h, m]
 
+    def _memory_input(self, inputs):
+        """
+        Computes the gated memory input for ``input_only_gating``.
+        """
 
-class LMUCellFFT(Layer):
-    """
-    Cell class for the FFT variant of the LMU cell.
-
-    This class assumes no recurrent connections are desired.
+        u = self.input_activation(K.dot(inputs, self.input_encoders))
+        f = self.gate_activation(
+            K.dot(inputs, self.forget_input_kernel) + self.forget_bias
+        )
+        return f * K.dot(u, self.BT)
+
+    def call_sequence(self, inputs, initial_state=None, chunk_size=64):
+        """
+        Evaluates the cell on a whole ``(batch, timesteps, input_dim)`` sequence.
+
+        Requires ``input_only_gating``. The memory ``m[t] = m[t-1] A + v[t]`` (where
+        ``v`` is the gated input for all timesteps, computed at once) is evaluated with
+        a Hillis-Steele scan within each chunk of ``chunk_size`` timesteps, followed by
+        a sequential pass over the (much fewer) chunks to carry the state between them.
+        The hidden readout of the memory is computed with one batched matmul, leaving
+        only the ``hidden_kernel`` recurrence (if ``hidden_to_hidden``) to be evaluated
+        step by step.
+
+        Returns the hidden sequence and the final ``[h, m]`` states, which match those
+        of ``RNN(cell)``.
+        """
+
+        if not self.input_only_gating:
+            raise ValueError("call_sequence requires input_only_gating=True")
+
+        batch_size = tf.shape(inputs)[0]
+        if initial_state is None:
+            h0 = tf.zeros((batch_size, self.units), dtype=inputs.dtype)
+            m0 = tf.zeros((batch_size, self.order), dtype=inputs.dtype)
+        else:
+            h0, m0 = initial_state
+
+        m = self._scan_memory(self._memory_input(inputs), m0, chunk_size)
+
+        drive = K.dot(inputs, self.input_kernel) + K.dot(m, self.memory_kernel)
+        if self.hidden_to_hidden:
+            h = tf.scan(
+                lambda h, x: self.hidden_activation(x + _apply_hidden_kernel(self, h)),
+                tf.transpose(drive, perm=[1, 0, 2]),
+                initializer=h0,
+            )
+            h = tf.transpose(h, perm=[1, 0, 2])
+        else:
+            h = self.hidden_activation(drive)
+
+        return h, [h[:, -1], m[:, -1]]
+
+    def _scan_memory(self, v, m0, chunk_size):
+        """
+        Evaluates ``m[t] = m[t-1] A + v[t]`` for all timesteps with a chunked scan.
+        """
+
+        A = tf.eye(self.order, dtype=v.dtype) + self.AT
+        batch_size = tf.shape(v)[0]
+        seq_length = tf.shape(v)[1]
+        n_chunks = -(-seq_length // chunk_size)
+
+        # pad the end, so that the sequence divides into chunks (causal)
+        v = tf.pad(v, [[0, 0], [0, n_chunks * chunk_size - seq_length], [0, 0]])
+        v = tf.reshape(v, (batch_size, n_chunks, chunk_size, self.order))
+
+        # within each chunk: v[k] <- sum_{j <= k} v[j] A^(k - j), starting from zero
+        power = A
+        powers = [A]  # powers[k] = A^(k + 1)
+        shift = 1
+        while shift < chunk_size:
+            shifted = tf.pad(v[:, :, :-shift], [[0, 0], [0, 0], [shift, 0], [0, 0]])
+            v = v + tf.einsum("bnko,op->bnkp", shifted, power)
+            powers += [tf.matmul(p, power) for p in powers]
+            power = tf.matmul(power, power)
+            shift *= 2
+        powers = tf.stack(powers[:chunk_size])
+
+        # between chunks: the state entering each chunk, starting from m0
+        ends = tf.scan(
+            lambda m, x: K.dot(m, powers[-1]) + x,
+            tf.transpose(v[:, :, -1], perm=[1, 0, 2]),
+            initializer=m0,
+        )
+        starts = tf.concat([m0[None], ends[:-1]], axis=0)
+        v = v + tf.einsum("nbo,kop->bnkp", starts, powers)
+
+        return tf.reshape(v, (batch_size, -1, self.order))[:, :seq_length]
+
+    def get_config(self):
+        """
+        Overrides the tensorflow get_config function.
+        """
+
+        config = super().get_config()
+        config.update(
+            dict(
+                units=self.units,
+                order=self.order,
+                theta=self.theta,
+                method=self.method,
+                trainable_input_encoders=self.trainable_input_encoders,
+                trainable_hidden_encoders=self.trainable_hidden_encoders,
+                trainable_memory_encoders=self.trainable_memory_encoders,
+                trainable_input_kernel=self.trainable_input_kernel,
+                trainable_hidden_kernel=self.trainable_hidden_kernel,
+                trainable_memory_kernel=self.trainable_memory_kernel,
+                trainable_forget_input_kernel=self.trainable_forget_input_kernel,
+                trainable_forget_hidden_kernel=self.trainable_forget_hidden_kernel,
+                trainable_forget_bias=self.trainable_forget_bias,
+                trainable_A=self.trainable_A,
+                trainable_B=self.trainable_B,
+                input_encoders_initializer=initializers.serialize(
+                    self.input_encoders_initializer
+                ),
+                hidden_encoders_initializer=initializers.serialize(
+                    self.hidden_encoders_initializer
+                ),
+                memory_encoders_initializer=initializers.serialize(
+                    self.memory_encoders_initializer
+                ),
+                input_kernel_initializer=initializers.serialize(
+                    self.input_kernel_initializer
+                ),
+                hidden_kernel_initializer=initializers.serialize(
+                    self.hidden_kernel_initializer
+                ),
+                memory_kernel_initializer=initializers.serialize(
+                    self.memory_kernel_initializer
+                ),
+                forget_input_kernel_initializer=initializers.serialize(
+                    self.forget_input_kernel_initializer
+                ),
+                forget_hidden_kernel_initializer=initializers.serialize(
+                    self.forget_hidden_kernel_initializer
+                ),
+                forget_bias_initializer=initializers.serialize(
+                    self.forget_bias_initializer
+                ),
+                hidden_activation=activations.serialize(self.hidden_activation),
+                input_activation=activations.serialize(self.input_activation),
+                gate_activation=activations.serialize(self.gate_activation),
+                input_only_gating=self.input_only_gating,
+                hidden_to_hidden=self.hidden_to_hidden,
+            )
+        )
+        config.update(_hidden_kernel_config(self))
+        config.update(_realization_config(self.realizer, self.factory))
+
+        return config
+
+
+class LMUGating(Layer):
+    """
+    Layer evaluating an ``LMUCellGating`` over a sequence.
+
+    If the cell has ``input_only_gating``, the memory is evaluated with the parallel
+    scan of ``LMUCellGating.call_sequence``. Otherwise, this falls back to a Keras RNN
+    layer, stepping through the sequence.
+
+    Note that the ``hidden_kernel`` recurrence is still evaluated step by step (with a
+    ``tf.scan``) on the parallel path, so the whole sequence is only evaluated in
+    parallel if the cell also has ``hidden_to_hidden=False``.
+    """
+
+    def __init__(self, cell, return_sequences=False, chunk_size=64, **kwargs):
+        super().__init__(**kwargs)
+
+        self.cell = cell
+        self.return_sequences = return_sequences
+        self.chunk_size = chunk_size
+
+        if not cell.input_only_gating:
+            self.rnn = RNN(cell, return_sequences=return_sequences)
+
+    def build(self, input_shape):
+        """
+        Initializes network parameters.
+        """
+
+        if self.cell.input_only_gating:
+            self.cell.build((input_shape[0], input_shape[-1]))
+        else:
+            self.rnn.build(input_shape)
+
+        self.built = True
+
+    def call(self, inputs):
+        """
+        Calls the layer with inputs.
+        """
+
+        if not self.cell.input_only_gating:
+            return self.rnn.call(inputs)
+
+        h, _ = self.cell.call_sequence(inputs, chunk_size=self.chunk_size)
+        return h if self.return_sequences else h[:, -1]
+
+    def get_config(self):
+        """
+        Overrides the tensorflow get_config function.
+        """
+
+        config = super().get_config()
+        config.update(
+            dict(
+                cell=self.cell.get_config(),
+                return_sequences=self.return_sequences,
+                chunk_size=self.chunk_size,
+            )
+        )
+
+        return config
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates the layer (and its ``LMUCellGating``) from a config.
+        """
+
+        config = dict(config)
+        config["cell"] = LMUCellGating.from_config(config["cell"])
+        return cls(**config)
+
+
+class LMUCellFFT(Layer):
+    """
+    Cell class for the FFT variant of the LMU cell.
+
+    This class assumes no recurrent connections are desired.
 
     Produces the output of the delay system by evaluating the convolution of the input
     sequence with the impulse response from the LMU cell. The convolution operation is
     calculated using the fast Fourier transform (FFT).
+
+    If only a few outputs are needed (``return_sequences=False``, or a handful of
+    ``output_timesteps``), they are instead evaluated directly as dot products with
+    the reversed impulse response.
+
+    As with ``LMUCell``, ``stride=k`` means that each input advances the memory by
+    ``k`` timesteps (relative to ``theta``).
+
+    With ``trainable_theta=True``, the window length is trained via backpropagation.
+    The impulse response is then recomputed in-graph on every call, by discretizing
+    the system with a matrix exponential and taking its powers by repeated doubling.
+
+    With ``bidirectional=True``, the sequence is also processed in reverse (with its
+    own ``backward_*`` weights), and the two directions are combined according to
+    ``merge_mode`` (``"concat"``, ``"sum"``, ``"ave"`` or ``"mul"``), as with
+    ``tf.keras.layers.Bidirectional``. Both directions share one impulse response
+    spectrum, and their inputs are transformed with one batched FFT.
+
+    If ``segment_ids`` are given (with shape ``(batch, timesteps)``), each row holds
+    several sequences packed end-to-end (see ``lmu.utils.pack_sequences``), with a new
+    sequence starting wherever the id changes. The memory of each sequence then only
+    depends on its own inputs, as if it had been evaluated on its own. The segments of
+    all rows are scattered into a ``(segments, bucket_length(longest_segment))``
+    batch for the convolution (so that its FFT size depends on the longest segment,
+    rather than the row length), and gathered back; pass ``mask=segment_ids > 0`` so
+    that the padding at the end of packed rows does not count as a segment.
     """
 
     def __init__(
@@ -675,11 +1546,16 @@ class LMUCellFFT(Layer):
         trainable_input_encoders=True,
         trainable_input_kernel=True,
         trainable_memory_kernel=True,
+        trainable_theta=False,
         input_encoders_initializer="lecun_uniform",
         input_kernel_initializer="glorot_normal",
         memory_kernel_initializer="glorot_normal",
         hidden_activation="tanh",
         return_sequences=True,
+        output_timesteps=None,
+        stride=1,
+        bidirectional=False,
+        merge_mode="concat",
         **kwargs
     ):
         super().__init__(**kwargs)
@@ -691,6 +1567,7 @@ class LMUCellFFT(Layer):
         self.trainable_input_encoders = trainable_input_encoders
         self.trainable_input_kernel = trainable_input_kernel
         self.trainable_memory_kernel = trainable_memory_kernel
+        self.trainable_theta = trainable_theta
 
         self.input_encoders_initializer = initializers.get(input_encoders_initializer)
         self.input_kernel_initializer = initializers.get(input_kernel_initializer)
@@ -699,8 +1576,44 @@ class LMUCellFFT(Layer):
         self.hidden_activation = activations.get(hidden_activation)
 
         self.return_sequences = return_sequences
+        self.stride = stride
+        # if set, takes precedence over return_sequences; negative values are
+        # relative to the end of the sequence
+        self.output_timesteps = (
+            None
+            if output_timesteps is None
+            else tuple(int(t) for t in output_timesteps)
+        )
+        self.bidirectional = bidirectional
+        self.merge_mode = merge_mode
+
+        if merge_mode not in ("concat", "sum", "ave", "mul"):
+            raise ValueError("Unknown merge_mode='%s'" % merge_mode)
+        if bidirectional and self.output_timesteps is not None:
+            raise NotImplementedError(
+                "output_timesteps is not supported with bidirectional=True"
+            )
 
-        self.output_size = self.units
+        self._ss = _cont2discrete(
+            LegendreDelay(theta=theta, order=order),
+            dt=stride,
+            method="zoh",
+            **_system_key(theta, order, Identity(), LegendreDelay)
+        )
+        # continuous system for theta=1, in the form [[A, B], [0, 0]]; the system for
+        # any other theta is this scaled by 1 / theta
+        unit_ss = LegendreDelay(theta=1.0, order=order)
+        self._unit_system = np.zeros((order + 1, order + 1))
+        self._unit_system[:order, :order] = unit_ss.A
+        self._unit_system[:order, order:] = unit_ss.B
+
+        self._responses = {}
+        self._spectra = {}
+
+        self.output_size = (
+            2 * self.units if bidirectional and merge_mode == "concat" else self.units
+        )
+        self.supports_masking = True
 
     def build(self, input_shape):
         """
@@ -731,62 +1644,415 @@ class LMUCellFFT(Layer):
             trainable=self.trainable_memory_kernel,
         )
 
+        if self.bidirectional:
+            # separate initializer instances, so that the two directions differ
+            self.backward_input_encoders = self.add_weight(
+                name="backward_input_encoders",
+                shape=(input_dim, 1),
+                initializer=initializers.get(
+                    initializers.serialize(self.input_encoders_initializer)
+                ),
+                trainable=self.trainable_input_encoders,
+            )
+
+            self.backward_input_kernel = self.add_weight(
+                name="backward_input_kernel",
+                shape=(input_dim, self.units),
+                initializer=initializers.get(
+                    initializers.serialize(self.input_kernel_initializer)
+                ),
+                trainable=self.trainable_input_kernel,
+            )
+
+            self.backward_memory_kernel = self.add_weight(
+                name="backward_memory_kernel",
+                shape=(self.order, self.units),
+                initializer=initializers.get(
+                    initializers.serialize(self.memory_kernel_initializer)
+                ),
+                trainable=self.trainable_memory_kernel,
+            )
+
+        if self.trainable_theta:
+            self.theta_kernel = self.add_weight(
+                name="theta",
+                shape=(),
+                initializer=Constant(self.theta),
+                trainable=True,
+            )
+
         # Get the impulse response of the LMU cell
-        self.get_impulse_response()
+        if self.seq_length is None:
+            self.impulse_response = None
+        else:
+            self.get_impulse_response()
 
         self.built = True
 
-    def call(self, inputs):
+    def call(self, inputs, mask=None, segment_ids=None):
         """
         Logic for convolution between the encoded input and the impulse response.
-        """
-
-        # Apply input encoders
-        u = tf.matmul(inputs, self.input_encoders, name="input_encoder_mult")
-        # FFT requires shape (batch, 1, timesteps)
-        u = tf.transpose(u, perm=[0, 2, 1])
-
-        # Pad sequences to avoid circular convolution
-        input_padding = tf.constant([[0, 0], [0, 0], [0, 2 * self.seq_length]])
-        # Perform the FFT
-        fft_input = tf.signal.rfft(tf.pad(u, input_padding, name="input_pad"))
 
-        response_padding = tf.constant([[0, 0], [0, 2 * self.seq_length]])
-        fft_response = tf.signal.rfft(
-            tf.pad(self.impulse_response, response_padding, name="response_pad")
-        )
+        Masked timesteps are treated as zero input, which matches the ``LMUCell``
+        output for sequences padded at the end. In the backward direction, only the
+        unmasked part of each sequence is reversed.
+        """
 
-        # Elementwise product of FFT (broadcasting done automatically)
-        result = fft_input * fft_response
+        u = self._encode(inputs, mask)
 
-        # Inverse FFT
-        m = tf.signal.irfft(result)
-        if self.return_sequences:
+        if segment_ids is not None:
+            m, x = self._segment_memory(inputs, u, mask, segment_ids)
+        elif self.return_sequences and self.output_timesteps is None:
             # If return_sequences, return the whole sequence
-            m = m[:, :, : self.seq_length]
+            # FFT requires shape (batch, 1, timesteps)
+            m = self._convolve(tf.transpose(u, perm=[0, 2, 1]))
             m = tf.transpose(m, perm=[0, 2, 1])
             x = inputs
+            if self.bidirectional:
+                m, m_backward = tf.split(m, 2, axis=0)
+                m_backward = self._reverse(m_backward, mask)
+                x_backward = inputs
         else:
-            # Otherwise, just return the last item in the sequence
-            m = m[:, :, self.seq_length - 1]
-            x = inputs[:, self.seq_length - 1, :]
+            # Otherwise, only evaluate the requested timesteps
+            timesteps = self._get_timesteps(inputs, mask)
+            batch_dims = len(timesteps.shape) - 1
+            x = tf.gather(inputs, timesteps, axis=1, batch_dims=batch_dims)
+            if self.bidirectional:
+                if batch_dims:
+                    timesteps = tf.tile(timesteps, [2, 1])
+                m = self._evaluate(u[:, :, 0], timesteps)
+                m, m_backward = tf.split(m, 2, axis=0)
+                # the last step of the reversed sequence is aligned with the first
+                m_backward = m_backward[:, 0]
+                x_backward = inputs[:, 0]
+            else:
+                m = self._evaluate(u[:, :, 0], timesteps)
+            if self.output_timesteps is None:
+                m = m[:, 0]
+                x = x[:, 0]
 
         # Pass through hidden activation function
         h = self.hidden_activation(
             tf.matmul(m, self.memory_kernel) + tf.matmul(x, self.input_kernel)
         )
+
+        if self.bidirectional:
+            h_backward = self.hidden_activation(
+                tf.matmul(m_backward, self.backward_memory_kernel)
+                + tf.matmul(x_backward, self.backward_input_kernel)
+            )
+            h = self._merge(h, h_backward)
+
         return h
 
-    def get_impulse_response(self):
+    def _encode(self, inputs, mask):
+        """
+        Applies the input encoders, giving ``u`` with shape ``(batch, timesteps, 1)``.
+
+        If bidirectional, the encoded reversed sequences are stacked after these.
+        """
+
+        # Apply input encoders
+        u = tf.matmul(inputs, self.input_encoders, name="input_encoder_mult")
+        if mask is not None:
+            u *= tf.cast(tf.expand_dims(mask, -1), u.dtype)
+
+        if self.bidirectional:
+            # the reversed sequences are stacked along the batch axis, so that both
+            # directions go through the same (batched) FFT
+            u_backward = tf.matmul(
+                self._reverse(inputs, mask), self.backward_input_encoders
+            )
+            if mask is not None:
+                u_backward *= tf.cast(tf.expand_dims(mask, -1), u.dtype)
+            u = tf.concat([u, u_backward], axis=0)
+
+        return u
+
+    def _reverse(self, x, mask):
+        """
+        Reverses ``x`` along time, within the unmasked part of each sequence.
+        """
+
+        if mask is None:
+            return tf.reverse(x, axis=[1])
+
+        lengths = tf.reduce_sum(tf.cast(mask, tf.int32), axis=1)
+        return tf.reverse_sequence(x, lengths, seq_axis=1, batch_axis=0)
+
+    def _merge(self, h, h_backward):
+        """
+        Combines the outputs of the two directions according to ``merge_mode``.
+        """
+
+        if self.merge_mode == "concat":
+            return tf.concat([h, h_backward], axis=-1)
+        if self.merge_mode == "sum":
+            return h + h_backward
+        if self.merge_mode == "ave":
+            return (h + h_backward) / 2
+        return h * h_backward
+
+    def compute_mask(self, inputs, mask=None):
+        """
+        Propagates the input mask when returning sequences.
+        """
+        if self.return_sequences and self.output_timesteps is None:
+            return mask
+        return None
+
+    def _get_timesteps(self, inputs, mask):
+        """
+        Returns the output timesteps, with shape ``(k,)`` or ``(batch, k)``.
+
+        Without ``output_timesteps`` this is the last (unmasked) timestep.
+        """
+
+        seq_length = tf.shape(inputs)[1]
+        if self.output_timesteps is not None:
+            timesteps = tf.constant(self.output_timesteps, dtype=tf.int32)
+            return tf.where(timesteps < 0, timesteps + seq_length, timesteps)
+        if mask is None:
+            return tf.reshape(seq_length - 1, (1,))
+        last = tf.maximum(tf.reduce_sum(tf.cast(mask, tf.int32), axis=1) - 1, 0)
+        return tf.expand_dims(last, -1)
+
+    def _evaluate(self, u, timesteps):
+        """
+        Convolves ``u`` (shape ``(batch, timesteps)``) only at ``timesteps``.
+
+        Each output is a dot product between the input and the reversed impulse
+        response, which costs ``O(seq_length * order)``. When there are more outputs
+        than the ``log(seq_length)`` factor of the FFT, the FFT is used instead.
+        """
+
+        n_outputs = timesteps.shape[-1]
+        seq_length = u.shape[-1]
+        batch_dims = len(timesteps.shape) - 1
+
+        if seq_length is None:
+            max_direct = 16
+        else:
+            max_direct = max(np.log2(2 * bucket_length(seq_length)), 1)
+        if n_outputs is None or n_outputs > max_direct:
+            m = tf.transpose(self._convolve(tf.expand_dims(u, 1)), perm=[0, 2, 1])
+            return tf.gather(m, timesteps, axis=1, batch_dims=batch_dims)
+
+        response = self._response(u)
+        if not batch_dims:
+            lags = tf.expand_dims(timesteps, -1) - tf.range(tf.shape(u)[-1])
+            kernel = tf.gather(tf.transpose(response), tf.maximum(lags, 0))
+            kernel *= tf.expand_dims(tf.cast(lags >= 0, kernel.dtype), -1)
+            return tf.einsum("bt,kto->bko", u, kernel)
+
+        # with a different timestep in every row, the inputs (rather than the
+        # response) are reversed up to each output step, so that only one copy of
+        # the response is needed
+        batch_size = tf.shape(u)[0]
+        n_outputs = tf.shape(timesteps)[1]
+        u = tf.repeat(u, n_outputs, axis=0)
+        lengths = tf.reshape(timesteps, (-1,)) + 1
+        u = tf.reverse_sequence(u, lengths, seq_axis=1, batch_axis=0)
+        u *= tf.sequence_mask(lengths, tf.shape(u)[1], dtype=u.dtype)
+        m = tf.matmul(u, response, transpose_b=True)
+        return tf.reshape(m, (batch_size, n_outputs, self.order))
+
+    def _response(self, u):
+        """
+        Returns the impulse response, with shape ``(order, timesteps)``, for ``u``.
+        """
+
+        seq_length = u.shape[-1]
+        if seq_length is None or self.trainable_theta:
+            response = _impulse_response(*self._discretize(), tf.shape(u)[-1])
+            return tf.cast(response, u.dtype)
+
+        response = self._bucket_response(bucket_length(seq_length))
+        return tf.constant(response[:, :seq_length], dtype=u.dtype)
+
+    def _convolve(self, u):
+        """
+        Convolves ``u`` (shape ``(batch, 1, timesteps)``) with the impulse response.
+
+        Sequences with a known length share an FFT size (and cached response spectrum)
+        with all other lengths in the same ``bucket_length``. Sequences with an unknown
+        length (or a trainable theta) compute the impulse response in-graph.
+        """
+
+        seq_length = u.shape[-1]
+        if seq_length is None or self.trainable_theta:
+            fft_length = tf.reshape(2 * tf.shape(u)[-1], (1,))
+            fft_response = tf.signal.rfft(self._response(u), fft_length=fft_length)
+        else:
+            bucket = bucket_length(seq_length)
+            fft_length = [2 * bucket]
+            fft_response = tf.constant(self._response_spectrum(bucket))
+
+        # Padding to fft_length avoids circular convolution
+        fft_input = tf.signal.rfft(u, fft_length=fft_length)
+
+        # Elementwise product of FFT (broadcasting done automatically)
+        m = tf.signal.irfft(fft_input * fft_response, fft_length=fft_length)
+
+        return m[:, :, : tf.shape(u)[-1] if seq_length is None else seq_length]
+
+    def _segment_memory(self, inputs, u, mask, segment_ids):
+        """
+        Returns the memory of packed segments, and the inputs, at the output steps.
+        """
+
+        if self.bidirectional:
+            raise NotImplementedError(
+                "segment_ids are not supported with bidirectional=True"
+            )
+
+        m = self._convolve_segments(u, segment_ids, mask)
+        if self.return_sequences and self.output_timesteps is None:
+            return m, inputs
+
+        timesteps = self._get_timesteps(inputs, mask)
+        batch_dims = len(timesteps.shape) - 1
+        m = tf.gather(m, timesteps, axis=1, batch_dims=batch_dims)
+        x = tf.gather(inputs, timesteps, axis=1, batch_dims=batch_dims)
+        if self.output_timesteps is None:
+            return m[:, 0], x[:, 0]
+        return m, x
+
+    def _convolve_segments(self, u, segment_ids, mask=None):
+        """
+        Convolves each segment of ``u`` (shape ``(batch, timesteps, 1)``) separately.
+
+        Returns the memory with shape ``(batch, timesteps, order)``. Masked steps
+        (such as the padding at the end of packed rows) do not count towards the
+        longest segment, and their memory is not meaningful.
+        """
+
+        batch_size = tf.shape(u)[0]
+        seq_length = u.shape[1]
+        segments, positions = _segment_positions(segment_ids)
+        u = tf.reshape(u, (-1,))
+        if mask is not None:
+            # masked steps all go to the (zero) first step of their segment
+            mask = tf.reshape(tf.cast(mask, tf.bool), (-1,))
+            positions = tf.where(mask, positions, tf.zeros_like(positions))
+            u = tf.where(mask, u, tf.zeros_like(u))
+        longest = tf.reduce_max(positions) + 1
+
+        idxs = tf.stack([segments, positions], axis=1)
+
+        def convolve(row_length):
+            u_segments = tf.scatter_nd(
+                idxs, u, tf.stack([segments[-1] + 1, row_length])
+            )
+            m = self._convolve(tf.reshape(u_segments, (-1, 1, row_length)))
+            return tf.gather_nd(tf.transpose(m, perm=[0, 2, 1]), idxs)
+
+        if seq_length is None or self.trainable_theta:
+            m = convolve(longest)
+        else:
+            # each segment gets a row of the bucket of the longest segment, with one
+            # branch (and cached response spectrum) for each bucket up to that of
+            # the whole row
+            buckets = [1 << k for k in range(bucket_length(seq_length).bit_length())]
+            self._bucket_response(buckets[-1])
+            index = tf.reduce_sum(
+                tf.cast(tf.constant(buckets[:-1]) < longest, tf.int32)
+            )
+            m = tf.switch_case(
+                index, [functools.partial(convolve, bucket) for bucket in buckets]
+            )
+
+        return tf.reshape(m, (batch_size, -1, self.order))
+
+    def _discretize(self):
+        """
+        Returns the discrete ``(A, B)`` matrices for the current ``theta_kernel``.
+
+        These are differentiable with respect to ``theta_kernel``.
+        """
+
+        if not self.trainable_theta:
+            return tf.constant(self._ss.A), tf.constant(self._ss.B)
+
+        dt = self.stride / tf.cast(self.theta_kernel, tf.float64)
+        eM = tf.linalg.expm(dt * tf.constant(self._unit_system))
+        return eM[: self.order, : self.order], eM[: self.order, self.order :]
+
+    def _bucket_response(self, bucket):
+        if bucket not in self._responses:
+            longer = [b for b in self._responses if b > bucket]
+            if longer:
+                # the response is a prefix of that of any longer sequence
+                self._responses[bucket] = self._responses[min(longer)][:, :bucket]
+            else:
+                self._responses[bucket] = self.get_impulse_response(bucket)
+        return self._responses[bucket]
+
+    def _response_spectrum(self, bucket):
+        if bucket not in self._spectra:
+            response = self._bucket_response(bucket)
+            self._spectra[bucket] = np.fft.rfft(response, n=2 * bucket).astype(
+                np.result_type(K.floatx(), np.complex64)
+            )
+        return self._spectra[bucket]
+
+    def warm_up(self, seq_length):
+        """
+        Caches the impulse response spectrum for sequences of up to ``seq_length``.
+
+        The impulse response is simulated with an RNN, which cannot be done while
+        tracing a ``tf.function``, so this must be called (eagerly) before tracing
+        functions for sequences of that length. Shorter lengths are then covered as
+        well. Does nothing with ``trainable_theta=True``, where the response is
+        computed in the graph.
+        """
+
+        if not self.trainable_theta:
+            self._response_spectrum(bucket_length(seq_length))
+
+    def get_impulse_response(self, seq_length=None):
         """
         Obtains impulse response of delay system.
+
+        Defaults to the sequence length the layer was built with, in which case the
+        response is also stored in ``self.impulse_response``.
         """
 
+        store = seq_length is None
+        if store:
+            seq_length = self.seq_length
+
+        if self.trainable_theta:
+            with tf.init_scope():
+                response = K.get_value(
+                    _impulse_response(*self._discretize(), seq_length)
+                )
+        else:
+            response = self._cached_impulse_response(seq_length)
+        # Note: Shape of impulse_response is (order, timesteps)
+
+        if store:
+            self.impulse_response = tf.constant(response, dtype=K.floatx())
+        return response
+
+    def _cached_impulse_response(self, seq_length):
+        return cache.cached(
+            "impulse_response",
+            lambda: self._simulate_impulse_response(seq_length),
+            seq_length=int(seq_length),
+            dt=float(self.stride),
+            method="zoh",
+            dtype=K.floatx(),
+            **_system_key(self.theta, self.order, Identity(), LegendreDelay)
+        )
+
+    def _simulate_impulse_response(self, seq_length):
         delay_layer = RNN(
             LMUCell(
                 units=self.order,
                 order=self.order,
                 theta=self.theta,
+                stride=self.stride,
                 trainable_input_encoders=False,
                 trainable_hidden_encoders=False,
                 trainable_memory_encoders=False,
@@ -806,10 +2072,10 @@ class LMUCellFFT(Layer):
             return_sequences=True,
         )
 
-        impulse = tf.reshape(tf.eye(self.seq_length, 1), (1, self.seq_length, 1))
-
-        self.impulse_response = tf.squeeze(tf.transpose(delay_layer(impulse)), [-1])
-        # Note: Shape of impulse_response is (order, timesteps)
+        with tf.init_scope():
+            impulse = tf.reshape(tf.eye(seq_length, 1), (1, seq_length, 1))
+            response = tf.squeeze(tf.transpose(delay_layer(impulse)), [-1])
+            return K.get_value(response)
 
     def get_config(self):
         """
@@ -824,14 +2090,27 @@ class LMUCellFFT(Layer):
                 trainable_input_encoders=self.trainable_input_encoders,
                 trainable_input_kernel=self.trainable_input_kernel,
                 trainable_memory_kernel=self.trainable_memory_kernel,
-                input_encorders_initializer=self.input_encoders_initializer,
-                input_kernel_initializer=self.input_kernel_initializer,
-                memory_kernel_initializer=self.memory_kernel_initializer,
-                hidden_activation=self.hidden_activation,
+                trainable_theta=self.trainable_theta,
+                input_encoders_initializer=initializers.serialize(
+                    self.input_encoders_initializer
+                ),
+                input_kernel_initializer=initializers.serialize(
+                    self.input_kernel_initializer
+                ),
+                memory_kernel_initializer=initializers.serialize(
+                    self.memory_kernel_initializer
+                ),
+                hidden_activation=activations.serialize(self.hidden_activation),
                 return_sequences=self.return_sequences,
+                output_timesteps=self.output_timesteps,
+                stride=self.stride,
+                bidirectional=self.bidirectional,
+                merge_mode=self.merge_mode,
             )
         )
 
+        return config
+
 
 class LMU(Layer):
     """
@@ -844,13 +2123,34 @@ class LMU(Layer):
     such as its derivative, energy, median value, etc (*). Note that decoders can span
     across all of the units.
 
-    By default the window lengths are trained via backpropagation, as well as the
-    encoding and decoding weights.
+    By default the encoding and decoding weights are trained via backpropagation. The
+    window length can be trained as well (``trainable_theta``) when using the FFT
+    implementation described below; for the recurrent implementation, see
+    ``LMUCellODE`` with ``trainable_dt``.
 
     Optionally, the state-space matrices that implement the low-dimensional delay
     system can be trained as well, but these are shared across all of the units in the
     layer.
 
+    With ``stride=k``, the input is downsampled by taking the ``"last"`` (or the
+    ``"mean"``) input of each block of ``k`` timesteps, and each step of the delay
+    system advances by ``k`` timesteps. This reduces the number of sequential steps
+    ``k``-fold, while ``theta`` remains in units of the original timestep. The
+    output sequence (and ``output_timesteps``) is then in units of blocks.
+
+    ``hidden_kernel_structure`` (and the related options) select a structured
+    ``hidden_kernel`` for the recurrent implementation (see ``LMUCell``).
+
+    With ``bidirectional=True``, the sequence is processed in both directions, and the
+    outputs are combined according to ``merge_mode`` (as with
+    ``tf.keras.layers.Bidirectional``).
+
+    The layer can be called with ``segment_ids`` (with shape ``(batch, timesteps)``) to
+    evaluate several sequences packed end-to-end in each row (see
+    ``lmu.utils.pack_sequences``). A new sequence starts wherever the id changes,
+    which resets the states of the recurrent implementation, and separates the
+    convolutions of the FFT implementation (see ``LMUCellFFT``).
+
     Based on the occurrence of the recurrent connections, this layer will choose
     different implementations of evaluating the delay system.
 
@@ -887,6 +2187,7 @@ class LMU(Layer):
         trainable_input_kernel=True,
         trainable_hidden_kernel=True,
         trainable_memory_kernel=True,
+        trainable_theta=False,
         trainable_A=False,
         trainable_B=False,
         input_encoders_initializer="lecun_uniform",
@@ -897,6 +2198,15 @@ class LMU(Layer):
         memory_kernel_initializer="glorot_normal",
         hidden_activation="tanh",
         return_sequences=False,
+        output_timesteps=None,
+        stride=1,
+        stride_reduction="last",
+        bidirectional=False,
+        merge_mode="concat",
+        hidden_kernel_structure="dense",
+        hidden_kernel_rank=None,
+        hidden_kernel_blocks=None,
+        hidden_kernel_mask=None,
         **kwargs
     ):
         # Note: Setting memory_to_memory, hidden_to_memory, and hidden_to_hidden to
@@ -925,6 +2235,7 @@ class LMU(Layer):
             trainable_hidden_kernel if hidden_to_hidden else False
         )
         self.trainable_memory_kernel = trainable_memory_kernel
+        self.trainable_theta = trainable_theta
         self.trainable_A = trainable_A
         self.trainable_B = trainable_B
         self.input_encoders_initializer = input_encoders_initializer
@@ -941,8 +2252,28 @@ class LMU(Layer):
         self.memory_kernel_initializer = memory_kernel_initializer
         self.hidden_activation = hidden_activation
         self.return_sequences = return_sequences
+        self.output_timesteps = output_timesteps
+        self.stride = stride
+        self.stride_reduction = stride_reduction
+        self.bidirectional = bidirectional
+        self.merge_mode = merge_mode
+        _set_hidden_kernel_structure(
+            self,
+            hidden_kernel_structure,
+            hidden_kernel_rank,
+            hidden_kernel_blocks,
+            hidden_kernel_mask,
+        )
+
+        if stride_reduction not in ("last", "mean"):
+            raise ValueError("Unknown stride_reduction='%s'" % stride_reduction)
+        if bidirectional and output_timesteps is not None:
+            raise NotImplementedError(
+                "output_timesteps is not supported with bidirectional=True"
+            )
 
         super().__init__(**kwargs)
+        self.supports_masking = True
 
         if self.fft_check():
             self.lmu_layer = LMUCellFFT(
@@ -952,11 +2283,20 @@ class LMU(Layer):
                 trainable_input_encoders=self.trainable_input_encoders,
                 trainable_input_kernel=self.trainable_input_kernel,
                 trainable_memory_kernel=self.trainable_memory_kernel,
+                trainable_theta=self.trainable_theta,
                 input_encoders_initializer=self.input_encoders_initializer,
                 input_kernel_initializer=self.input_kernel_initializer,
                 memory_kernel_initializer=self.memory_kernel_initializer,
                 hidden_activation=self.hidden_activation,
                 return_sequences=self.return_sequences,
+                output_timesteps=self.output_timesteps,
+                stride=self.stride,
+                bidirectional=self.bidirectional,
+                merge_mode=self.merge_mode,
+            )
+        elif self.trainable_theta:
+            raise NotImplementedError(
+                "trainable_theta is only supported without recurrent connections"
             )
         else:
             self.lmu_layer = RNN(
@@ -982,21 +2322,73 @@ class LMU(Layer):
                     hidden_kernel_initializer=self.hidden_kernel_initializer,
                     memory_kernel_initializer=self.memory_kernel_initializer,
                     hidden_activation=self.hidden_activation,
+                    stride=self.stride,
+                    hidden_kernel_structure=self.hidden_kernel_structure,
+                    hidden_kernel_rank=self.hidden_kernel_rank,
+                    hidden_kernel_blocks=self.hidden_kernel_blocks,
+                    hidden_kernel_mask=self.hidden_kernel_mask,
+                ),
+                return_sequences=(
+                    self.return_sequences or self.output_timesteps is not None
                 ),
-                return_sequences=self.return_sequences,
             )
+            if self.bidirectional:
+                self.lmu_layer = Bidirectional(self.lmu_layer, merge_mode=merge_mode)
 
-    def call(self, inputs):
+    def call(self, inputs, mask=None, segment_ids=None):
         """
         Calls the layer with inputs.
         """
-        return self.lmu_layer.call(inputs)
+        inputs, mask = self._stride_inputs(inputs, mask)
+
+        if segment_ids is None:
+            outputs = self.lmu_layer.call(inputs, mask=mask)
+        elif self.stride > 1 or self.bidirectional:
+            raise NotImplementedError(
+                "segment_ids are not supported with stride > 1 or bidirectional=True"
+            )
+        elif isinstance(self.lmu_layer, LMUCellFFT):
+            outputs = self.lmu_layer.call(inputs, mask=mask, segment_ids=segment_ids)
+        else:
+            resets = _segment_resets(segment_ids, inputs.dtype)
+            outputs = self.lmu_layer.call((inputs, resets), mask=mask)
+
+        if self.output_timesteps is not None and isinstance(self.lmu_layer, RNN):
+            timesteps = tf.constant(self.output_timesteps, dtype=tf.int32)
+            timesteps = tf.where(
+                timesteps < 0, timesteps + tf.shape(inputs)[1], timesteps
+            )
+            outputs = tf.gather(outputs, timesteps, axis=1)
+
+        return outputs
+
+    def compute_mask(self, inputs, mask=None):
+        """
+        Propagates the input mask when returning sequences.
+        """
+        if self.return_sequences and self.output_timesteps is None:
+            return self._stride_inputs(inputs, mask)[1]
+        return None
+
+    def _stride_inputs(self, inputs, mask):
+        """
+        Reduces each block of ``stride`` timesteps (and mask) to a single timestep.
+        """
+
+        return _stride_inputs(inputs, mask, self.stride, self.stride_reduction)
 
     def build(self, input_shape):
         """
         Initializes network parameters.
         """
 
+        if self.stride > 1 and input_shape[-2] is not None:
+            input_shape = tuple(input_shape)
+            input_shape = input_shape[:-2] + (
+                -(-input_shape[-2] // self.stride),
+                input_shape[-1],
+            )
+
         self.lmu_layer.build(input_shape)
 
         self.built = True
@@ -1028,7 +2420,6 @@ class LMU(Layer):
                 order=self.order,
                 theta=self.theta,
                 method=self.method,
-                factory=self.factory,
                 memory_to_memory=self.memory_to_memory,
                 hidden_to_memory=self.hidden_to_memory,
                 hidden_to_hidden=self.hidden_to_hidden,
@@ -1038,17 +2429,776 @@ class LMU(Layer):
                 trainable_input_kernel=self.trainable_input_kernel,
                 trainable_hidden_kernel=self.trainable_hidden_kernel,
                 trainable_memory_kernel=self.trainable_memory_kernel,
+                trainable_theta=self.trainable_theta,
                 trainable_A=self.trainable_A,
                 trainable_B=self.trainable_B,
-                input_encorders_initializer=self.input_encoders_initializer,
-                hidden_encoders_initializer=self.hidden_encoders_initializer,
-                memory_encoders_initializer=self.memory_encoders_initializer,
-                input_kernel_initializer=self.input_kernel_initializer,
-                hidden_kernel_initializer=self.hidden_kernel_initializer,
+                input_encoders_initializer=initializers.serialize(
+                    initializers.get(self.input_encoders_initializer)
+                ),
+                hidden_encoders_initializer=initializers.serialize(
+                    initializers.get(self.hidden_encoders_initializer)
+                ),
+                memory_encoders_initializer=initializers.serialize(
+                    initializers.get(self.memory_encoders_initializer)
+                ),
+                input_kernel_initializer=initializers.serialize(
+                    initializers.get(self.input_kernel_initializer)
+                ),
+                hidden_kernel_initializer=initializers.serialize(
+                    initializers.get(self.hidden_kernel_initializer)
+                ),
+                memory_kernel_initializer=initializers.serialize(
+                    initializers.get(self.memory_kernel_initializer)
+                ),
+                hidden_activation=activations.serialize(
+                    activations.get(self.hidden_activation)
+                ),
+                return_sequences=self.return_sequences,
+                output_timesteps=self.output_timesteps,
+                stride=self.stride,
+                stride_reduction=self.stride_reduction,
+                bidirectional=self.bidirectional,
+                merge_mode=self.merge_mode,
+            )
+        )
+        config.update(_hidden_kernel_config(self))
+        config.update(_realization_config(self.realizer, self.factory))
+
+        return config
+
+
+class _Stacked(Initializer):
+    """
+    Initializes each slice along the first axis independently with ``initializer``.
+
+    This gives the stacked weights of an ensemble the same distribution as the weights
+    of separately created layers.
+    """
+
+    def __init__(self, initializer):
+        super().__init__()
+        self.initializer = initializers.get(initializer)
+
+    def __call__(self, shape, dtype=None):
+        # a fresh copy of the initializer for each slice, since unseeded initializers
+        # return identical values when called repeatedly
+        config = self.initializer.get_config()
+        return tf.stack(
+            [
+                type(self.initializer).from_config(config)(shape[1:], dtype=dtype)
+                for _ in range(shape[0])
+            ]
+        )
+
+
+class LMUCellEnsemble(Layer):
+    """
+    Cell class for an ensemble of LMU cells with different window lengths.
+
+    Equivalent to one ``LMUCell`` for each of the ``thetas``, all receiving the same
+    input, with their outputs and states concatenated. All members are evaluated
+    together with batched matrix products (i.e., a block-diagonal ``AT``).
+    """
+
+    def __init__(
+        self,
+        units,
+        order,
+        thetas,  # relative to dt=1
+        method="zoh",
+        realizer=Identity(),
+        factory=LegendreDelay,
+        trainable_input_encoders=True,
+        trainable_hidden_encoders=True,
+        trainable_memory_encoders=True,
+        trainable_input_kernel=True,
+        trainable_hidden_kernel=True,
+        trainable_memory_kernel=True,
+        trainable_A=False,
+        trainable_B=False,
+        input_encoders_initializer="lecun_uniform",
+        hidden_encoders_initializer="lecun_uniform",
+        memory_encoders_initializer=Constant(0),  # 'lecun_uniform',
+        input_kernel_initializer="glorot_normal",
+        hidden_kernel_initializer="glorot_normal",
+        memory_kernel_initializer="glorot_normal",
+        hidden_activation="tanh",
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+
+        self.units = units
+        self.order = order
+        self.thetas = tuple(float(theta) for theta in thetas)
+        self.n_members = len(self.thetas)
+        self.method = method
+        self.realizer = realizer
+        self.factory = factory
+        self.trainable_input_encoders = trainable_input_encoders
+        self.trainable_hidden_encoders = trainable_hidden_encoders
+        self.trainable_memory_encoders = trainable_memory_encoders
+        self.trainable_input_kernel = trainable_input_kernel
+        self.trainable_hidden_kernel = trainable_hidden_kernel
+        self.trainable_memory_kernel = trainable_memory_kernel
+        self.trainable_A = trainable_A
+        self.trainable_B = trainable_B
+
+        self.input_encoders_initializer = initializers.get(input_encoders_initializer)
+        self.hidden_encoders_initializer = initializers.get(hidden_encoders_initializer)
+        self.memory_encoders_initializer = initializers.get(memory_encoders_initializer)
+        self.input_kernel_initializer = initializers.get(input_kernel_initializer)
+        self.hidden_kernel_initializer = initializers.get(hidden_kernel_initializer)
+        self.memory_kernel_initializer = initializers.get(memory_kernel_initializer)
+
+        self.hidden_activation = activations.get(hidden_activation)
+
+        systems = [
+            _cont2discrete(
+                realizer(factory(theta=theta, order=order)).realization,
+                dt=1.0,
+                method=method,
+                **_system_key(theta, order, realizer, factory)
+            )
+            for theta in self.thetas
+        ]
+        # puts into form: x += Ax
+        self._A = np.stack([ss.A - np.eye(order) for ss in systems])
+        self._B = np.stack([ss.B for ss in systems])
+
+        self.state_size = (self.n_members * self.units, self.n_members * self.order)
+        self.output_size = self.n_members * self.units
+
+    def build(self, input_shape):
+        """
+        Initializes various network parameters.
+        """
+
+        input_dim = input_shape[-1]
+        n = self.n_members
+
+        self.input_encoders = self.add_weight(
+            name="input_encoders",
+            shape=(n, input_dim, 1),
+            initializer=_Stacked(self.input_encoders_initializer),
+            trainable=self.trainable_input_encoders,
+        )
+
+        self.hidden_encoders = self.add_weight(
+            name="hidden_encoders",
+            shape=(n, self.units, 1),
+            initializer=_Stacked(self.hidden_encoders_initializer),
+            trainable=self.trainable_hidden_encoders,
+        )
+
+        self.memory_encoders = self.add_weight(
+            name="memory_encoders",
+            shape=(n, self.order, 1),
+            initializer=_Stacked(self.memory_encoders_initializer),
+            trainable=self.trainable_memory_encoders,
+        )
+
+        self.input_kernel = self.add_weight(
+            name="input_kernel",
+            shape=(n, input_dim, self.units),
+            initializer=_Stacked(self.input_kernel_initializer),
+            trainable=self.trainable_input_kernel,
+        )
+
+        self.hidden_kernel = self.add_weight(
+            name="hidden_kernel",
+            shape=(n, self.units, self.units),
+            initializer=_Stacked(self.hidden_kernel_initializer),
+            trainable=self.trainable_hidden_kernel,
+        )
+
+        self.memory_kernel = self.add_weight(
+            name="memory_kernel",
+            shape=(n, self.order, self.units),
+            initializer=_Stacked(self.memory_kernel_initializer),
+            trainable=self.trainable_memory_kernel,
+        )
+
+        self.AT = self.add_weight(
+            name="AT",
+            shape=(n, self.order, self.order),
+            initializer=Constant(np.transpose(self._A, (0, 2, 1))),  # note: transposed
+            trainable=self.trainable_A,
+        )
+
+        self.BT = self.add_weight(
+            name="BT",
+            shape=(n, 1, self.order),  # system is SISO
+            initializer=Constant(np.transpose(self._B, (0, 2, 1))),  # note: transposed
+            trainable=self.trainable_B,
+        )
+
+        self.built = True
+
+    def call(self, inputs, states):
+        """
+        Contains the logic for one LMU step calculation.
+        """
+
+        h, m = states
+        h = tf.reshape(h, (-1, self.n_members, self.units))
+        m = tf.reshape(m, (-1, self.n_members, self.order))
+
+        u = (
+            tf.einsum("bi,nij->bnj", inputs, self.input_encoders)
+            + tf.einsum("bnu,nuj->bnj", h, self.hidden_encoders)
+            + tf.einsum("bnm,nmj->bnj", m, self.memory_encoders)
+        )
+
+        m = (
+            m
+            + tf.einsum("bnm,nmk->bnk", m, self.AT)
+            + tf.einsum("bnj,njk->bnk", u, self.BT)
+        )
+
+        h = self.hidden_activation(
+            tf.einsum("bi,niu->bnu", inputs, self.input_kernel)
+            + tf.einsum("bnu,nuv->bnv", h, self.hidden_kernel)
+            + tf.einsum("bnm,nmu->bnu", m, self.memory_kernel)
+        )
+
+        h = tf.reshape(h, (-1, self.n_members * self.units))
+        m = tf.reshape(m, (-1, self.n_members * self.order))
+
+        return h, [h, m]
+
+    def get_config(self):
+        """
+        Overrides the tensorflow get_config function.
+        """
+
+        config = super().get_config()
+        config.update(
+            dict(
+                units=self.units,
+                order=self.order,
+                thetas=self.thetas,
+                method=self.method,
+                trainable_input_encoders=self.trainable_input_encoders,
+                trainable_hidden_encoders=self.trainable_hidden_encoders,
+                trainable_memory_encoders=self.trainable_memory_encoders,
+                trainable_input_kernel=self.trainable_input_kernel,
+                trainable_hidden_kernel=self.trainable_hidden_kernel,
+                trainable_memory_kernel=self.trainable_memory_kernel,
+                trainable_A=self.trainable_A,
+                trainable_B=self.trainable_B,
+                input_encoders_initializer=initializers.serialize(
+                    self.input_encoders_initializer
+                ),
+                hidden_encoders_initializer=initializers.serialize(
+                    self.hidden_encoders_initializer
+                ),
+                memory_encoders_initializer=initializers.serialize(
+                    self.memory_encoders_initializer
+                ),
+                input_kernel_initializer=initializers.serialize(
+                    self.input_kernel_initializer
+                ),
+                hidden_kernel_initializer=initializers.serialize(
+                    self.hidden_kernel_initializer
+                ),
+                memory_kernel_initializer=initializers.serialize(
+                    self.memory_kernel_initializer
+                ),
+                hidden_activation=activations.serialize(self.hidden_activation),
+            )
+        )
+        config.update(_realization_config(self.realizer, self.factory))
+
+        return config
+
+
+class LMUCellFFTEnsemble(Layer):
+    """
+    FFT variant of ``LMUCellEnsemble``.
+
+    Equivalent to one ``LMUCellFFT`` for each of the ``thetas``, with their outputs
+    concatenated. The impulse responses of all members are stacked, so that a single
+    batched ``rfft`` evaluates the whole ensemble.
+    """
+
+    def __init__(
+        self,
+        units,
+        order,
+        thetas,  # relative to dt=1
+        trainable_input_encoders=True,
+        trainable_input_kernel=True,
+        trainable_memory_kernel=True,
+        input_encoders_initializer="lecun_uniform",
+        input_kernel_initializer="glorot_normal",
+        memory_kernel_initializer="glorot_normal",
+        hidden_activation="tanh",
+        return_sequences=True,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+
+        self.units = units
+        self.order = order
+        self.thetas = tuple(float(theta) for theta in thetas)
+        self.n_members = len(self.thetas)
+
+        self.trainable_input_encoders = trainable_input_encoders
+        self.trainable_input_kernel = trainable_input_kernel
+        self.trainable_memory_kernel = trainable_memory_kernel
+
+        self.input_encoders_initializer = initializers.get(input_encoders_initializer)
+        self.input_kernel_initializer = initializers.get(input_kernel_initializer)
+        self.memory_kernel_initializer = initializers.get(memory_kernel_initializer)
+
+        self.hidden_activation = activations.get(hidden_activation)
+
+        self.return_sequences = return_sequences
+
+        systems = [
+            _cont2discrete(
+                LegendreDelay(theta=theta, order=order),
+                dt=1.0,
+                method="zoh",
+                **_system_key(theta, order, Identity(), LegendreDelay)
+            )
+            for theta in self.thetas
+        ]
+        # discrete systems, in the form x = Ax + Bu
+        self._A = np.stack([ss.A for ss in systems])
+        self._B = np.stack([ss.B for ss in systems])
+        self._spectra = {}
+
+        self.output_size = self.n_members * self.units
+
+    def build(self, input_shape):
+        """
+        Initializes various network parameters.
+        """
+
+        input_dim = input_shape[-1]
+        n = self.n_members
+
+        self.input_encoders = self.add_weight(
+            name="input_encoders",
+            shape=(n, input_dim, 1),
+            initializer=_Stacked(self.input_encoders_initializer),
+            trainable=self.trainable_input_encoders,
+        )
+
+        self.input_kernel = self.add_weight(
+            name="input_kernel",
+            shape=(n, input_dim, self.units),
+            initializer=_Stacked(self.input_kernel_initializer),
+            trainable=self.trainable_input_kernel,
+        )
+
+        self.memory_kernel = self.add_weight(
+            name="memory_kernel",
+            shape=(n, self.order, self.units),
+            initializer=_Stacked(self.memory_kernel_initializer),
+            trainable=self.trainable_memory_kernel,
+        )
+
+        self.built = True
+
+    def call(self, inputs):
+        """
+        Logic for convolution between the encoded input and the impulse responses.
+        """
+
+        # Apply input encoders, giving shape (batch, members, 1, timesteps)
+        u = tf.einsum("bti,nij->bnjt", inputs, self.input_encoders)
+
+        m = self._convolve(u)
+        if self.return_sequences:
+            m = tf.transpose(m, perm=[0, 3, 1, 2])
+            x = inputs
+        else:
+            m = m[..., -1]
+            x = inputs[:, -1]
+
+        h = self.hidden_activation(
+            tf.einsum("...nm,nmu->...nu", m, self.memory_kernel)
+            + tf.einsum("...i,niu->...nu", x, self.input_kernel)
+        )
+
+        # Concatenate the members' outputs
+        return tf.reshape(
+            h, tf.concat([tf.shape(h)[:-2], [self.n_members * self.units]], axis=0)
+        )
+
+    def _convolve(self, u):
+        """
+        Convolves ``u`` (shape ``(batch, members, 1, timesteps)``) with the stacked
+        impulse responses.
+        """
+
+        seq_length = u.shape[-1]
+        if seq_length is None:
+            fft_length = tf.reshape(2 * tf.shape(u)[-1], (1,))
+            response = _impulse_response(self._A, self._B, tf.shape(u)[-1])
+            fft_response = tf.signal.rfft(
+                tf.cast(response, u.dtype), fft_length=fft_length
+            )
+        else:
+            bucket = bucket_length(seq_length)
+            fft_length = [2 * bucket]
+            fft_response = tf.constant(self._response_spectrum(bucket))
+
+        # Padding to fft_length avoids circular convolution
+        fft_input = tf.signal.rfft(u, fft_length=fft_length)
+
+        m = tf.signal.irfft(fft_input * fft_response, fft_length=fft_length)
+
+        return m[..., : tf.shape(u)[-1] if seq_length is None else seq_length]
+
+    def _response_spectrum(self, bucket):
+        if bucket not in self._spectra:
+            with tf.init_scope():
+                response = K.get_value(_impulse_response(self._A, self._B, bucket))
+            self._spectra[bucket] = np.fft.rfft(response, n=2 * bucket).astype(
+                np.result_type(K.floatx(), np.complex64)
+            )
+        return self._spectra[bucket]
+
+    def get_config(self):
+        """
+        Overrides the tensorflow get_config function.
+        """
+        config = super().get_config()
+        config.update(
+            dict(
+                units=self.units,
+                order=self.order,
+                thetas=self.thetas,
+                trainable_input_encoders=self.trainable_input_encoders,
+                trainable_input_kernel=self.trainable_input_kernel,
+                trainable_memory_kernel=self.trainable_memory_kernel,
+                input_encoders_initializer=initializers.serialize(
+                    self.input_encoders_initializer
+                ),
+                input_kernel_initializer=initializers.serialize(
+                    self.input_kernel_initializer
+                ),
+                memory_kernel_initializer=initializers.serialize(
+                    self.memory_kernel_initializer
+                ),
+                hidden_activation=activations.serialize(self.hidden_activation),
+                return_sequences=self.return_sequences,
+            )
+        )
+
+        return config
+
+
+class LMUEnsemble(Layer):
+    """
+    An ensemble of ``LMU`` layers that differ only in their window length.
+
+    The output is the concatenation of the outputs of one ``LMU`` layer for each of
+    the ``thetas``, but all members are evaluated as one batched computation. As in
+    ``LMU``, this uses ``LMUCellEnsemble`` if any recurrent connections are enabled,
+    and ``LMUCellFFTEnsemble`` otherwise.
+    """
+
+    def __init__(
+        self,
+        units,
+        order,
+        thetas,  # relative to dt=1
+        method="zoh",
+        realizer=Identity(),
+        factory=LegendreDelay,
+        memory_to_memory=True,
+        hidden_to_memory=True,
+        hidden_to_hidden=True,
+        trainable_input_encoders=True,
+        trainable_hidden_encoders=True,
+        trainable_memory_encoders=True,
+        trainable_input_kernel=True,
+        trainable_hidden_kernel=True,
+        trainable_memory_kernel=True,
+        trainable_A=False,
+        trainable_B=False,
+        input_encoders_initializer="lecun_uniform",
+        hidden_encoders_initializer="lecun_uniform",
+        memory_encoders_initializer=Constant(0),  # 'lecun_uniform',
+        input_kernel_initializer="glorot_normal",
+        hidden_kernel_initializer="glorot_normal",
+        memory_kernel_initializer="glorot_normal",
+        hidden_activation="tanh",
+        return_sequences=False,
+        **kwargs
+    ):
+        # Note: see LMU for how the connection flags are handled
+
+        self.units = units
+        self.order = order
+        self.thetas = tuple(float(theta) for theta in thetas)
+        self.method = method
+        self.realizer = realizer
+        self.factory = factory
+        self.memory_to_memory = memory_to_memory
+        self.hidden_to_memory = hidden_to_memory
+        self.hidden_to_hidden = hidden_to_hidden
+        self.trainable_input_encoders = trainable_input_encoders
+        self.trainable_hidden_encoders = (
+            trainable_hidden_encoders if hidden_to_memory else False
+        )
+        self.trainable_memory_encoders = (
+            trainable_memory_encoders if memory_to_memory else False
+        )
+        self.trainable_input_kernel = trainable_input_kernel
+        self.trainable_hidden_kernel = (
+            trainable_hidden_kernel if hidden_to_hidden else False
+        )
+        self.trainable_memory_kernel = trainable_memory_kernel
+        self.trainable_A = trainable_A
+        self.trainable_B = trainable_B
+        self.input_encoders_initializer = input_encoders_initializer
+        self.hidden_encoders_initializer = (
+            hidden_encoders_initializer if hidden_to_memory else Constant(0)
+        )
+        self.memory_encoders_initializer = (
+            memory_encoders_initializer if memory_to_memory else Constant(0)
+        )
+        self.input_kernel_initializer = input_kernel_initializer
+        self.hidden_kernel_initializer = (
+            hidden_kernel_initializer if hidden_to_hidden else Constant(0)
+        )
+        self.memory_kernel_initializer = memory_kernel_initializer
+        self.hidden_activation = hidden_activation
+        self.return_sequences = return_sequences
+
+        super().__init__(**kwargs)
+
+        if self.fft_check():
+            self.lmu_layer = LMUCellFFTEnsemble(
+                units=self.units,
+                order=self.order,
+                thetas=self.thetas,
+                trainable_input_encoders=self.trainable_input_encoders,
+                trainable_input_kernel=self.trainable_input_kernel,
+                trainable_memory_kernel=self.trainable_memory_kernel,
+                input_encoders_initializer=self.input_encoders_initializer,
+                input_kernel_initializer=self.input_kernel_initializer,
                 memory_kernel_initializer=self.memory_kernel_initializer,
                 hidden_activation=self.hidden_activation,
                 return_sequences=self.return_sequences,
             )
+        else:
+            self.lmu_layer = RNN(
+                LMUCellEnsemble(
+                    units=self.units,
+                    order=self.order,
+                    thetas=self.thetas,
+                    method=self.method,
+                    realizer=self.realizer,
+                    factory=self.factory,
+                    trainable_input_encoders=self.trainable_input_encoders,
+                    trainable_hidden_encoders=self.trainable_hidden_encoders,
+                    trainable_memory_encoders=self.trainable_memory_encoders,
+                    trainable_input_kernel=self.trainable_input_kernel,
+                    trainable_hidden_kernel=self.trainable_hidden_kernel,
+                    trainable_memory_kernel=self.trainable_memory_kernel,
+                    trainable_A=self.trainable_A,
+                    trainable_B=self.trainable_B,
+                    input_encoders_initializer=self.input_encoders_initializer,
+                    hidden_encoders_initializer=self.hidden_encoders_initializer,
+                    memory_encoders_initializer=self.memory_encoders_initializer,
+                    input_kernel_initializer=self.input_kernel_initializer,
+                    hidden_kernel_initializer=self.hidden_kernel_initializer,
+                    memory_kernel_initializer=self.memory_kernel_initializer,
+                    hidden_activation=self.hidden_activation,
+                ),
+                return_sequences=self.return_sequences,
+            )
+
+    def call(self, inputs):
+        """
+        Calls the layer with inputs.
+        """
+        return self.lmu_layer.call(inputs)
+
+    def build(self, input_shape):
+        """
+        Initializes network parameters.
+        """
+
+        self.lmu_layer.build(input_shape)
+
+        self.built = True
+
+    def fft_check(self):
+        """
+        Checks if recurrent connections are enabled to
+        automatically switch to FFT.
+        """
+        return not (
+            self.memory_to_memory or self.hidden_to_memory or self.hidden_to_hidden
+        )
+
+    def get_config(self):
+        """
+        Overrides the tensorflow get_config function.
+        """
+        config = super().get_config()
+        config.update(
+            dict(
+                units=self.units,
+                order=self.order,
+                thetas=self.thetas,
+                method=self.method,
+                memory_to_memory=self.memory_to_memory,
+                hidden_to_memory=self.hidden_to_memory,
+                hidden_to_hidden=self.hidden_to_hidden,
+                trainable_input_encoders=self.trainable_input_encoders,
+                trainable_hidden_encoders=self.trainable_hidden_encoders,
+                trainable_memory_encoders=self.trainable_memory_encoders,
+                trainable_input_kernel=self.trainable_input_kernel,
+                trainable_hidden_kernel=self.trainable_hidden_kernel,
+                trainable_memory_kernel=self.trainable_memory_kernel,
+                trainable_A=self.trainable_A,
+                trainable_B=self.trainable_B,
+                input_encoders_initializer=initializers.serialize(
+                    initializers.get(self.input_encoders_initializer)
+                ),
+                hidden_encoders_initializer=initializers.serialize(
+                    initializers.get(self.hidden_encoders_initializer)
+                ),
+                memory_encoders_initializer=initializers.serialize(
+                    initializers.get(self.memory_encoders_initializer)
+                ),
+                input_kernel_initializer=initializers.serialize(
+                    initializers.get(self.input_kernel_initializer)
+                ),
+                hidden_kernel_initializer=initializers.serialize(
+                    initializers.get(self.hidden_kernel_initializer)
+                ),
+                memory_kernel_initializer=initializers.serialize(
+                    initializers.get(self.memory_kernel_initializer)
+                ),
+                hidden_activation=activations.serialize(
+                    activations.get(self.hidden_activation)
+                ),
+                return_sequences=self.return_sequences,
+            )
+        )
+        config.update(_realization_config(self.realizer, self.factory))
+
+        return config
+
+
+class LegendreDelayReadout(Layer):
+    """
+    Decodes the input of a Legendre memory at a set of delays.
+
+    The memory ``m`` of an ``order``-dimensional Legendre delay system (as in
+    ``LMUCell`` or ``LMUCellODE`` with the default realization) encodes the window of
+    its input over the last ``theta`` timesteps, and the input ``delay`` timesteps ago
+    is approximately ``sum_i P_i(2 * delay / theta - 1) * m_i``, where ``P_i`` is the
+    ``i``-th Legendre polynomial. This layer evaluates all ``delays`` (in
+    ``[0, theta]``) with one matmul against the ``(order, len(delays))`` decoder
+    matrix, instead of keeping a buffer of the last ``theta`` inputs.
+
+    The input may contain several memories (e.g. the ``units * order`` state of
+    ``LMUCellODE``), in which case the output has shape
+    ``(..., n_memories, len(delays))``; otherwise it has shape ``(..., len(delays))``.
+
+    With ``trainable_delays=True``, the delays are trained via backpropagation, and the
+    decoder matrix is recomputed in-graph with the Legendre recurrence.
+    """
+
+    def __init__(self, order, theta, delays, trainable_delays=False, **kwargs):
+        super().__init__(**kwargs)
+
+        self.order = order
+        self.theta = theta
+        self.delays = tuple(float(d) for d in delays)
+        self.trainable_delays = trainable_delays
+
+        if any(d < 0 or d > theta for d in self.delays):
+            raise ValueError("Delays must be in [0, theta=%s]" % theta)
+
+    def build(self, input_shape):
+        """
+        Initializes network parameters.
+        """
+
+        if input_shape[-1] % self.order != 0:
+            raise ValueError(
+                "Input dimension (%d) must be a multiple of order (%d)"
+                % (input_shape[-1], self.order)
+            )
+        self.n_memories = input_shape[-1] // self.order
+
+        if self.trainable_delays:
+            self.delay_kernel = self.add_weight(
+                name="delays",
+                shape=(len(self.delays),),
+                initializer=Constant(self.delays),
+                trainable=True,
+            )
+        else:
+            self.decoders = self.add_weight(
+                name="decoders",
+                shape=(self.order, len(self.delays)),
+                initializer=Constant(self.get_decoders()),
+                trainable=False,
+            )
+
+        self.built = True
+
+    def get_decoders(self, delays=None):
+        """
+        Returns the ``(order, len(delays))`` decoder matrix.
+
+        If ``delays`` is a tensor, the matrix is computed in-graph (and is
+        differentiable with respect to ``delays``).
+        """
+
+        if delays is None:
+            x = 2 * np.asarray(self.delays) / self.theta - 1
+            return eval_legendre(np.arange(self.order)[:, None], x)
+
+        x = 2 * tf.clip_by_value(delays / self.theta, 0, 1) - 1
+        polys = [tf.ones_like(x), x]
+        for n in range(1, self.order - 1):
+            polys.append(((2 * n + 1) * x * polys[n] - n * polys[n - 1]) / (n + 1))
+        return tf.stack(polys[: self.order])
+
+    def call(self, inputs):
+        """
+        Decodes the delayed inputs from the memory ``inputs``.
+        """
+
+        decoders = (
+            self.get_decoders(self.delay_kernel)
+            if self.trainable_delays
+            else self.decoders
+        )
+
+        if self.n_memories == 1:
+            return tf.matmul(inputs, decoders)
+
+        shape = tf.shape(inputs)
+        m = tf.reshape(inputs, tf.concat([shape[:-1], [self.n_memories, -1]], 0))
+        return tf.matmul(m, decoders)
+
+    def get_config(self):
+        """
+        Overrides the tensorflow get_config function.
+        """
+
+        config = super().get_config()
+        config.update(
+            dict(
+                order=self.order,
+                theta=self.theta,
+                delays=self.delays,
+                trainable_delays=self.trainable_delays,
+            )
         )
 
         return config
@@ -0,0 +1,268 @@
+"""
+Model-order reduction of trained LMU layers.
+
+The memory of an ``LMUCell`` is a linear system driven by the (scalar) encoded input
+``u``, and is only observed through the ``memory_kernel`` (and ``memory_encoders``).
+Balanced truncation of this system keeps the ``order`` state dimensions that are both
+strongly driven by ``u`` and strongly observed by those weights, which is often far
+fewer than the ``order`` of the trained layer. The reduced layer has a smaller
+``order x order`` state update and state, and otherwise the same weights.
+"""
+
+import numpy as np
+from scipy.linalg import solve_discrete_lyapunov
+import tensorflow as tf
+from tensorflow.keras import backend as K
+from tensorflow.keras.layers import RNN
+from tensorflow.keras.utils import custom_object_scope
+
+from .lmu import LMU, LMUCell, LMUCellGating, LMUGating, dense_hidden_kernel
+
+
+def _sqrt_factor(gramian):
+    """
+    Returns ``L`` such that ``L L^T == gramian``, for a PSD (possibly singular) matrix.
+    """
+
+    w, v = np.linalg.eigh((gramian + gramian.T) / 2)
+    return v * np.sqrt(np.maximum(w, 0))
+
+
+def balanced_truncation(A, B, C, order=None, tolerance=None):
+    """
+    Reduces the stable discrete system ``x[t] = A x[t-1] + B u[t], y[t] = C x[t]``.
+
+    Either ``order`` or ``tolerance`` must be given; for the latter, the smallest order
+    whose error bound is at most ``tolerance`` is used.
+
+    Returns the reduced ``(A, B, C)``, the Hankel singular values of the full system,
+    and the bound ``2 * sum(hsv[order:])`` on the H-infinity norm of the error.
+    """
+
+    if np.max(np.abs(np.linalg.eigvals(A))) >= 1:
+        raise ValueError("Balanced truncation requires a stable system")
+
+    Lc = _sqrt_factor(solve_discrete_lyapunov(A, B.dot(B.T)))
+    Lo = _sqrt_factor(solve_discrete_lyapunov(A.T, C.T.dot(C)))
+
+    U, hsv, Vt = np.linalg.svd(Lo.T.dot(Lc))
+    bounds = 2 * np.cumsum(hsv[::-1])[::-1]  # bounds[r] = 2 * sum(hsv[r:])
+    bounds = np.append(bounds, 0.0)
+
+    if order is None:
+        if tolerance is None:
+            raise ValueError("Either order or tolerance must be given")
+        order = int(np.argmax(bounds <= tolerance))
+    order = max(1, min(order, len(hsv)))
+
+    scale = 1 / np.sqrt(np.maximum(hsv[:order], np.finfo(hsv.dtype).tiny))
+    T = Lc.dot(Vt[:order].T) * scale
+    Tinv = (U[:, :order] * scale).T.dot(Lo.T)
+
+    return (Tinv.dot(A).dot(T), Tinv.dot(B), C.dot(T), hsv, bounds[order])
+
+
+def _get_cell(layer, cell_types=(LMUCell,)):
+    """
+    Returns the cell (of one of ``cell_types``) evaluated by ``layer``.
+    """
+
+    if isinstance(layer, LMU):
+        layer = layer.lmu_layer
+    cell = layer.cell if isinstance(layer, (RNN, LMUGating)) else layer
+    if not isinstance(cell, cell_types):
+        raise TypeError(
+            "Cannot reduce layer of type %s (only the recurrent %s "
+            "implementation can be reduced)"
+            % (type(cell).__name__, " or ".join(t.__name__ for t in cell_types))
+        )
+    if not cell.built:
+        raise ValueError("Layer must be built before it can be reduced")
+    return cell
+
+
+def _get_weights(cell):
+    """
+    Returns the values of the weights of ``cell``, by name.
+    """
+
+    return {w.name.split("/")[-1].split(":")[0]: K.get_value(w) for w in cell.weights}
+
+
+def _rebuild(layer, cell, weights, **cell_config):
+    """
+    Returns a copy of ``layer`` with ``cell_config`` changed, and ``weights`` set.
+    """
+
+    if isinstance(layer, RNN):
+        config = layer.get_config()
+        config["cell"]["config"].update(cell_config)
+        with custom_object_scope({type(cell).__name__: type(cell)}):
+            reduced = RNN.from_config(config)
+    elif isinstance(layer, LMUGating):
+        cell_config = dict(cell.get_config(), **cell_config)
+        reduced = LMUGating(
+            type(cell).from_config(cell_config),
+            return_sequences=layer.return_sequences,
+            chunk_size=layer.chunk_size,
+        )
+    else:
+        config = layer.get_config()
+        config.update(cell_config)
+        reduced = type(layer).from_config(config)
+
+    input_dim = weights["input_kernel"].shape[0]
+    if isinstance(layer, type(cell)):
+        reduced.build((None, input_dim))
+    else:
+        reduced.build((None, None, input_dim))
+
+    reduced_cell = _get_cell(reduced, (type(cell),))
+    for w in reduced_cell.weights:
+        K.set_value(w, weights[w.name.split("/")[-1].split(":")[0]])
+
+    return reduced, reduced_cell
+
+
+def _output_error(layer, reduced, cell, reduced_cell, inputs):
+    """
+    Returns the ``max_error`` and ``rms_error`` between the outputs of two layers.
+    """
+
+    if isinstance(layer, type(cell)):
+        y = RNN(cell, return_sequences=True)(inputs)
+        y_reduced = RNN(reduced_cell, return_sequences=True)(inputs)
+    else:
+        y = layer(inputs)
+        y_reduced = reduced(inputs)
+    error = tf.convert_to_tensor(y) - y_reduced
+    return dict(
+        max_error=float(tf.reduce_max(tf.abs(error))),
+        rms_error=float(tf.sqrt(tf.reduce_mean(error**2))),
+    )
+
+
+def reduce_order(layer, order=None, tolerance=None, inputs=None):
+    """
+    Returns a copy of a trained LMU layer with a smaller memory ``order``.
+
+    ``layer`` may be an ``LMU`` (using the recurrent implementation), an
+    ``RNN(LMUCell)``, or an ``LMUCell``, and the result is a layer of the same type.
+    The memory system (with ``memory_kernel`` and ``memory_encoders`` as its outputs) is
+    reduced with balanced truncation to the given ``order``, or to the smallest order
+    whose error bound is at most ``tolerance``.
+
+    Returns the reduced layer and a dict reporting the ``order``, the
+    ``hankel_singular_values`` of the memory system and the ``error_bound`` (on the
+    peak gain of the error in the memory outputs, ignoring the feedback through
+    ``memory_encoders``). If ``inputs`` are given, the ``max_error`` and ``rms_error``
+    between the outputs of the original and reduced layers are reported as well.
+    """
+
+    cell = _get_cell(layer)
+    weights = _get_weights(cell)
+
+    # column-vector form of m[t] = m[t-1] (I + AT) + u[t] BT
+    A = (np.eye(cell.order) + weights["AT"]).T
+    B = weights["BT"].T
+    C = np.concatenate([weights["memory_kernel"], weights["memory_encoders"]], 1).T
+
+    Ar, Br, Cr, hsv, bound = balanced_truncation(
+        A, B, C, order=order, tolerance=tolerance
+    )
+    order = Ar.shape[0]
+
+    weights.update(
+        AT=Ar.T - np.eye(order),
+        BT=Br.T,
+        memory_kernel=Cr.T[:, : cell.units],
+        memory_encoders=Cr.T[:, cell.units :],
+    )
+
+    reduced, reduced_cell = _rebuild(layer, cell, weights, order=order)
+
+    report = dict(order=order, hankel_singular_values=hsv, error_bound=bound)
+    if inputs is not None:
+        report.update(_output_error(layer, reduced, cell, reduced_cell, inputs))
+
+    return reduced, report
+
+
+def structure_hidden_kernel(
+    layer, structure, rank=None, blocks=None, mask=None, inputs=None
+):
+    """
+    Returns a copy of a trained LMU layer with a structured ``hidden_kernel``.
+
+    ``layer`` may be an ``LMU`` (using the recurrent implementation), an ``RNN`` of an
+    ``LMUCell`` or ``LMUCellGating``, an ``LMUGating``, or one of these cells. The
+    (dense) trained ``hidden_kernel`` is approximated by the given ``structure`` (see
+    ``LMUCell``): with a truncated SVD for ``"low_rank"``, and by keeping only the
+    ``blocks`` diagonal blocks (``"block_diagonal"``) or the blocks selected by
+    ``mask`` (``"block_sparse"``) otherwise.
+
+    Returns the converted layer and a dict reporting the ``relative_error`` (in the
+    Frobenius norm) of the approximated kernel, and the number of ``parameters`` in
+    the structured and ``dense_parameters`` in the original kernel. If ``inputs`` are
+    given, the ``max_error`` and ``rms_error`` between the outputs of the original and
+    converted layers are reported as well.
+    """
+
+    cell = _get_cell(layer, (LMUCell, LMUCellGating))
+    if not getattr(cell, "hidden_to_hidden", True):
+        raise ValueError("Cell has no hidden_kernel (hidden_to_hidden=False)")
+    weights = _get_weights(cell)
+    weights.pop("hidden_kernel_mixing", None)
+
+    kernel = dense_hidden_kernel(cell)
+    units = cell.units
+
+    if structure == "dense":
+        weights["hidden_kernel"] = kernel
+        approx = kernel
+    elif structure == "low_rank":
+        U, S, Vt = np.linalg.svd(kernel)
+        weights["hidden_kernel"] = U[:, :rank] * np.sqrt(S[:rank])
+        weights["hidden_kernel_mixing"] = np.sqrt(S[:rank])[:, None] * Vt[:rank]
+        approx = weights["hidden_kernel"].dot(weights["hidden_kernel_mixing"])
+    elif structure in ("block_diagonal", "block_sparse"):
+        if structure == "block_diagonal":
+            mask = np.eye(blocks, dtype=bool)
+        mask = np.asarray(mask, dtype=bool)
+        rows, cols = np.nonzero(mask)
+        n_blocks = mask.shape[0]
+        block_size = units // n_blocks
+        kernel_blocks = kernel.reshape((n_blocks, block_size, n_blocks, block_size))
+        weights["hidden_kernel"] = kernel_blocks[rows, :, cols, :]
+        approx = kernel_blocks * mask[:, None, :, None]
+        approx = approx.reshape((units, units))
+    else:
+        raise ValueError("Unknown hidden_kernel_structure='%s'" % structure)
+
+    reduced, reduced_cell = _rebuild(
+        layer,
+        cell,
+        weights,
+        hidden_kernel_structure=structure,
+        hidden_kernel_rank=rank,
+        hidden_kernel_blocks=blocks,
+        hidden_kernel_mask=None if structure != "block_sparse" else mask,
+    )
+
+    report = dict(
+        relative_error=float(
+            np.linalg.norm(kernel - approx) / max(np.linalg.norm(kernel), 1e-30)
+        ),
+        parameters=int(
+            sum(
+                np.prod(weights[name].shape)
+                for name in ("hidden_kernel", "hidden_kernel_mixing")
+                if name in weights
+            )
+        ),
+        dense_parameters=units * units,
+    )
+    if inputs is not None:
+        report.update(_output_error(layer, reduced, cell, reduced_cell, inputs))
+
+    return reduced, report
@@ -0,0 +1,401 @@
+"""
+Exporting trained LMU layers for serving.
+
+The exported ``tf.Module`` has every weight (and the impulse response spectrum, for
+the FFT variant) baked in as a constant, and provides two signatures: a whole-sequence
+signature and a single-step streaming signature with explicit ``(h, m)`` state. The
+resulting SavedModel can also be passed to ``tf.lite.TFLiteConverter``.
+
+For serving a Keras model in-process, ``CompiledInference`` compiles all the functions
+needed for varying batch sizes and sequence lengths up front, so that no request
+triggers a retrace.
+"""
+
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import backend as K
+from tensorflow.keras.layers import RNN
+
+from .lmu import LMU, LMUCell, LMUCellFFT, _stride_inputs, dense_hidden_kernel
+from .utils import bucket_length
+
+
+class LMUServingModule(tf.Module):
+    """
+    Frozen, export-ready version of a trained ``LMU`` layer.
+
+    ``layer`` may be an ``LMU``, an ``RNN(LMUCell)``, or an ``LMUCellFFT``, and must
+    already be built. The FFT variant is exported with a fixed sequence length (the one
+    it was built with), while the recurrent variant accepts any sequence length.
+
+    For an ``LMU`` with ``stride > 1``, the sequence signature reduces its inputs as the
+    layer does (so that the FFT variant expects ``stride`` times the length it was
+    built with), and the step signature takes one block of ``stride`` inputs, with
+    shape ``(batch, stride, input_dim)``. With ``output_timesteps``, the sequence
+    signature returns the outputs at those timesteps, as the layer does.
+    """
+
+    def __init__(self, layer, name=None):
+        super().__init__(name=name)
+
+        return_sequences = getattr(layer, "return_sequences", True)
+        self.output_timesteps = getattr(layer, "output_timesteps", None)
+        self.stride = 1
+        self.stride_reduction = "last"
+        if isinstance(layer, LMU):
+            self.stride = layer.stride
+            self.stride_reduction = layer.stride_reduction
+            layer = layer.lmu_layer
+        if not layer.built:
+            raise ValueError("Layer must be built before it can be exported")
+
+        dtype = K.floatx()
+        self.return_sequences = return_sequences
+        self.is_fft = isinstance(layer, LMUCellFFT)
+
+        if self.is_fft:
+            cell = layer
+            if cell.bidirectional:
+                raise NotImplementedError(
+                    "Bidirectional layers cannot be exported (there is no streaming "
+                    "equivalent)"
+                )
+            self.seq_length = layer.seq_length
+            if self.seq_length is None:
+                raise ValueError(
+                    "LMUCellFFT must be built with a fixed sequence length to be "
+                    "exported"
+                )
+
+            # the FFT variant has no recurrent connections, so streaming is the same
+            # linear system that was simulated to obtain its impulse response
+            A, B = (K.get_value(x) for x in cell._discretize())
+            AT = (A - np.eye(cell.order)).T
+            BT = B.T
+            hidden_encoders = np.zeros((cell.units, 1))
+            memory_encoders = np.zeros((cell.order, 1))
+            hidden_kernel = np.zeros((cell.units, cell.units))
+
+            response = cell.get_impulse_response(self.seq_length)
+            response = np.pad(response, [(0, 0), (0, 2 * self.seq_length)])
+            spectrum = np.fft.rfft(response)
+            self.fft_response = tf.constant(spectrum.astype(np.complex64))
+        else:
+            cell = layer.cell if isinstance(layer, RNN) else layer
+            if not isinstance(cell, LMUCell):
+                raise TypeError("Cannot export layer of type %s" % type(cell).__name__)
+            self.seq_length = None
+
+            AT = K.get_value(cell.AT)
+            BT = K.get_value(cell.BT)
+            hidden_encoders = K.get_value(cell.hidden_encoders)
+            memory_encoders = K.get_value(cell.memory_encoders)
+            hidden_kernel = dense_hidden_kernel(cell)
+
+        self.units = cell.units
+        self.order = cell.order
+        self.input_dim = K.get_value(cell.input_kernel).shape[0]
+        self.hidden_activation = cell.hidden_activation
+
+        def const(x):
+            return tf.constant(np.asarray(x, dtype=dtype))
+
+        self.AT = const(AT)
+        self.BT = const(BT)
+        self.input_encoders = const(K.get_value(cell.input_encoders))
+        self.hidden_encoders = const(hidden_encoders)
+        self.memory_encoders = const(memory_encoders)
+        self.input_kernel = const(K.get_value(cell.input_kernel))
+        self.hidden_kernel = const(hidden_kernel)
+        self.memory_kernel = const(K.get_value(cell.memory_kernel))
+
+        input_length = self.seq_length
+        step_shape = (None, self.input_dim)
+        if self.stride > 1:
+            input_length = None if input_length is None else input_length * self.stride
+            step_shape = (None, self.stride, self.input_dim)
+        self.sequence = tf.function(
+            self._sequence,
+            input_signature=[
+                tf.TensorSpec((None, input_length, self.input_dim), dtype)
+            ],
+        )
+        self.step = tf.function(
+            self._step,
+            input_signature=[
+                tf.TensorSpec(step_shape, dtype),
+                tf.TensorSpec((None, self.units), dtype),
+                tf.TensorSpec((None, self.order), dtype),
+            ],
+        )
+
+    def _update(self, inputs, h, m):
+        u = (
+            tf.matmul(inputs, self.input_encoders)
+            + tf.matmul(h, self.hidden_encoders)
+            + tf.matmul(m, self.memory_encoders)
+        )
+
+        m = m + tf.matmul(m, self.AT) + tf.matmul(u, self.BT)
+
+        h = self.hidden_activation(
+            tf.matmul(inputs, self.input_kernel)
+            + tf.matmul(h, self.hidden_kernel)
+            + tf.matmul(m, self.memory_kernel)
+        )
+
+        return h, m
+
+    def _step(self, inputs, h, m):
+        if self.stride > 1:
+            inputs = _stride_inputs(inputs, None, self.stride, self.stride_reduction)[0]
+            inputs = inputs[:, 0]
+        h, m = self._update(inputs, h, m)
+        return {"outputs": h, "h": h, "m": m}
+
+    def _sequence(self, inputs):
+        inputs, _ = _stride_inputs(inputs, None, self.stride, self.stride_reduction)
+        if self.is_fft:
+            u = tf.transpose(tf.matmul(inputs, self.input_encoders), perm=[0, 2, 1])
+            u = tf.pad(u, [[0, 0], [0, 0], [0, 2 * self.seq_length]])
+            m = tf.signal.irfft(tf.signal.rfft(u) * self.fft_response)
+            m = tf.transpose(m[:, :, : self.seq_length], perm=[0, 2, 1])
+            h = self.hidden_activation(
+                tf.matmul(m, self.memory_kernel) + tf.matmul(inputs, self.input_kernel)
+            )
+        else:
+            batch_size = tf.shape(inputs)[0]
+            initial = (
+                tf.zeros((batch_size, self.units), inputs.dtype),
+                tf.zeros((batch_size, self.order), inputs.dtype),
+            )
+            h, _ = tf.scan(
+                lambda state, x: self._update(x, *state),
+                tf.transpose(inputs, perm=[1, 0, 2]),
+                initializer=initial,
+            )
+            h = tf.transpose(h, perm=[1, 0, 2])
+
+        if self.output_timesteps is not None:
+            timesteps = tf.constant(self.output_timesteps, dtype=tf.int32)
+            timesteps = tf.where(timesteps < 0, timesteps + tf.shape(h)[1], timesteps)
+            h = tf.gather(h, timesteps, axis=1)
+        elif not self.return_sequences:
+            h = h[:, -1]
+
+        return {"outputs": h}
+
+
+def export_serving(layer, export_dir):
+    """
+    Exports ``layer`` as a SavedModel with ``serving_default`` and ``step`` signatures.
+
+    Returns the ``LMUServingModule`` that was saved.
+    """
+
+    module = LMUServingModule(layer)
+    tf.saved_model.save(
+        module,
+        export_dir,
+        signatures={"serving_default": module.sequence, "step": module.step},
+    )
+    return module
+
+
+def measure_serving(export_dir, inputs, signature="serving_default", n_requests=100):
+    """
+    Measures the cold-start load time and per-request latency of an exported model.
+
+    ``inputs`` is a dict of keyword arguments for the given signature. Returns a dict
+    with the ``load_time`` (in seconds), the time of the ``first_request`` (which
+    includes any remaining initialization), and an array of ``latencies`` for the
+    subsequent requests.
+    """
+
+    start = time.perf_counter()
+    loaded = tf.saved_model.load(export_dir)
+    fn = loaded.signatures[signature]
+    load_time = time.perf_counter() - start
+
+    inputs = {k: tf.constant(v) for k, v in inputs.items()}
+
+    start = time.perf_counter()
+    fn(**inputs)
+    first_request = time.perf_counter() - start
+
+    latencies = np.zeros(n_requests)
+    for i in range(n_requests):
+        start = time.perf_counter()
+        fn(**inputs)["outputs"].numpy()
+        latencies[i] = time.perf_counter() - start
+
+    return dict(load_time=load_time, first_request=first_request, latencies=latencies)
+
+
+class CompiledInference:
+    """
+    Retrace-free inference with a built Keras ``model`` (e.g. an ``LMU`` layer).
+
+    Requests of any batch size and sequence length are padded at the end to their
+    ``bucket_length`` (with a mask), and evaluated by a function compiled for that
+    bucket with an unknown batch size. A sequence length known at compile time lets
+    ``LMUCellFFT`` use its cached impulse response spectrum. Requests longer than the
+    largest of the given ``buckets`` are evaluated by one shape-polymorphic function
+    (with unknown batch size and sequence length).
+
+    All functions are traced and run once when the wrapper is created, so that the
+    latency of later requests does not depend on the order in which shapes arrive.
+    ``trace_count`` counts every trace (including any after startup), and
+    ``compile_times`` gives the time taken to compile each bucket (with ``None`` for
+    the polymorphic function).
+
+    If ``return_sequences`` is True, the model returns one output per timestep, and the
+    padded steps are removed from the outputs. By default, this is inferred from
+    whether the outputs of the polymorphic function follow the sequence length.
+    """
+
+    def __init__(self, model, input_dim, buckets=(), dtype=None, return_sequences=None):
+        self.model = model
+        self.input_dim = input_dim
+        self.dtype = K.floatx() if dtype is None else dtype
+
+        self.trace_count = 0
+        self.compile_times = {}
+        self._functions = {}
+        self._call = tf.function(self._forward)
+
+        self.buckets = sorted({bucket_length(b) for b in buckets})
+        if self.buckets:
+            # the impulse responses of LMUCellFFT cannot be computed while tracing
+            for layer in [model] + list(model.submodules):
+                if isinstance(layer, LMUCellFFT):
+                    layer.warm_up(self.buckets[-1])
+        for bucket in self.buckets + [None]:
+            self._function(bucket)
+
+        if return_sequences is None:
+            # sequence outputs follow the length of the inputs
+            outputs = {n: self._run(None, n) for n in (1, 2)}
+            return_sequences = all(
+                len(y.shape) == 3 and y.shape[1] == n for n, y in outputs.items()
+            )
+        self.return_sequences = return_sequences
+
+    def _forward(self, inputs, mask):
+        # Python side effects only run when the function is traced
+        self.trace_count += 1
+        return self.model(inputs, mask=mask)
+
+    def _function(self, bucket):
+        """
+        Returns the function for ``bucket``, compiling (and running) it if necessary.
+        """
+
+        if bucket not in self._functions:
+            start = time.perf_counter()
+            self._functions[bucket] = self._call.get_concrete_function(
+                tf.TensorSpec((None, bucket, self.input_dim), self.dtype),
+                tf.TensorSpec((None, bucket), tf.bool),
+            )
+            # the first call also initializes (e.g. optimizes) the graph
+            self._run(bucket, 1 if bucket is None else bucket)
+            self.compile_times[bucket] = time.perf_counter() - start
+
+        return self._functions[bucket]
+
+    def _run(self, bucket, length):
+        """
+        Runs the function for ``bucket`` on zeros of the given ``length``.
+        """
+
+        inputs = tf.zeros((1, length, self.input_dim), self.dtype)
+        return self._functions[bucket](inputs, tf.ones((1, length), tf.bool))
+
+    def __call__(self, inputs, lengths=None):
+        """
+        Evaluates ``inputs`` (shape ``(batch, timesteps, input_dim)``).
+
+        ``lengths`` optionally gives the length of each sequence, which are otherwise
+        all ``timesteps`` long. Sequence outputs are returned for the ``timesteps`` of
+        ``inputs``.
+        """
+
+        inputs = tf.convert_to_tensor(inputs, dtype=self.dtype)
+        batch_size, seq_length = int(inputs.shape[0]), int(inputs.shape[1])
+        bucket = bucket_length(seq_length)
+        if not self.buckets or bucket > self.buckets[-1]:
+            bucket = None
+        else:
+            bucket = min(b for b in self.buckets if b >= bucket)
+
+        if lengths is None:
+            lengths = np.full(batch_size, seq_length)
+        lengths = np.asarray(lengths)
+        if lengths.shape != (batch_size,):
+            raise ValueError(
+                "lengths must have shape (%d,), got %s" % (batch_size, lengths.shape)
+            )
+        if np.any(lengths < 1) or np.any(lengths > seq_length):
+            raise ValueError("lengths must be between 1 and %d" % seq_length)
+
+        # the polymorphic function (bucket=None) is evaluated without padding
+        padded_length = seq_length if bucket is None else bucket
+        mask = tf.sequence_mask(lengths, padded_length)
+        inputs = tf.pad(inputs, [[0, 0], [0, padded_length - seq_length], [0, 0]])
+
+        outputs = self._function(bucket)(inputs, mask)
+        if self.return_sequences:
+            outputs = outputs[:, :seq_length]
+        return outputs
+
+
+def _latencies(fn, requests):
+    latencies = np.zeros(len(requests))
+    for i, inputs in enumerate(requests):
+        start = time.perf_counter()
+        np.asarray(fn(inputs))
+        latencies[i] = time.perf_counter() - start
+    return latencies
+
+
+def measure_compiled(model, input_dim, lengths, batch_sizes, n_requests=200, seed=0):
+    """
+    Compares the latency of a plain ``tf.function`` and ``CompiledInference``.
+
+    Requests have a random batch size from ``batch_sizes`` and sequence length from
+    ``lengths`` (with the buckets of ``lengths`` pre-warmed for ``CompiledInference``).
+    Returns a dict with the ``p50`` and ``p99`` latency (in seconds) and the
+    ``trace_count`` for the ``"tf_function"`` and ``"compiled"`` variants, and the
+    total ``compile_time`` of the latter at startup.
+    """
+
+    rng = np.random.RandomState(seed)
+    dtype = K.floatx()
+    requests = [
+        rng.randn(rng.choice(batch_sizes), rng.choice(lengths), input_dim).astype(dtype)
+        for _ in range(n_requests)
+    ]
+
+    traces = []
+
+    @tf.function
+    def plain(inputs):
+        traces.append(inputs.shape)
+        return model(inputs)
+
+    compiled = CompiledInference(model, input_dim, buckets=lengths)
+    startup_traces = compiled.trace_count
+
+    results = {}
+    for name, fn in (("tf_function", plain), ("compiled", compiled)):
+        latencies = _latencies(fn, requests)
+        results[name] = dict(
+            p50=np.percentile(latencies, 50), p99=np.percentile(latencies, 99)
+        )
+    results["tf_function"]["trace_count"] = len(traces)
+    results["compiled"]["trace_count"] = compiled.trace_count - startup_traces
+    results["compiled"]["compile_time"] = sum(compiled.compile_times.values())
+
+    return results
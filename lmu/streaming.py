@@ -0,0 +1,777 @@
+"""
+Serving many concurrent streams with one stateful LMU step.
+
+Each streaming session sends one input at a time and waits for its output. Rather
+than evaluating every request as its own single-step call, ``MicroBatchScheduler``
+collects the requests that arrive within a short deadline and evaluates them as one
+batched step, with the ``(h, m)`` state of every session held in a preallocated
+``StatePool``. The pool can be memory-mapped to disk, and snapshotted and restored, so
+that sessions survive a restart of the worker.
+
+For deep models, ``PipelinedStack`` steps each layer of a stack in its own thread, so
+that the layers of one stream batch are evaluated concurrently on different timesteps.
+"""
+
+import asyncio
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zipfile
+
+import numpy as np
+from tensorflow.keras import backend as K
+
+from .serving import LMUServingModule
+
+
+def _encode_sessions(sessions):
+    """
+    Returns ``sessions`` as a (non-object) array, and a tag for their key type.
+
+    Integer and string keys are stored as such. Other keys (e.g. a mix of integers
+    and strings, or ``None``) are stored as JSON, and must survive the round trip.
+    """
+
+    if all(isinstance(s, (int, np.integer)) for s in sessions):
+        return np.asarray(sessions, dtype=np.int64), "int"
+    if all(isinstance(s, str) for s in sessions):
+        return np.asarray(sessions, dtype=str), "str"
+
+    keys = []
+    for session in sessions:
+        try:
+            key = json.dumps(session)
+        except TypeError:
+            key = None
+        if key is None or json.loads(key) != session:
+            raise TypeError("Cannot snapshot session key %r" % (session,))
+        keys.append(key)
+    return np.asarray(keys, dtype=str), "json"
+
+
+def _decode_sessions(keys, key_type):
+    """
+    Returns the sessions stored by ``_encode_sessions``.
+    """
+
+    if key_type == "json":
+        return [json.loads(k) for k in keys.tolist()]
+    if key_type in ("int", "str"):
+        return keys.tolist()
+    raise ValueError("Unknown key_type='%s'" % key_type)
+
+
+def _memmap_member(path, info, mode):
+    """
+    Memory-maps the (uncompressed) ``.npy`` member ``info`` of the archive ``path``.
+    """
+
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError("Cannot memory-map compressed member %s" % info.filename)
+
+    with open(path, "rb") as f:
+        # the member data follows its local header and (variable length) name/extra
+        f.seek(info.header_offset)
+        name_length, extra_length = struct.unpack("<HH", f.read(30)[26:])
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+
+    return np.memmap(
+        path,
+        dtype=dtype,
+        mode=mode,
+        offset=offset,
+        shape=shape,
+        order="F" if fortran_order else "C",
+    )
+
+
+class StatePool:
+    """
+    Preallocated ``(h, m)`` states for up to ``capacity`` sessions.
+
+    A session is assigned a slot (with zero state) the first time it is used, and
+    keeps it until it is released or evicted for being idle. The states of all slots
+    are stored in one ``(capacity, units + order)`` array, ``state`` (with ``h`` and
+    ``m`` as views into it), which is memory-mapped to the ``.npy`` file ``path`` if
+    given.
+    """
+
+    def __init__(self, capacity, units, order, dtype=None, path=None):
+        dtype = K.floatx() if dtype is None else dtype
+        shape = (capacity, units + order)
+
+        if path is None:
+            state = np.zeros(shape, dtype=dtype)
+        else:
+            state = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+        self._set_state(state, units)
+
+        self._slots = {}
+        self._free = list(range(capacity - 1, -1, -1))
+        self._last_used = {}
+
+    def _set_state(self, state, units):
+        self.capacity = state.shape[0]
+        self.state = state
+        self.h = state[:, :units]
+        self.m = state[:, units:]
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, session):
+        return session in self._slots
+
+    def slot(self, session, now=None):
+        """Returns the slot of ``session``, assigning a new one if necessary."""
+
+        if session not in self._slots:
+            if not self._free:
+                raise RuntimeError("State pool is full (capacity=%d)" % self.capacity)
+            slot = self._free.pop()
+            self.state[slot] = 0
+            self._slots[session] = slot
+
+        self._last_used[session] = time.monotonic() if now is None else now
+        return self._slots[session]
+
+    def release(self, session):
+        """Frees the slot of ``session`` (if it has one)."""
+
+        slot = self._slots.pop(session, None)
+        if slot is not None:
+            self._free.append(slot)
+            del self._last_used[session]
+
+    def evict_idle(self, max_idle, now=None):
+        """Releases all sessions unused for ``max_idle`` seconds, and returns them."""
+
+        now = time.monotonic() if now is None else now
+        idle = [s for s, t in self._last_used.items() if now - t >= max_idle]
+        for session in idle:
+            self.release(session)
+        return idle
+
+    def get_state(self, session):
+        """Returns a copy of the ``(h, m)`` state of ``session``."""
+
+        slot = self._slots[session]
+        return self.h[slot].copy(), self.m[slot].copy()
+
+    def slots(self, sessions, now=None):
+        """Returns the slots of ``sessions``, assigning new ones if necessary."""
+
+        now = time.monotonic() if now is None else now
+        return np.asarray([self.slot(s, now=now) for s in sessions], dtype=int)
+
+    def gather(self, slots):
+        """Returns the ``(h, m)`` states of ``slots``, as a batch."""
+
+        return self.h[slots], self.m[slots]
+
+    def scatter(self, slots, h, m):
+        """Stores the batch of states ``h`` and ``m`` into ``slots``."""
+
+        self.h[slots] = h
+        self.m[slots] = m
+
+    def flush(self):
+        """Writes the state to disk, if it is memory-mapped."""
+
+        if isinstance(self.state, np.memmap):
+            self.state.flush()
+
+    def snapshot(self, path):
+        """
+        Atomically saves the state and sessions to ``path``.
+
+        Session keys must be integers or strings (or otherwise JSON-serializable), so
+        that they can be restored without unpickling.
+
+        The snapshot is written to a temporary file which then replaces ``path``, so
+        that ``path`` always holds a complete snapshot, even if the process is stopped
+        while saving.
+        """
+
+        sessions = list(self._slots)
+        slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(sessions))
+        keys, key_type = _encode_sessions(sessions)
+
+        tmp_path = "%s.tmp%d" % (path, os.getpid())
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                state=self.state,
+                units=self.h.shape[1],
+                sessions=keys,
+                key_type=key_type,
+                slots=slots,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def restore(cls, path, mmap_mode="c"):
+        """
+        Returns a pool with the state and sessions of the snapshot ``path``.
+
+        The state is memory-mapped from the snapshot with ``mmap_mode`` rather than
+        read, so restoring takes (nearly) constant time, and states are only loaded
+        from disk when they are used. The default copy-on-write mode leaves the
+        snapshot unchanged. Restored sessions are considered to have just been used.
+        """
+
+        with zipfile.ZipFile(path) as archive:
+            arrays = {}
+            for name in ("units", "sessions", "key_type", "slots"):
+                with archive.open(name + ".npy") as f:
+                    arrays[name] = np.lib.format.read_array(f, allow_pickle=False)
+            info = archive.getinfo("state.npy")
+
+        pool = cls.__new__(cls)
+        pool._set_state(_memmap_member(path, info, mmap_mode), int(arrays["units"]))
+
+        sessions = _decode_sessions(arrays["sessions"], str(arrays["key_type"]))
+        pool._slots = dict(zip(sessions, arrays["slots"].tolist()))
+        free = np.ones(pool.capacity, dtype=bool)
+        free[arrays["slots"]] = False
+        pool._free = np.flatnonzero(free)[::-1].tolist()
+        pool._last_used = dict.fromkeys(pool._slots, time.monotonic())
+
+        return pool
+
+
+class MicroBatchScheduler:
+    """
+    Coalesces single-step requests from many sessions into batched steps.
+
+    ``layer`` is anything accepted by ``LMUServingModule`` (or such a module). Requests
+    are collected until ``max_batch_size`` sessions are waiting, or ``max_delay``
+    seconds have passed since the oldest one arrived. Each batch contains at most one
+    step per session (later steps of the same session wait for the next batch).
+    Sessions unused for ``idle_timeout`` seconds are evicted, and continue from a zero
+    state if they return. The states are kept in ``pool`` (e.g. one restored from a
+    snapshot with ``StatePool.restore``) if given, or a new pool of ``capacity``
+    sessions.
+
+    The scheduler must be started (and stopped) within a running event loop, e.g. with
+    ``async with MicroBatchScheduler(layer) as scheduler``.
+    """
+
+    def __init__(
+        self,
+        layer,
+        capacity=1024,
+        max_batch_size=128,
+        max_delay=0.002,
+        idle_timeout=None,
+        pool=None,
+    ):
+        self.module = (
+            layer if isinstance(layer, LMUServingModule) else LMUServingModule(layer)
+        )
+        if pool is None:
+            pool = StatePool(capacity, self.module.units, self.module.order)
+        elif (
+            pool.h.shape[1] != self.module.units or pool.m.shape[1] != self.module.order
+        ):
+            raise ValueError(
+                "State pool shapes (%d, %d) do not match the layer (%d, %d)"
+                % (
+                    pool.h.shape[1],
+                    pool.m.shape[1],
+                    self.module.units,
+                    self.module.order,
+                )
+            )
+        self.pool = pool
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.idle_timeout = idle_timeout
+
+        self.batch_sizes = []
+
+        self._queue = collections.deque()
+        self._wakeup = None
+        self._task = None
+        # steps are evaluated in a separate thread, so that requests can keep
+        # arriving in the meantime
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def start(self):
+        """Starts processing requests."""
+
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Stops processing requests, cancelling any that are still pending."""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while self._queue:
+            self._queue.popleft()[2].cancel()
+
+    async def step(self, session, inputs):
+        """Advances ``session`` by one step with ``inputs``, and returns its output."""
+
+        if self._task is None:
+            raise RuntimeError("Scheduler has not been started")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        inputs = np.asarray(inputs, dtype=self.pool.h.dtype)
+        self._queue.append((session, inputs, future, loop.time()))
+        self._wakeup.set()
+        return await future
+
+    def close_session(self, session):
+        """Frees the state of ``session``."""
+        self.pool.release(session)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            await self._wait_for_batch(loop)
+
+            if self._queue:
+                await self._step_batch(loop, self._take_batch())
+
+            if self.idle_timeout is not None:
+                self.pool.evict_idle(self.idle_timeout)
+
+    async def _wait(self, timeout):
+        """
+        Waits for a new request, for at most ``timeout`` seconds.
+        """
+
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _wait_for_batch(self, loop):
+        """
+        Waits for a full batch, or the deadline of the oldest request.
+
+        A batch is full once ``max_batch_size`` distinct sessions are waiting (since
+        it only takes one step per session).
+        """
+
+        if not self._queue:
+            await self._wait(self.idle_timeout)
+
+        while (
+            self._queue
+            and len({request[0] for request in self._queue}) < self.max_batch_size
+        ):
+            remaining = self._queue[0][3] + self.max_delay - loop.time()
+            if remaining <= 0 or not await self._wait(remaining):
+                break
+
+    def _take_batch(self):
+        """
+        Removes up to ``max_batch_size`` requests (one per session) from the queue.
+        """
+
+        batch = []
+        deferred = []
+        sessions = set()
+        while self._queue and len(batch) < self.max_batch_size:
+            request = self._queue.popleft()
+            if request[2].cancelled():
+                continue
+            if request[0] in sessions:
+                deferred.append(request)
+            else:
+                sessions.add(request[0])
+                batch.append(request)
+
+        self._queue.extendleft(reversed(deferred))
+        return batch
+
+    def _assign_slots(self, batch):
+        """
+        Returns the requests in ``batch`` that could be assigned a slot, and the slots.
+        """
+
+        requests = []
+        slots = []
+        for request in batch:
+            try:
+                slots.append(self.pool.slot(request[0]))
+                requests.append(request)
+            except RuntimeError as e:
+                request[2].set_exception(e)
+        return requests, np.asarray(slots, dtype=int)
+
+    def _evaluate(self, inputs, slots):
+        outputs = self.module.step(inputs, *self.pool.gather(slots))
+        return {k: v.numpy() for k, v in outputs.items()}
+
+    async def _step_batch(self, loop, batch):
+        requests, slots = self._assign_slots(batch)
+        if not requests:
+            return
+
+        inputs = np.stack([request[1] for request in requests])
+        futures = [request[2] for request in requests]
+        try:
+            result = await loop.run_in_executor(
+                self._executor, self._evaluate, inputs, slots
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.pool.scatter(slots, result["h"], result["m"])
+        self.batch_sizes.append(len(requests))
+
+        for future, output in zip(futures, result["outputs"]):
+            if not future.done():
+                future.set_result(output)
+
+
+def _load_inputs(n_sessions, n_steps, input_dim, dtype):
+    rng = np.random.RandomState(0)
+    return rng.randn(n_sessions, n_steps, input_dim).astype(dtype)
+
+
+async def _generate_load(scheduler, n_sessions, n_steps, input_dim):
+    """
+    Runs ``n_sessions`` closed-loop clients, returning per-request latencies.
+    """
+
+    inputs = _load_inputs(n_sessions, n_steps, input_dim, scheduler.pool.h.dtype)
+    latencies = np.zeros((n_sessions, n_steps))
+
+    async def client(i):
+        for j in range(n_steps):
+            start = time.perf_counter()
+            await scheduler.step(i, inputs[i, j])
+            latencies[i, j] = time.perf_counter() - start
+
+    await asyncio.gather(*(client(i) for i in range(n_sessions)))
+    return latencies.ravel()
+
+
+def _step_sequentially(module, n_sessions, n_steps):
+    """
+    Steps the same load as ``_generate_load`` one request at a time, without a
+    scheduler, returning per-request latencies and the total time.
+    """
+
+    dtype = K.floatx()
+    inputs = _load_inputs(n_sessions, n_steps, module.input_dim, dtype)
+    h = np.zeros((n_sessions, module.units), dtype=dtype)
+    m = np.zeros((n_sessions, module.order), dtype=dtype)
+    latencies = np.zeros((n_steps, n_sessions))
+
+    # warm up the step function before timing (discarding the result)
+    module.step(inputs[:1, 0], h[:1], m[:1])
+
+    total = time.perf_counter()
+    for j in range(n_steps):
+        for i in range(n_sessions):
+            start = time.perf_counter()
+            outputs = module.step(inputs[i : i + 1, j], h[i : i + 1], m[i : i + 1])
+            h[i] = outputs["h"].numpy()[0]
+            m[i] = outputs["m"].numpy()[0]
+            outputs["outputs"].numpy()
+            latencies[j, i] = time.perf_counter() - start
+
+    return latencies.ravel(), time.perf_counter() - total
+
+
+def measure_streaming(
+    layer, n_sessions=256, n_steps=20, max_batch_size=128, max_delay=0.002
+):
+    """
+    Compares micro-batched and unbatched stepping under a concurrent load.
+
+    ``n_sessions`` clients each send ``n_steps`` requests, one after the other. Returns
+    a dict with the ``p50`` and ``p99`` latency (in seconds) and the ``throughput``
+    (in requests per second) for the ``"batched"`` scheduler, for the ``"unbatched"``
+    one (which evaluates each request on its own), and for ``"sequential"`` stepping
+    of each request directly with the exported step function (without a scheduler,
+    so its latencies do not include any time spent waiting for other sessions).
+    """
+
+    module = LMUServingModule(layer)
+    settings = dict(
+        batched=dict(max_batch_size=max_batch_size, max_delay=max_delay),
+        unbatched=dict(max_batch_size=1, max_delay=0),
+    )
+
+    async def run(kwargs):
+        async with MicroBatchScheduler(
+            module, capacity=n_sessions, **kwargs
+        ) as scheduler:
+            # warm up the step function before timing
+            await scheduler.step(None, np.zeros(module.input_dim))
+            scheduler.close_session(None)
+
+            start = time.perf_counter()
+            latencies = await _generate_load(
+                scheduler, n_sessions, n_steps, module.input_dim
+            )
+            elapsed = time.perf_counter() - start
+
+        return dict(
+            p50=np.percentile(latencies, 50),
+            p99=np.percentile(latencies, 99),
+            throughput=latencies.size / elapsed,
+            mean_batch_size=np.mean(scheduler.batch_sizes[1:]),
+        )
+
+    results = {name: asyncio.run(run(kwargs)) for name, kwargs in settings.items()}
+
+    latencies, elapsed = _step_sequentially(module, n_sessions, n_steps)
+    results["sequential"] = dict(
+        p50=np.percentile(latencies, 50),
+        p99=np.percentile(latencies, 99),
+        throughput=latencies.size / elapsed,
+        mean_batch_size=1.0,
+    )
+
+    return results
+
+
+class PipelinedStack:
+    """
+    Steps a stack of LMU layers with one thread per layer.
+
+    ``layers`` is a list of layers accepted by ``LMUServingModule`` (or such modules),
+    each taking the outputs of the previous one as inputs. In ``run``, layer ``k``
+    evaluates timestep ``t`` while layer ``k + 1`` evaluates timestep ``t - 1``, with
+    at most ``queue_size`` steps waiting between two layers. Each layer keeps its own
+    ``(h, m)`` state (for a fixed ``batch_size`` of streams), which carries over
+    between calls to ``run`` and ``step``.
+
+    TensorFlow releases the GIL while evaluating a step, so the layers run in
+    parallel as long as there are idle cores.
+    """
+
+    def __init__(self, layers, batch_size, queue_size=2):
+        self.modules = [
+            layer if isinstance(layer, LMUServingModule) else LMUServingModule(layer)
+            for layer in layers
+        ]
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.reset_states()
+
+    def reset_states(self):
+        """Sets the states of all layers to zero."""
+
+        dtype = K.floatx()
+        self.states = [
+            (
+                np.zeros((self.batch_size, module.units), dtype=dtype),
+                np.zeros((self.batch_size, module.order), dtype=dtype),
+            )
+            for module in self.modules
+        ]
+
+    def _check_inputs(self, inputs):
+        inputs = np.asarray(inputs, dtype=K.floatx())
+        if inputs.shape[:1] != (self.batch_size,):
+            raise ValueError(
+                "Expected inputs for %d streams, got shape %s"
+                % (self.batch_size, inputs.shape)
+            )
+        return inputs
+
+    def _step_layer(self, k, inputs):
+        outputs = self.modules[k].step(inputs, *self.states[k])
+        self.states[k] = (outputs["h"].numpy(), outputs["m"].numpy())
+        return outputs["outputs"].numpy()
+
+    def step(self, inputs):
+        """
+        Advances all layers by one step in the calling thread, and returns the output.
+        """
+
+        inputs = self._check_inputs(inputs)
+        for k in range(len(self.modules)):
+            inputs = self._step_layer(k, inputs)
+        return inputs
+
+    def _worker(self, k, inbox, outbox):
+        while True:
+            item = inbox.get()
+            if item is not None and not isinstance(item, Exception):
+                try:
+                    item = self._step_layer(k, item)
+                except Exception as e:  # pylint: disable=broad-except
+                    item = e
+            outbox.put(item)
+            if item is None:
+                return
+
+    def _feed(self, inputs, outbox):
+        try:
+            for x in inputs:
+                outbox.put(self._check_inputs(x))
+        except Exception as e:  # pylint: disable=broad-except
+            outbox.put(e)
+        finally:
+            outbox.put(None)
+
+    def _collect(self, inbox):
+        """
+        Returns the outputs arriving in ``inbox``, raising the first error (if any).
+        """
+
+        outputs = []
+        error = None
+        item = inbox.get()
+        while item is not None:
+            if isinstance(item, Exception):
+                error = item if error is None else error
+            else:
+                outputs.append(item)
+            item = inbox.get()
+
+        if error is not None:
+            raise error
+        if not outputs:
+            return np.zeros((0, self.batch_size, self.modules[-1].units), K.floatx())
+        return np.stack(outputs)
+
+    def run(self, inputs):
+        """
+        Advances all layers through ``inputs`` (shape ``(timesteps, batch, dims)``).
+
+        Returns the outputs of the last layer, with shape ``(timesteps, batch, units)``.
+        """
+
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.modules) + 1)]
+        threads = [
+            threading.Thread(target=self._feed, args=(inputs, queues[0]), daemon=True)
+        ] + [
+            threading.Thread(
+                target=self._worker, args=(k, queues[k], queues[k + 1]), daemon=True
+            )
+            for k in range(len(self.modules))
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            return self._collect(queues[-1])
+        finally:
+            for thread in threads:
+                thread.join()
+
+
+@contextlib.contextmanager
+def _limit_cores(n_cores):
+    """
+    Restricts all threads of this process to ``n_cores`` of the available cores.
+
+    Threads started within the context inherit the restriction. The previous
+    affinity of every thread is restored on exit.
+    """
+
+    if n_cores is None:
+        yield
+        return
+    if not hasattr(os, "sched_setaffinity"):
+        raise NotImplementedError("Limiting the cores is only supported on Linux")
+
+    available = sorted(os.sched_getaffinity(0))
+    if not 1 <= n_cores <= len(available):
+        raise ValueError(
+            "n_cores must be between 1 and %d, got %d" % (len(available), n_cores)
+        )
+
+    previous = {}
+    try:
+        for task in os.listdir("/proc/self/task"):
+            try:
+                previous[int(task)] = os.sched_getaffinity(int(task))
+                os.sched_setaffinity(int(task), available[:n_cores])
+            except ProcessLookupError:
+                pass  # the thread exited in the meantime
+        yield
+    finally:
+        for task, cores in previous.items():
+            try:
+                os.sched_setaffinity(task, cores)
+            except ProcessLookupError:
+                pass
+
+
+def measure_pipelining(
+    layers, batch_size=32, n_steps=200, queue_size=2, n_cores=None, seed=0
+):
+    """
+    Compares the throughput of sequential and pipelined stepping through a stack.
+
+    With ``n_cores``, both variants are restricted to that many cores (on Linux), so
+    that the benefit of pipelining can be measured for different core counts.
+
+    Returns a dict with the ``"sequential"`` and ``"pipelined"`` throughput (in steps
+    per second, for a batch of ``batch_size`` streams), their ``speedup``, and the
+    ``max_error`` between the two outputs.
+    """
+
+    stack = PipelinedStack(layers, batch_size, queue_size=queue_size)
+    rng = np.random.RandomState(seed)
+    inputs = rng.randn(n_steps, batch_size, stack.modules[0].input_dim).astype(
+        K.floatx()
+    )
+
+    # warm up the step functions before timing
+    stack.step(inputs[0])
+
+    with _limit_cores(n_cores):
+        stack.reset_states()
+        start = time.perf_counter()
+        sequential = np.stack([stack.step(x) for x in inputs])
+        sequential_time = time.perf_counter() - start
+
+        stack.reset_states()
+        start = time.perf_counter()
+        pipelined = stack.run(inputs)
+        pipelined_time = time.perf_counter() - start
+
+    return dict(
+        sequential=n_steps / sequential_time,
+        pipelined=n_steps / pipelined_time,
+        speedup=sequential_time / pipelined_time,
+        max_error=float(np.max(np.abs(sequential - pipelined))),
+    )
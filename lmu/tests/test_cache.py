@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+import pytest
+
+import lmu
+from lmu import cache
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    yield cache.enable_cache(str(tmp_path))
+    cache.disable_cache()
+
+
+def test_miss_then_hit(disk_cache):
+    calls = []
+
+    def compute():
+        calls.append(None)
+        return np.arange(5.0)
+
+    first = cache.cached("test", compute, a=1)
+    second = cache.cached("test", compute, a=1)
+    assert len(calls) == 1
+    assert isinstance(second, np.memmap)
+    assert np.array_equal(first, second)
+
+    # different parameters are a different entry
+    cache.cached("test", compute, a=2)
+    assert len(calls) == 2
+
+
+def test_atomic_put(disk_cache, monkeypatch):
+    key = disk_cache.key("test")
+    disk_cache.put(key, np.ones(10))
+
+    def failing_save(f, array):
+        f.write(b"\x93NUMPY partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "save", failing_save)
+    with pytest.raises(OSError, match="disk full"):
+        disk_cache.put(key, np.zeros(10))
+    monkeypatch.undo()
+
+    # the previous entry is untouched, and no temporary file is left behind
+    assert os.listdir(disk_cache.directory) == [key + ".npy"]
+    assert np.array_equal(disk_cache.get(key), np.ones(10))
+
+
+def test_lru_eviction(tmp_path):
+    disk_cache = cache.DiskCache(str(tmp_path), max_bytes=2 * (128 + 8 * 100))
+    keys = [disk_cache.key("test", i=i) for i in range(3)]
+
+    for t, key in enumerate(keys[:2]):
+        disk_cache.put(key, np.zeros(100))
+        os.utime(disk_cache.path(key), (t, t))
+
+    # using the oldest entry makes the other one the least recently used
+    assert disk_cache.get(keys[0]) is not None
+    disk_cache.put(keys[2], np.zeros(100))
+
+    assert disk_cache.get(keys[1]) is None
+    assert disk_cache.get(keys[0]) is not None
+    assert disk_cache.get(keys[2]) is not None
+
+
+@pytest.mark.parametrize("contents", (b"not an array", None))
+def test_corrupt_entry(disk_cache, contents):
+    key = disk_cache.key("test")
+    disk_cache.put(key, np.arange(1000.0))
+    path = disk_cache.path(key)
+    if contents is None:
+        # truncated
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) // 2)
+    else:
+        with open(path, "wb") as f:
+            f.write(contents)
+
+    assert disk_cache.get(key) is None
+    assert not os.path.exists(path)
+
+    array = cache.cached("test", lambda: np.arange(1000.0))
+    assert np.array_equal(array, np.arange(1000.0))
+    assert np.array_equal(disk_cache.get(key), np.arange(1000.0))
+
+
+def test_layer_uses_cache(disk_cache):
+    cache.disable_cache()
+    layer = lmu.LMUCellFFT(4, 6, 10.0)
+    layer.build((None, 20, 1))
+    response = layer.get_impulse_response()
+
+    cache.enable_cache(disk_cache.directory)
+    for _ in range(2):  # a miss, then a hit
+        layer = lmu.LMUCellFFT(4, 6, 10.0)
+        layer.build((None, 20, 1))
+        assert np.allclose(layer.get_impulse_response(), response)
+    assert any(
+        name.startswith("impulse_response") for name in os.listdir(disk_cache.directory)
+    )
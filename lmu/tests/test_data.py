@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+import lmu
+from lmu.data import (
+    bucketed_dataset,
+    load_npy,
+    measure_pipeline,
+    psmnist_dataset,
+    sequence_dataset,
+)
+from lmu.utils import bucket_length
+
+
+def test_psmnist_matches_example():
+    rng = np.random.RandomState(0)
+    images = rng.randint(0, 256, size=(10, 28, 28)).astype(np.uint8)
+    labels = rng.randint(0, 10, size=10)
+
+    # the preprocessing in docs/basic/psMNIST.ipynb
+    expected = (images / 255).reshape((images.shape[0], -1, 1))
+    expected = expected[:, np.random.RandomState(0).permutation(expected.shape[1])]
+
+    batches = list(psmnist_dataset(images, labels, batch_size=4))
+    assert [len(x) for x, _ in batches] == [4, 4, 2]
+    x = np.concatenate([x for x, _ in batches])
+    assert x.shape == (10, 784, 1)
+    assert np.allclose(x, expected)
+    assert np.array_equal(np.concatenate([y for _, y in batches]), labels)
+
+
+@pytest.mark.parametrize("shuffle", (False, True))
+def test_memory_mapped_source(shuffle, tmp_path):
+    rng = np.random.RandomState(0)
+    inputs = rng.uniform(size=(20, 4, 5)).astype(np.float32)
+    targets = rng.randint(0, 3, size=20)
+    np.save(tmp_path / "inputs.npy", inputs)
+    np.save(tmp_path / "targets.npy", targets)
+
+    kwargs = dict(batch_size=6, shuffle=shuffle, seed=1)
+    in_memory = list(sequence_dataset(inputs, targets, **kwargs))
+    mapped = list(
+        sequence_dataset(
+            load_npy(tmp_path / "inputs.npy"),
+            load_npy(tmp_path / "targets.npy"),
+            **kwargs
+        )
+    )
+
+    assert len(in_memory) == len(mapped) == 4
+    for (x, y), (x_mapped, y_mapped) in zip(in_memory, mapped):
+        assert x.shape[1:] == (20, 1)
+        assert np.array_equal(x, x_mapped)
+        assert np.array_equal(y, y_mapped)
+
+
+def test_bucketed_dataset():
+    rng = np.random.RandomState(0)
+    lengths = rng.randint(1, 40, size=30)
+    sequences = [rng.uniform(1, 2, size=(n, 2)).astype(np.float32) for n in lengths]
+    targets = np.arange(30)
+
+    seen = []
+    for (x, mask), y in bucketed_dataset(
+        sequences, targets, batch_size=4, with_mask=True
+    ):
+        x, mask, y = x.numpy(), mask.numpy(), y.numpy()
+        # padded to the bucket of the sequences in the batch
+        assert x.shape[1] == bucket_length(lengths[y].max())
+        assert all(bucket_length(n) == x.shape[1] for n in lengths[y])
+        assert np.array_equal(mask.sum(axis=1), lengths[y])
+        for i, j in enumerate(y):
+            assert np.array_equal(x[i, : lengths[j]], sequences[j])
+            assert np.all(x[i, lengths[j] :] == 0)
+        seen.extend(y)
+    assert sorted(seen) == list(range(30))
+
+
+def test_measure_pipeline():
+    rng = np.random.RandomState(0)
+    dataset = sequence_dataset(rng.uniform(size=(40, 10)), batch_size=8)
+    layer = lmu.LMU(4, 6, 10.0)
+    layer.build((None, 10, 1))
+
+    results = measure_pipeline(dataset, layer=layer, n_batches=3)
+    assert results["data_throughput"] > 0
+    assert results["layer_throughput"] > 0
+    assert set(measure_pipeline(dataset, n_batches=3)) == {"data_throughput"}
@@ -0,0 +1,121 @@
+import math
+
+import numpy as np
+import pytest
+import tensorflow as tf
+from tensorflow.python.framework import graph_util, ops
+from tensorflow.python.profiler import model_analyzer, option_builder
+
+import lmu
+from lmu.estimate import estimate_cost
+
+
+def _shape(graph, name):
+    return graph_util.tensor_shape_from_node_def_name(graph, name).as_list()
+
+
+# the profiler has no FLOP counts for these ops, so they are registered here
+@ops.RegisterStatistics("RFFT", "flops")
+def _rfft_flops(graph, node):
+    shape = _shape(graph, node.name)
+    n = 2 * (shape[-1] - 1)
+    return ops.OpStats("flops", int(np.prod(shape[:-1]) * 2.5 * n * math.log2(n)))
+
+
+@ops.RegisterStatistics("IRFFT", "flops")
+def _irfft_flops(graph, node):
+    shape = _shape(graph, node.name)
+    n = shape[-1]
+    return ops.OpStats("flops", int(np.prod(shape[:-1]) * 2.5 * n * math.log2(n)))
+
+
+@ops.RegisterStatistics("Einsum", "flops")
+def _einsum_flops(graph, node):
+    inputs = node.attr["equation"].s.decode().split("->")[0].split(",")
+    sizes = {}
+    for name, indices in zip(node.input, inputs):
+        sizes.update(zip(indices, _shape(graph, name)))
+    return ops.OpStats("flops", 2 * int(np.prod(list(sizes.values()))))
+
+
+def _profile_flops(fn, *specs):
+    graph = tf.function(fn).get_concrete_function(*specs).graph
+    options = option_builder.ProfileOptionBuilder.float_operation()
+    options["output"] = "none"
+    return model_analyzer.profile(graph, options=options).total_float_ops
+
+
+RECURRENT = dict(
+    dense=lambda: lmu.LMUCell(16, 32, 50.0),
+    low_rank=lambda: lmu.LMUCell(
+        16, 32, 50.0, hidden_kernel_structure="low_rank", hidden_kernel_rank=4
+    ),
+    block_diagonal=lambda: lmu.LMUCell(
+        16, 32, 50.0, hidden_kernel_structure="block_diagonal", hidden_kernel_blocks=4
+    ),
+    gating=lambda: lmu.LMUCellGating(16, 32, 50.0),
+    gating_low_rank=lambda: lmu.LMUCellGating(
+        16, 32, 50.0, hidden_kernel_structure="low_rank", hidden_kernel_rank=4
+    ),
+    ode=lambda: lmu.LMUCellODE(16, 8, 50.0),
+)
+
+FFT = dict(
+    sequences=dict(),
+    last=dict(return_sequences=False),
+    output_timesteps=dict(output_timesteps=[10, 20, 30]),
+    bidirectional=dict(bidirectional=True),
+)
+
+
+@pytest.mark.parametrize("cell", RECURRENT)
+def test_recurrent(cell):
+    cell = RECURRENT[cell]()
+    input_dim, batch_size = 3, 8
+    layer = tf.keras.layers.RNN(cell)
+    layer.build((batch_size, None, input_dim))
+    cost = estimate_cost(layer, input_dim, batch_size, 10)
+
+    assert cost["parameter_bytes"] == 4 * layer.count_params()
+
+    specs = [tf.TensorSpec((batch_size, input_dim))] + [
+        tf.TensorSpec((batch_size, size)) for size in tf.nest.flatten(cell.state_size)
+    ]
+    measured = _profile_flops(lambda x, *states: cell.call(x, list(states)), *specs)
+    assert np.isclose(cost["flops_per_step"], measured, rtol=0.1)
+    assert cost["flops_per_sequence"] == 10 * cost["flops_per_step"]
+
+
+@pytest.mark.parametrize("kwargs", FFT)
+def test_fft(kwargs):
+    input_dim, batch_size, seq_length = 3, 8, 100
+    layer = lmu.LMUCellFFT(16, 32, 50.0, **FFT[kwargs])
+    layer.build((batch_size, seq_length, input_dim))
+    cost = estimate_cost(layer, input_dim, batch_size, seq_length)
+
+    assert cost["parameter_bytes"] == 4 * layer.count_params()
+
+    measured = _profile_flops(layer, tf.TensorSpec((batch_size, seq_length, input_dim)))
+    assert np.isclose(cost["flops_per_sequence"], measured, rtol=0.1)
+
+
+def test_lmu():
+    layer = lmu.LMU(
+        16, 32, 50.0, hidden_kernel_structure="low_rank", hidden_kernel_rank=4
+    )
+    layer.build((None, None, 3))
+    cost = estimate_cost(layer, 3, 8, 100)
+    assert cost["parameter_bytes"] == 4 * layer.count_params()
+
+    layer = lmu.LMU(
+        16,
+        32,
+        50.0,
+        memory_to_memory=False,
+        hidden_to_memory=False,
+        hidden_to_hidden=False,
+    )
+    layer.build((None, 100, 3))
+    cost = estimate_cost(layer, 3, 8, 100)
+    assert cost["parameter_bytes"] == 4 * layer.count_params()
+    assert cost["flops_per_step"] is None
@@ -0,0 +1,486 @@
+import json
+
+import numpy as np
+import pytest
+import tensorflow as tf
+
+import lmu
+from lmu.utils import pack_sequences, unpack_sequences
+
+
+@pytest.mark.parametrize("fixed_length", (True, False))
+def test_fft_masked_last_step(fixed_length):
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 30, 2)).astype(np.float32)
+    lengths = [30, 20, 5]
+    mask = np.arange(30) < np.array(lengths)[:, None]
+
+    layer = lmu.LMUCellFFT(4, 6, 10.0, return_sequences=False)
+    if fixed_length:
+        y = layer(x, mask=tf.constant(mask)).numpy()
+    else:
+        layer.build((None, None, 2))
+        call = tf.function(
+            lambda x, mask: layer(x, mask=mask),
+            input_signature=[
+                tf.TensorSpec((None, None, 2)),
+                tf.TensorSpec((None, None), tf.bool),
+            ],
+        )
+        y = call(x, mask).numpy()
+
+    for i, length in enumerate(lengths):
+        assert np.allclose(y[i], layer(x[i : i + 1, :length]).numpy()[0], atol=1e-5)
+
+
+@pytest.mark.parametrize(
+    "kwargs", ({}, dict(trainable_dt=True), dict(dt_per_unit=True, method="zoh"))
+)
+def test_ode_stride(kwargs):
+    # a strided step should match `stride` steps with the input held constant
+    stride = 4
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(2, 10, 1)).astype(np.float32)
+
+    rnn = tf.keras.layers.RNN(lmu.LMUCellODE(3, 6, 20.0, **kwargs))
+    rnn_strided = tf.keras.layers.RNN(
+        lmu.LMUCellODE(3, 6, 20.0, stride=stride, **kwargs)
+    )
+    y = rnn(np.repeat(x, stride, axis=1))
+    rnn_strided.build(x.shape)
+    rnn_strided.set_weights(
+        [
+            w * stride if "dt" in v.name else w
+            for v, w in zip(rnn.weights, rnn.get_weights())
+        ]
+    )
+
+    assert np.allclose(rnn_strided(x), y, atol=1e-5)
+
+
+@pytest.mark.parametrize("structure", ("per_unit", "shared"))
+def test_ode_decoder_structure(structure):
+    units, order = 3, 5
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(2, 10, 2)).astype(np.float32)
+
+    cell = lmu.LMUCellODE(units, order, 20.0, decoder_structure=structure)
+    dense_cell = lmu.LMUCellODE(units, order, 20.0)
+    rnn = tf.keras.layers.RNN(cell)
+    dense_rnn = tf.keras.layers.RNN(dense_cell)
+    rnn.build(x.shape)
+    dense_rnn.build(x.shape)
+
+    # the equivalent (units * order, units) dense decoders
+    decoders = np.zeros((units, order, units), np.float32)
+    if structure == "per_unit":
+        cell.decoders.assign(rng.uniform(-1, 1, size=(units, order)))
+        decoders[np.arange(units), :, np.arange(units)] = cell.decoders.numpy()
+    else:
+        cell.decoders.assign(rng.uniform(-1, 1, size=order))
+        cell.decoder_mixing.assign(rng.uniform(-1, 1, size=(units, units)))
+        decoders = np.einsum("o,uv->uov", cell.decoders, cell.decoder_mixing)
+    dense_cell.encoders.assign(cell.encoders)
+    dense_cell.decoders.assign(decoders.reshape((units * order, units)))
+
+    assert np.allclose(rnn(x), dense_rnn(x), atol=1e-6)
+
+    # the default initialization decodes the same delayed inputs as "dense"
+    default_rnn = tf.keras.layers.RNN(
+        lmu.LMUCellODE(units, order, 20.0, decoder_structure=structure)
+    )
+    default_rnn.build(x.shape)
+    default_rnn.cell.encoders.assign(cell.encoders)
+    dense_rnn.cell.decoders.assign(
+        dense_cell._default_decoder_initializer()((units * order, units))
+    )
+    assert np.allclose(default_rnn(x), dense_rnn(x), atol=1e-6)
+
+
+def test_ode_low_rank_decoder():
+    units, order, rank, input_dim = 4, 5, 2, 3
+    cell = lmu.LMUCellODE(
+        units, order, 20.0, decoder_structure="low_rank", decoder_rank=rank
+    )
+    rnn = tf.keras.layers.RNN(cell, return_sequences=True)
+    assert rnn(tf.zeros((2, 7, input_dim))).shape == (2, 7, units)
+
+    assert cell.decoders.shape == (units * order, rank)
+    assert cell.decoder_mixing.shape == (rank, units)
+    # encoders, dt, decoders, decoder_mixing, AT, B (and the identity and padding
+    # constants, which are stored as variables)
+    assert cell.count_params() == (
+        input_dim * units + 1 + units * order * rank + rank * units + order**2 + order
+    ) + (order**2 + order + 1)
+
+    with pytest.raises(ValueError, match="requires decoder_rank"):
+        lmu.LMUCellODE(units, order, decoder_structure="low_rank")
+    with pytest.raises(ValueError, match="Unknown decoder_structure"):
+        lmu.LMUCellODE(units, order, decoder_structure="sparse")
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    (
+        {},
+        dict(decoder_structure="per_unit", dt_per_unit=True),
+        dict(decoder_structure="low_rank", decoder_rank=2, method="zoh"),
+        dict(decoder_structure="shared", decoder_initializer="zeros"),
+    ),
+)
+def test_ode_config(kwargs):
+    cell = lmu.LMUCellODE(4, 5, 20.0, **kwargs)
+    config = cell.get_config()
+    assert config["decoder_structure"] == kwargs.get("decoder_structure", "dense")
+    with tf.keras.utils.custom_object_scope({"InputScaled": lmu.InputScaled}):
+        restored = lmu.LMUCellODE.from_config(json.loads(json.dumps(config)))
+    assert restored.get_config() == config
+
+    x = tf.random.uniform((2, 6, 3), seed=0)
+    rnn = tf.keras.layers.RNN(cell)
+    restored_rnn = tf.keras.layers.RNN(restored)
+    y = rnn(x)
+    restored_rnn.build(x.shape)
+    restored_rnn.set_weights(rnn.get_weights())
+    assert np.allclose(restored_rnn(x), y)
+
+
+@pytest.mark.parametrize("return_sequences", (True, False))
+@pytest.mark.parametrize("fft", (True, False))
+def test_ensemble(fft, return_sequences):
+    # an ensemble should match separate layers with the same weights
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 25, 2)).astype(np.float32)
+    thetas = [5.0, 10.0, 20.0]
+    kwargs = (
+        dict(memory_to_memory=False, hidden_to_memory=False, hidden_to_hidden=False)
+        if fft
+        else dict(memory_encoders_initializer="lecun_uniform")
+    )
+
+    ensemble = lmu.LMUEnsemble(
+        4, 6, thetas, return_sequences=return_sequences, **kwargs
+    )
+    y = ensemble(x).numpy()
+    weights = {
+        w.name.split("/")[-1]: value
+        for w, value in zip(ensemble.weights, ensemble.get_weights())
+    }
+
+    outputs = []
+    for i, theta in enumerate(thetas):
+        layer = lmu.LMU(4, 6, theta, return_sequences=return_sequences, **kwargs)
+        layer.build(x.shape)
+        layer.set_weights([weights[w.name.split("/")[-1]][i] for w in layer.weights])
+        outputs.append(layer(x).numpy())
+
+    assert y.shape == (3,) + ((25,) if return_sequences else ()) + (12,)
+    assert np.allclose(y, np.concatenate(outputs, axis=-1), atol=1e-5)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    (
+        dict(dt_per_unit=True),
+        dict(dt_per_unit=True, trainable_dt=True, method="zoh"),
+        dict(trainable_dt=True),
+    ),
+)
+def test_lmuode(kwargs):
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(4, 20, 2)).astype(np.float32)
+
+    cell = lmu.LMUCellODE(3, 6, 20.0, **kwargs)
+    rnn = tf.keras.layers.RNN(cell, return_sequences=True)
+    layer = lmu.LMUODE(cell, return_sequences=True)
+
+    with tf.GradientTape(persistent=True) as tape:
+        y = rnn(x)
+        y_layer = layer(x)
+        loss = tf.reduce_sum(y**2)
+        loss_layer = tf.reduce_sum(y_layer**2)
+
+    assert len(layer.weights) == len(rnn.weights)
+    assert np.allclose(y_layer, y, atol=1e-6)
+    for g, g_layer in zip(
+        tape.gradient(loss, cell.trainable_weights),
+        tape.gradient(loss_layer, cell.trainable_weights),
+    ):
+        assert (g is None) == (g_layer is None)
+        if g is not None:
+            assert np.allclose(g_layer, g, atol=1e-4)
+
+
+@pytest.mark.parametrize("hidden_to_hidden", (True, False))
+@pytest.mark.parametrize("chunk_size", (1, 5, 64))
+def test_gating_scan(chunk_size, hidden_to_hidden):
+    # the parallel scan should match stepping through the sequence with an RNN
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 37, 2)).astype(np.float32)
+
+    cell = lmu.LMUCellGating(
+        4,
+        6,
+        10.0,
+        input_only_gating=True,
+        hidden_to_hidden=hidden_to_hidden,
+        trainable_forget_input_kernel=True,
+        trainable_forget_bias=True,
+        forget_input_kernel_initializer="glorot_uniform",
+        gate_activation="sigmoid",
+    )
+    rnn = tf.keras.layers.RNN(cell, return_sequences=True, return_state=True)
+
+    with tf.GradientTape(persistent=True) as tape:
+        y, h, m = rnn(x)
+        y_scan, (h_scan, m_scan) = cell.call_sequence(
+            tf.constant(x), chunk_size=chunk_size
+        )
+        loss = tf.reduce_sum(y**2)
+        loss_scan = tf.reduce_sum(y_scan**2)
+
+    assert np.allclose(y_scan, y, atol=1e-5)
+    assert np.allclose(h_scan, h, atol=1e-5)
+    assert np.allclose(m_scan, m, atol=1e-5)
+    for g, g_scan in zip(
+        tape.gradient(loss, cell.trainable_weights),
+        tape.gradient(loss_scan, cell.trainable_weights),
+    ):
+        assert np.allclose(g_scan, g, atol=1e-4)
+
+
+@pytest.mark.parametrize("input_only_gating", (True, False))
+def test_lmugating(input_only_gating):
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 20, 2)).astype(np.float32)
+
+    layer = lmu.LMUGating(
+        lmu.LMUCellGating(4, 6, 10.0, input_only_gating=input_only_gating),
+        return_sequences=True,
+        chunk_size=8,
+    )
+    y = layer(x)
+    assert y.shape == (3, 20, 4)
+
+    config = layer.get_config()
+    json.dumps(config)
+    layer2 = lmu.LMUGating.from_config(config)
+    assert layer2.chunk_size == 8
+    assert layer2.cell.input_only_gating == input_only_gating
+    layer2.build(x.shape)
+    layer2.set_weights(layer.get_weights())
+    assert np.allclose(layer2(x), y)
+
+
+@pytest.mark.parametrize("merge_mode", ("concat", "sum", "ave", "mul"))
+@pytest.mark.parametrize("return_sequences", (True, False))
+def test_fft_bidirectional(return_sequences, merge_mode):
+    # should match a forward and a backward layer with the same weights
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 40, 2)).astype(np.float32)
+    lengths = [40, 25, 10]
+    mask = np.arange(40) < np.array(lengths)[:, None]
+
+    layer = lmu.LMUCellFFT(
+        4,
+        6,
+        10.0,
+        bidirectional=True,
+        merge_mode=merge_mode,
+        return_sequences=return_sequences,
+    )
+    y = layer(x, mask=tf.constant(mask)).numpy()
+
+    forward = lmu.LMUCellFFT(4, 6, 10.0, return_sequences=return_sequences)
+    backward = lmu.LMUCellFFT(4, 6, 10.0, return_sequences=return_sequences)
+    forward.build(x.shape)
+    backward.build(x.shape)
+    forward.set_weights([layer.input_encoders, layer.input_kernel, layer.memory_kernel])
+    backward.set_weights(
+        [
+            layer.backward_input_encoders,
+            layer.backward_input_kernel,
+            layer.backward_memory_kernel,
+        ]
+    )
+
+    merge = dict(
+        concat=lambda a, b: np.concatenate([a, b], axis=-1),
+        sum=lambda a, b: a + b,
+        ave=lambda a, b: (a + b) / 2,
+        mul=lambda a, b: a * b,
+    )[merge_mode]
+    for i, length in enumerate(lengths):
+        xi = x[i : i + 1, :length]
+        y_forward = forward(xi).numpy()
+        y_backward = backward(xi[:, ::-1]).numpy()
+        if return_sequences:
+            y_backward = y_backward[:, ::-1]
+        yi = y[i : i + 1, :length] if return_sequences else y[i : i + 1]
+        assert np.allclose(yi, merge(y_forward, y_backward), atol=1e-5)
+
+
+@pytest.mark.parametrize("return_sequences", (True, False))
+def test_fft_trainable_theta(return_sequences):
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 20, 2)).astype(np.float32)
+
+    fixed = lmu.LMUCellFFT(4, 6, 10.0, return_sequences=return_sequences)
+    y_fixed = fixed(x).numpy()
+
+    layer = lmu.LMUCellFFT(
+        4, 6, 10.0, return_sequences=return_sequences, trainable_theta=True
+    )
+    layer.build(x.shape)
+    weights = {w.name.split("/")[-1]: w for w in fixed.weights}
+    for w in layer.weights:
+        if w is not layer.theta_kernel:
+            w.assign(weights[w.name.split("/")[-1]])
+
+    # the in-graph response matches the fixed one at initialization
+    assert np.allclose(layer(x), y_fixed, atol=1e-5)
+
+    # gradient with respect to theta matches a central finite difference
+    w_out = tf.constant(rng.uniform(-1, 1, size=y_fixed.shape).astype(np.float32))
+    with tf.GradientTape() as tape:
+        loss = tf.reduce_sum(layer(x) * w_out)
+    grad = float(np.sum(tape.gradient(loss, layer.theta_kernel)))
+
+    eps = 1e-2
+    theta = layer.theta_kernel.numpy()
+    losses = []
+    for sign in (1, -1):
+        layer.theta_kernel.assign(theta + sign * eps)
+        losses.append(float(tf.reduce_sum(layer(x) * w_out)))
+    layer.theta_kernel.assign(theta)
+    assert np.isclose(grad, (losses[0] - losses[1]) / (2 * eps), rtol=1e-2)
+
+
+def test_bidirectional_lmu():
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 20, 2)).astype(np.float32)
+
+    for hidden_to_hidden in (False, True):
+        layer = lmu.LMU(
+            4,
+            6,
+            10.0,
+            bidirectional=True,
+            return_sequences=True,
+            memory_to_memory=False,
+            hidden_to_memory=False,
+            hidden_to_hidden=hidden_to_hidden,
+        )
+        assert layer(x).shape == (3, 20, 8)
+        assert isinstance(layer.lmu_layer, lmu.LMUCellFFT) != hidden_to_hidden
+
+    layer = lmu.LMU(
+        4,
+        6,
+        10.0,
+        bidirectional=True,
+        trainable_theta=True,
+        memory_to_memory=False,
+        hidden_to_memory=False,
+        hidden_to_hidden=False,
+    )
+    with tf.GradientTape() as tape:
+        loss = tf.reduce_sum(layer(x) ** 2)
+    assert all(g is not None for g in tape.gradient(loss, layer.trainable_weights))
+
+
+def test_bidirectional_initialization():
+    layer = lmu.LMUCellFFT(4, 6, 10.0, bidirectional=True)
+    layer.build((None, 20, 2))
+    assert not np.allclose(layer.input_kernel, layer.backward_input_kernel)
+    assert not np.allclose(layer.memory_kernel, layer.backward_memory_kernel)
+
+
+def test_delay_readout():
+    # decoding the memory of a pure delay system should recover the delayed input
+    theta, order, seq_length = 100, 16, 400
+    t = np.arange(seq_length)
+    u = (np.sin(2 * np.pi * t / 150) + 0.5 * np.cos(2 * np.pi * t / 97)).astype(
+        np.float32
+    )
+
+    cell = lmu.LMUCell(
+        1,
+        order,
+        theta,
+        input_encoders_initializer=tf.keras.initializers.Constant(1),
+        hidden_encoders_initializer=tf.keras.initializers.Constant(0),
+        memory_encoders_initializer=tf.keras.initializers.Constant(0),
+    )
+    cell.build((1, 1))
+    states = [tf.zeros((1, 1)), tf.zeros((1, order))]
+    m = []
+    for k in range(seq_length):
+        _, states = cell.call(tf.constant(u[None, k : k + 1]), states)
+        m.append(states[1])
+    m = tf.stack(m, axis=1)
+
+    delays = [0, 10, 25, 50, 100]
+    readout = lmu.LegendreDelayReadout(order, theta, delays)
+    y = readout(m).numpy()[0]
+    assert y.shape == (seq_length, len(delays))
+    for i, delay in enumerate(delays):
+        assert np.allclose(y[300:, i], u[300 - delay : seq_length - delay], atol=0.1)
+
+    trainable = lmu.LegendreDelayReadout(order, theta, delays, trainable_delays=True)
+    with tf.GradientTape() as tape:
+        y_trainable = trainable(m)
+        loss = tf.reduce_sum(y_trainable**2)
+    assert np.allclose(y_trainable, y[None], atol=1e-4)
+    assert tape.gradient(loss, trainable.delay_kernel) is not None
+
+    # several memories (e.g. the state of LMUCellODE)
+    readout_ode = lmu.LegendreDelayReadout(order, theta, delays)
+    assert readout_ode(tf.zeros((4, 5, 3 * order))).shape == (4, 5, 3, len(delays))
+
+    config = readout.get_config()
+    assert lmu.LegendreDelayReadout.from_config(config).delays == tuple(
+        float(d) for d in delays
+    )
+    with pytest.raises(ValueError, match="Delays must be in"):
+        lmu.LegendreDelayReadout(order, theta, [theta + 1])
+
+
+@pytest.mark.parametrize(
+    "fft, trainable_theta", [(True, False), (True, True), (False, False)]
+)
+def test_segment_ids(fft, trainable_theta):
+    rng = np.random.RandomState(0)
+    sequences = [
+        rng.uniform(-1, 1, size=(n, 3)).astype(np.float32)
+        for n in rng.randint(5, 40, size=12)
+    ]
+    packed, segment_ids, index = pack_sequences(sequences, 64)
+
+    layer = lmu.LMU(
+        8,
+        6,
+        20.0,
+        return_sequences=True,
+        memory_to_memory=not fft,
+        hidden_to_memory=False,
+        hidden_to_hidden=False,
+        trainable_theta=trainable_theta,
+    )
+    layer.build((None, 64, 3))
+    assert isinstance(layer.lmu_layer, lmu.LMUCellFFT) == fft
+
+    y = layer(packed, mask=segment_ids > 0, segment_ids=segment_ids).numpy()
+    for seq, y_seq in zip(sequences, unpack_sequences(y, index)):
+        assert np.allclose(y_seq, layer(seq[None]).numpy()[0], atol=1e-5)
+
+    if fft:
+        # the same segments, with a row length only known when called
+        call = tf.function(
+            lambda x, s: layer(x, mask=s > 0, segment_ids=s),
+            input_signature=[
+                tf.TensorSpec((None, None, 3)),
+                tf.TensorSpec((None, None), tf.int32),
+            ],
+        )
+        assert np.allclose(call(packed, segment_ids), y, atol=1e-5)
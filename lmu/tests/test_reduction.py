@@ -0,0 +1,148 @@
+import json
+
+import numpy as np
+import pytest
+import tensorflow as tf
+
+import lmu
+from lmu.reduction import balanced_truncation, reduce_order, structure_hidden_kernel
+
+
+@pytest.mark.parametrize(
+    "structure, kwargs",
+    (
+        ("low_rank", dict(rank=8)),
+        ("block_diagonal", dict(blocks=1)),
+        ("block_sparse", dict(mask=np.ones((2, 2), dtype=bool))),
+    ),
+)
+@pytest.mark.parametrize("gating", (False, True))
+def test_structure_hidden_kernel_exact(structure, kwargs, gating):
+    # a full-rank (or full-mask) structure should reproduce the dense layer
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 20, 2)).astype(np.float32)
+
+    cell = lmu.LMUCellGating(8, 6, 10.0) if gating else lmu.LMUCell(8, 6, 10.0)
+    layer = tf.keras.layers.RNN(cell, return_sequences=True)
+    layer.build(x.shape)
+
+    converted, report = structure_hidden_kernel(layer, structure, inputs=x, **kwargs)
+    assert report["relative_error"] < 1e-6
+    assert report["max_error"] < 1e-5
+    assert np.allclose(
+        lmu.dense_hidden_kernel(converted.cell), lmu.dense_hidden_kernel(cell)
+    )
+
+
+def test_lmu_config_mask():
+    mask = np.eye(4, dtype=bool)
+    layer = lmu.LMU(
+        8, 6, 10.0, hidden_kernel_structure="block_sparse", hidden_kernel_mask=mask
+    )
+    config = layer.get_config()
+    json.dumps(config)
+    assert config["hidden_kernel_mask"] == tuple(map(tuple, mask))
+    assert lmu.LMU.from_config(config).hidden_kernel_mask == layer.hidden_kernel_mask
+
+
+def test_reduce_order_types():
+    layer = tf.keras.layers.RNN(lmu.LMUCellGating(4, 6, 10.0))
+    layer.build((None, None, 2))
+    with pytest.raises(TypeError, match="Cannot reduce"):
+        reduce_order(layer, order=3)
+
+
+def _impulse_response(A, B, C, steps):
+    x = B
+    response = []
+    for _ in range(steps):
+        response.append(C.dot(x))
+        x = A.dot(x)
+    return np.array(response)
+
+
+def _delay_system(order=8, theta=10.0):
+    cell = lmu.LMUCell(1, order, theta)
+    cell.build((None, 1))
+    A = np.eye(order) + cell.AT.numpy().T
+    return A, cell.BT.numpy().T, np.random.RandomState(0).randn(3, order)
+
+
+def test_balanced_truncation():
+    A, B, C = _delay_system()
+
+    Ar, Br, Cr, hsv, bound = balanced_truncation(A, B, C, order=len(A))
+    assert bound == 0
+    assert np.all(np.diff(hsv) <= 0)
+    assert np.allclose(
+        _impulse_response(Ar, Br, Cr, 50), _impulse_response(A, B, C, 50), atol=1e-6
+    )
+
+    # the smallest order whose bound meets the tolerance
+    tolerance = 2 * np.sum(hsv[4:]) * 1.01
+    Ar, _, _, _, bound = balanced_truncation(A, B, C, tolerance=tolerance)
+    assert Ar.shape == (4, 4)
+    assert bound <= tolerance < 2 * np.sum(hsv[3:])
+
+    with pytest.raises(ValueError, match="order or tolerance"):
+        balanced_truncation(A, B, C)
+    with pytest.raises(ValueError, match="stable"):
+        balanced_truncation(1.1 * np.eye(3), B[:3], C[:, :3], order=2)
+
+
+@pytest.mark.parametrize("layer_type", ("lmu", "rnn", "cell"))
+def test_reduce_order_full(layer_type):
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 20, 2)).astype(np.float32)
+
+    if layer_type == "lmu":
+        layer = lmu.LMU(4, 6, 10.0, return_sequences=True)
+        layer.build(x.shape)
+        assert isinstance(layer.lmu_layer, tf.keras.layers.RNN)
+    elif layer_type == "rnn":
+        layer = tf.keras.layers.RNN(lmu.LMUCell(4, 6, 10.0), return_sequences=True)
+        layer.build(x.shape)
+    else:
+        layer = lmu.LMUCell(4, 6, 10.0)
+        layer.build((None, 2))
+
+    reduced, report = reduce_order(layer, order=6, inputs=x)
+    assert type(reduced) is type(layer)
+    assert report["order"] == 6
+    assert report["error_bound"] == 0
+    assert report["max_error"] < 1e-5
+
+
+def test_reduce_order_error():
+    # without feedback into the memory or between hidden units, the output error is
+    # bounded by the error bound of the memory outputs (times the input norm)
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 50, 1)).astype(np.float32)
+
+    cell = lmu.LMUCell(
+        4,
+        12,
+        10.0,
+        input_encoders_initializer=tf.keras.initializers.Constant(1),
+        hidden_encoders_initializer=tf.keras.initializers.Constant(0),
+        memory_encoders_initializer=tf.keras.initializers.Constant(0),
+        hidden_kernel_initializer=tf.keras.initializers.Constant(0),
+    )
+    layer = tf.keras.layers.RNN(cell, return_sequences=True)
+    layer.build(x.shape)
+
+    errors = []
+    for order in (4, 8):
+        reduced, report = reduce_order(layer, order=order, inputs=x)
+        assert reduced.cell.order == order
+        assert np.isfinite(report["max_error"])
+        assert (
+            0
+            < report["max_error"]
+            <= report["error_bound"] * np.sqrt(np.sum(x**2, axis=(1, 2))).max()
+        )
+        errors.append(report["max_error"])
+    assert errors[1] < errors[0]
+
+    reduced, report = reduce_order(layer, tolerance=report["error_bound"])
+    assert report["order"] <= 8
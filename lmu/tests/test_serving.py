@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from lmu import LMU
+from lmu.serving import CompiledInference, export_serving, measure_serving
+
+
+@pytest.mark.parametrize("return_sequences", (True, False))
+@pytest.mark.parametrize("fft", (True, False))
+def test_export_serving(fft, return_sequences, tmp_path):
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 20, 2)).astype(np.float32)
+
+    kwargs = (
+        dict(memory_to_memory=False, hidden_to_memory=False, hidden_to_hidden=False)
+        if fft
+        else {}
+    )
+    layer = LMU(4, 6, 10.0, return_sequences=return_sequences, **kwargs)
+    y = layer(x).numpy()
+
+    export_serving(layer, str(tmp_path))
+    loaded = tf.saved_model.load(str(tmp_path))
+
+    y_seq = loaded.signatures["serving_default"](inputs=x)["outputs"].numpy()
+    assert y_seq.shape == y.shape
+    assert np.allclose(y_seq, y, atol=1e-5)
+
+    h = np.zeros((3, 4), np.float32)
+    m = np.zeros((3, 6), np.float32)
+    y_step = []
+    for t in range(x.shape[1]):
+        outputs = loaded.signatures["step"](inputs=x[:, t], h=h, m=m)
+        h, m = outputs["h"], outputs["m"]
+        y_step.append(outputs["outputs"].numpy())
+    y_step = np.stack(y_step, axis=1)
+    assert np.allclose(y_step if return_sequences else y_step[:, -1], y, atol=1e-5)
+
+    results = measure_serving(str(tmp_path), {"inputs": x}, n_requests=3)
+    assert results["load_time"] > 0
+    assert results["latencies"].shape == (3,)
+
+
+def test_export_unbuilt():
+    with pytest.raises(ValueError, match="must be built"):
+        export_serving(LMU(4, 6, 10.0), "unused")
+
+
+@pytest.mark.parametrize("return_sequences", (True, False))
+@pytest.mark.parametrize("fft", (True, False))
+def test_compiled_inference(fft, return_sequences):
+    rng = np.random.RandomState(0)
+    kwargs = (
+        dict(memory_to_memory=False, hidden_to_memory=False, hidden_to_hidden=False)
+        if fft
+        else {}
+    )
+    layer = LMU(4, 6, 10.0, return_sequences=return_sequences, **kwargs)
+    layer.build((None, None, 2))
+
+    compiled = CompiledInference(layer, 2, buckets=[8, 16])
+    assert compiled.return_sequences == return_sequences
+    assert sorted(compiled.compile_times, key=str) == [16, 8, None]
+    startup_traces = compiled.trace_count
+
+    # bucketed (padded) and polymorphic requests
+    for batch_size, seq_length in [(3, 5), (1, 16), (2, 12), (3, 40)]:
+        x = rng.uniform(-1, 1, size=(batch_size, seq_length, 2)).astype(np.float32)
+        lengths = rng.randint(1, seq_length + 1, size=batch_size)
+        y = compiled(x, lengths=lengths).numpy()
+        for i, n in enumerate(lengths):
+            y_ref = layer(x[i : i + 1, :n]).numpy()[0]
+            if return_sequences:
+                assert y.shape == (batch_size, seq_length, 4)
+                assert np.allclose(y[i, :n], y_ref, atol=1e-5)
+            else:
+                assert np.allclose(y[i], y_ref, atol=1e-5)
+    assert compiled.trace_count == startup_traces
+
+    x = np.zeros((2, 5, 2), np.float32)
+    with pytest.raises(ValueError, match="must have shape"):
+        compiled(x, lengths=[5])
+    with pytest.raises(ValueError, match="must be between"):
+        compiled(x, lengths=[5, 6])
+
+
+@pytest.mark.parametrize("stride_reduction", ("last", "mean"))
+@pytest.mark.parametrize("fft", (True, False))
+def test_export_strided(fft, stride_reduction, tmp_path):
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 20, 2)).astype(np.float32)
+
+    kwargs = (
+        dict(memory_to_memory=False, hidden_to_memory=False, hidden_to_hidden=False)
+        if fft
+        else {}
+    )
+    layer = LMU(
+        4,
+        6,
+        10.0,
+        return_sequences=True,
+        stride=2,
+        stride_reduction=stride_reduction,
+        **kwargs,
+    )
+    y = layer(x).numpy()
+    assert y.shape == (3, 10, 4)
+
+    export_serving(layer, str(tmp_path))
+    loaded = tf.saved_model.load(str(tmp_path))
+    y_seq = loaded.signatures["serving_default"](inputs=x)["outputs"].numpy()
+    assert np.allclose(y_seq, y, atol=1e-5)
+
+    h = np.zeros((3, 4), np.float32)
+    m = np.zeros((3, 6), np.float32)
+    for t in range(10):
+        outputs = loaded.signatures["step"](inputs=x[:, 2 * t : 2 * t + 2], h=h, m=m)
+        h, m = outputs["h"], outputs["m"]
+        assert np.allclose(outputs["outputs"], y[:, t], atol=1e-5)
+
+
+@pytest.mark.parametrize("fft", (True, False))
+def test_export_output_timesteps(fft, tmp_path):
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 20, 2)).astype(np.float32)
+
+    kwargs = (
+        dict(memory_to_memory=False, hidden_to_memory=False, hidden_to_hidden=False)
+        if fft
+        else {}
+    )
+    layer = LMU(4, 6, 10.0, output_timesteps=(3, 7, -1), **kwargs)
+    y = layer(x).numpy()
+    assert y.shape == (3, 3, 4)
+
+    export_serving(layer, str(tmp_path))
+    loaded = tf.saved_model.load(str(tmp_path))
+    y_seq = loaded.signatures["serving_default"](inputs=x)["outputs"].numpy()
+    assert y_seq.shape == y.shape
+    assert np.allclose(y_seq, y, atol=1e-5)
@@ -0,0 +1,123 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from lmu import LMU
+from lmu.serving import LMUServingModule
+from lmu.streaming import (
+    MicroBatchScheduler,
+    PipelinedStack,
+    StatePool,
+    measure_pipelining,
+)
+
+
+def _module():
+    layer = LMU(4, 6, 10.0, return_sequences=True)
+    layer.build((None, None, 2))
+    return LMUServingModule(layer)
+
+
+def test_scheduler_matches_stepping():
+    module = _module()
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(5, 8, 2)).astype(np.float32)
+
+    async def run():
+        async with MicroBatchScheduler(module, max_batch_size=3) as scheduler:
+
+            async def client(i):
+                return [await scheduler.step(i, x[i, t]) for t in range(x.shape[1])]
+
+            return await asyncio.gather(*(client(i) for i in range(len(x))))
+
+    y = np.array(asyncio.run(run()))
+    y_sequence = module.sequence(x)["outputs"].numpy()
+    assert np.allclose(y, y_sequence, atol=1e-5)
+
+
+def test_scheduler_counts_sessions():
+    module = _module()
+    x = np.zeros(2, dtype=np.float32)
+
+    async def run():
+        async with MicroBatchScheduler(
+            module, max_batch_size=2, max_delay=1.0
+        ) as scheduler:
+            # two steps of one session do not fill a batch, so the first batch
+            # waits for (and includes) the second session
+            steps = [scheduler.step(0, x), scheduler.step(0, x)]
+
+            async def late():
+                await asyncio.sleep(0.05)
+                return await scheduler.step(1, x)
+
+            await asyncio.gather(*steps, late())
+            return scheduler.batch_sizes
+
+    assert asyncio.run(run())[0] == 2
+
+
+@pytest.mark.parametrize("sessions", ([3, 1, 2], ["a", "bc"], [1, "a", None], []))
+def test_pool_snapshot(sessions, tmp_path):
+    pool = StatePool(8, 2, 3)
+    for i, session in enumerate(sessions):
+        pool.slot(session)
+        pool.scatter(pool.slots([session]), [[i, i]], [[i, i, i]])
+
+    path = str(tmp_path / "pool.npz")
+    pool.snapshot(path)
+    restored = StatePool.restore(path)
+
+    assert len(restored) == len(sessions)
+    for i, session in enumerate(sessions):
+        h, m = restored.get_state(session)
+        assert np.all(h == i) and np.all(m == i)
+    restored.slot("new")
+    assert len(restored) == len(sessions) + 1
+
+
+def test_pool_snapshot_keys(tmp_path):
+    pool = StatePool(2, 2, 3)
+    pool.slot((1, 2))
+    with pytest.raises(TypeError, match="Cannot snapshot session key"):
+        pool.snapshot(str(tmp_path / "pool.npz"))
+
+
+def test_pipelined_stack():
+    layers = [LMU(4, 6, 10.0, return_sequences=True) for _ in range(2)]
+    layers[0].build((None, None, 2))
+    layers[1].build((None, None, 4))
+    rng = np.random.RandomState(0)
+    x = rng.uniform(-1, 1, size=(3, 10, 2)).astype(np.float32)
+    y = layers[1](layers[0](x)).numpy()
+
+    stack = PipelinedStack(layers, batch_size=3)
+    y_run = stack.run(np.transpose(x[:, :5], (1, 0, 2)))
+    assert all(isinstance(s, np.ndarray) for state in stack.states for s in state)
+    y_step = [stack.step(x[:, t]) for t in range(5, 10)]
+    assert np.allclose(
+        np.concatenate([y_run, y_step]), y.transpose((1, 0, 2)), atol=1e-5
+    )
+
+    with pytest.raises(ValueError, match="inputs for 3 streams"):
+        stack.step(x[:2, 0])
+    with pytest.raises(ValueError, match="inputs for 3 streams"):
+        stack.run(np.transpose(x[:2], (1, 0, 2)))
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="Linux only")
+def test_measure_pipelining_cores():
+    layers = [LMU(4, 6, 10.0, return_sequences=True) for _ in range(2)]
+    layers[0].build((None, None, 2))
+    layers[1].build((None, None, 4))
+
+    affinity = os.sched_getaffinity(0)
+    results = measure_pipelining(layers, batch_size=2, n_steps=5, n_cores=1)
+    assert results["max_error"] < 1e-5
+    assert os.sched_getaffinity(0) == affinity
+
+    with pytest.raises(ValueError, match="n_cores must be"):
+        measure_pipelining(layers, n_cores=len(affinity) + 1)
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+
+import lmu
+from lmu.utils import bucket_length, bucket_sequences, pack_sequences, unpack_sequences
+
+
+def test_bucket_length():
+    assert [bucket_length(n) for n in (0, 1, 2, 3, 64, 65)] == [1, 1, 2, 4, 64, 128]
+
+
+@pytest.mark.parametrize("shuffle", (False, True))
+def test_bucket_sequences(shuffle):
+    rng = np.random.RandomState(0)
+    sequences = [rng.uniform(1, 2, size=(n, 2)) for n in rng.randint(1, 70, size=25)]
+
+    seen = []
+    for idxs, batch, mask in bucket_sequences(
+        sequences, 4, shuffle=shuffle, rng=np.random.RandomState(1)
+    ):
+        lengths = np.array([len(sequences[i]) for i in idxs])
+        assert len(idxs) <= 4
+        assert batch.shape == (len(idxs), bucket_length(lengths.max()), 2)
+        assert np.array_equal(mask.sum(axis=1), lengths)
+        for i, idx in enumerate(idxs):
+            assert np.array_equal(batch[i, mask[i]], sequences[idx])
+            assert np.all(batch[i, ~mask[i]] == 0)
+        seen.extend(idxs)
+    assert sorted(seen) == list(range(len(sequences)))
+
+
+def test_fft_unknown_length():
+    # one trace with an unknown sequence length serves all lengths (without a mask)
+    rng = np.random.RandomState(0)
+    layer = lmu.LMUCellFFT(4, 6, 10.0, return_sequences=True)
+    layer.build((None, None, 2))
+    call = tf.function(
+        layer.call, input_signature=[tf.TensorSpec((None, None, 2), tf.float32)]
+    )
+
+    for seq_length in (5, 16, 23):
+        x = rng.uniform(-1, 1, size=(3, seq_length, 2)).astype(np.float32)
+        fixed = lmu.LMUCellFFT(4, 6, 10.0, return_sequences=True)
+        fixed.build(x.shape)
+        fixed.set_weights(layer.get_weights())
+        assert np.allclose(call(x), fixed(x), atol=1e-5)
+    assert call.experimental_get_tracing_count() == 1
+
+
+def test_pack_unpack():
+    rng = np.random.RandomState(0)
+    sequences = [rng.randn(n, 3) for n in rng.randint(1, 40, size=20)]
+
+    packed, segment_ids, index = pack_sequences(sequences, 64)
+    assert packed.shape[1:] == (64, 3)
+    assert segment_ids.shape == packed.shape[:2]
+    assert np.sum(segment_ids > 0) == sum(len(seq) for seq in sequences)
+    assert np.all(packed[segment_ids == 0] == 0)
+    # ids count up from 1 in each row, with the padding only at the end
+    for row in segment_ids:
+        ids = row[row > 0]
+        assert np.all(np.diff(ids) >= 0) and ids[0] == 1
+        assert np.all(row[len(ids) :] == 0)
+
+    for seq, unpacked in zip(sequences, unpack_sequences(packed, index)):
+        assert np.array_equal(seq, unpacked)
+
+    with pytest.raises(ValueError, match="do not fit"):
+        pack_sequences([np.zeros((65, 3))], 64)
+    with pytest.raises(ValueError, match="No sequences"):
+        pack_sequences([], 64)
@@ -0,0 +1,116 @@
+"""
+Utilities for preparing inputs to LMU layers.
+"""
+
+import numpy as np
+
+
+def bucket_length(seq_length):
+    """
+    Returns the length of the bucket containing sequences of length ``seq_length``.
+
+    Buckets are powers of two, so that sequences of similar lengths share one FFT
+    size (and one cached impulse response spectrum) in ``LMUCellFFT``.
+    """
+
+    return 1 << max(int(seq_length) - 1, 0).bit_length()
+
+
+def bucket_sequences(sequences, batch_size, shuffle=False, rng=np.random):
+    """
+    Groups variable-length sequences into batches padded to their bucket length.
+
+    ``sequences`` is a list of arrays with shape ``(timesteps, input_dim)``. Yields
+    ``(indices, batch, mask)`` tuples, where ``indices`` are the positions of the
+    batched sequences in ``sequences``, ``batch`` has shape
+    ``(n, bucket_length, input_dim)`` with each sequence padded at the end, and
+    ``mask`` is ``True`` for the non-padded timesteps.
+    """
+
+    lengths = np.array([len(seq) for seq in sequences])
+    buckets = np.array([bucket_length(n) for n in lengths])
+
+    batches = []
+    for bucket in np.unique(buckets):
+        # sort within each bucket so that batches contain similar lengths
+        idxs = np.flatnonzero(buckets == bucket)
+        idxs = idxs[np.argsort(lengths[idxs], kind="stable")]
+        batches.extend(
+            (bucket, idxs[i : i + batch_size]) for i in range(0, len(idxs), batch_size)
+        )
+
+    if shuffle:
+        rng.shuffle(batches)
+
+    for bucket, idxs in batches:
+        first = np.asarray(sequences[idxs[0]])
+        batch = np.zeros((len(idxs), bucket) + first.shape[1:], dtype=first.dtype)
+        mask = np.zeros((len(idxs), bucket), dtype=bool)
+        for i, idx in enumerate(idxs):
+            batch[i, : lengths[idx]] = sequences[idx]
+            mask[i, : lengths[idx]] = True
+        yield idxs, batch, mask
+
+
+def pack_sequences(sequences, length):
+    """
+    Packs variable-length sequences end-to-end into rows of ``length`` timesteps.
+
+    ``sequences`` is a list of arrays with shape ``(timesteps, input_dim)``, each at
+    most ``length`` long. Sequences are assigned to rows from longest to shortest,
+    each to the first row with enough space left (first-fit decreasing), so that
+    little padding remains.
+
+    Returns ``(packed, segment_ids, index)``, where ``packed`` has shape
+    ``(rows, length, input_dim)``, ``segment_ids`` numbers the sequences in each row
+    from 1 (with 0 for the padding at the end), and ``index`` gives the ``(row,
+    start, timesteps)`` of each sequence (see ``unpack_sequences``). ``segment_ids``
+    can be passed to ``LMU`` (or ``LMUCellFFT``), and ``segment_ids > 0`` is the mask
+    of non-padded timesteps.
+    """
+
+    if len(sequences) == 0:
+        raise ValueError("No sequences to pack")
+
+    lengths = np.array([len(seq) for seq in sequences])
+    if np.any(lengths > length):
+        raise ValueError(
+            "Sequences of up to %d timesteps do not fit in rows of length %d"
+            % (lengths.max(), length)
+        )
+
+    remaining = []
+    index = np.zeros((len(sequences), 3), dtype=int)
+    for i in np.argsort(-lengths, kind="stable"):
+        fits = np.flatnonzero(np.asarray(remaining) >= lengths[i])
+        if len(fits) == 0:
+            remaining.append(length)
+            row = len(remaining) - 1
+        else:
+            row = fits[0]
+        index[i] = row, length - remaining[row], lengths[i]
+        remaining[row] -= lengths[i]
+
+    first = np.asarray(sequences[0])
+    packed = np.zeros((len(remaining), length) + first.shape[1:], dtype=first.dtype)
+    segment_ids = np.zeros((len(remaining), length), dtype=np.int32)
+    n_segments = np.zeros(len(remaining), dtype=np.int32)
+    for i in np.lexsort((index[:, 1], index[:, 0])):
+        row, start, n = index[i]
+        packed[row, start : start + n] = sequences[i]
+        n_segments[row] += 1
+        segment_ids[row, start : start + n] = n_segments[row]
+
+    return packed, segment_ids, index
+
+
+def unpack_sequences(outputs, index):
+    """
+    Returns the list of per-sequence outputs from the packed ``outputs``.
+
+    ``index`` is the index returned by ``pack_sequences``, and ``outputs`` has shape
+    ``(rows, length, ...)``.
+    """
+
+    outputs = np.asarray(outputs)
+    return [outputs[row, start : start + n] for row, start, n in index]